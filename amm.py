@@ -1,62 +1,55 @@
 import sys
 from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton,
-    QLabel, QFileDialog, QTextEdit, QListWidget, QListWidgetItem, QComboBox, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView, QCheckBox
+    QLabel, QFileDialog, QTextEdit, QListWidget, QListWidgetItem, QComboBox, QTableWidget, QTableWidgetItem, QTableView, QHeaderView, QAbstractItemView, QLineEdit, QProgressBar
 )
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, QThreadPool
 import os
-import datetime
-import getpass
-from PIL import Image
 from PySide6.QtGui import QIcon
 # Ensure the script's directory is in the path to find model_loader
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Import the function that will likely look for the CSV relative to itself
 # Always use absolute path relative to script for CSV (This comment implies model_loader.py should handle path resolution)
-from model_loader import load_models_from_csv
-
-# Helper to log errors to user's Downloads folder
-def log_error(message, file_path=None, error=None):
-    try:
-        user = getpass.getuser()
-        downloads = os.path.join(os.path.expanduser('~'), 'Downloads')
-        log_file = os.path.join(downloads, 'AMM_error_log.txt')
-        with open(log_file, 'a', encoding='utf-8') as f:
-            timestamp = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            f.write(f"[{timestamp}] ")
-            if file_path:
-                f.write(f"File: {file_path} | ")
-            if error:
-                f.write(f"Error: {repr(error)} | ")
-            f.write(f"{message}\n")
-            # Add human-readable explanation for decode errors
-            if error and (isinstance(error, UnicodeDecodeError) or 'decode' in str(type(error)).lower() or 'decode' in str(error).lower()):
-                f.write("    If you see this, it means the file is not a text file (e.g., it's a video, image, or other binary file). This is normal for non-text files.\n")
-    except Exception as e:
-        print(f"Failed to write to error log: {e}")
+from model_loader import CAP_TEXT, CAP_IMAGE, CAP_MULTIMODAL
+from catalog_service import CatalogService, POLL_INTERVAL as CATALOG_POLL_INTERVAL
+import metrics
+from error_log import log_error
+from file_detect import get_file_type_label
+from amm_workers import CatalogLoadWorker, FileLoadWorker, AssessmentWorker
+from model_table import ModelTableModel, ModelSortProxy, SORT_COLUMNS, MODEL_ROLE
+from text_counter import DocumentCounter
+from file_stream import TextFilePager
 
 class AMMApp(QWidget):
-    def __init__(self):
+    def __init__(self, defer_catalog=False):
         super().__init__()
         self.setWindowTitle("API Model Assessor (AMM)")
         self.setMinimumSize(900, 700)
 
         # This is the line where the error occurs if model_loader.py can't find the CSV
         try:
-            self.models = load_models_from_csv()
+            # The service keeps self.models in step with the CSV (see reload_catalog).
+            # With defer_catalog the CSV is parsed on a worker once the window is up (see catalog_loaded)
+            self.catalog_service = CatalogService(load=not defer_catalog)
+            self.models = self.catalog_service.catalog
         except FileNotFoundError as e:
             # You might want to handle this more gracefully, maybe show an error message
             print(f"CRITICAL ERROR: Could not load model data. {e}")
             print("Ensure 'model_reference.csv' is in the same directory as 'model_loader.py'.")
             # You could exit, or disable parts of the UI, or load default empty data
+            self.catalog_service = None
             self.models = [] # Assign empty list to avoid further errors using self.models
             # Maybe pop up a message box:
             # from PySide6.QtWidgets import QMessageBox
             # QMessageBox.critical(self, "Error", f"Failed to load model data:\n{e}\n\nPlease ensure 'model_reference.csv' exists next to 'model_loader.py'.")
             # sys.exit(1) # Or maybe just disable features
 
-        self.sorted_models = self.models  # Default unsorted
+        # Measurement cache and assessment history (both SQLite); opened on
+        # the first assessment, not at startup (see open_assessment_stores)
+        self.measurement_cache = None
+        self.history_store = None
+        self.stores_opened = False
 
         self.layout = QVBoxLayout(self)
 
@@ -70,6 +63,9 @@ class AMMApp(QWidget):
             # Let's dynamically get sort keys if possible, or use safe defaults
             # Note: Max Tokens needs numerical sort, others alphabetical
             self.sort_combo.addItems(["Company", "Model", "Max Tokens"])
+        elif defer_catalog and self.catalog_service is not None:
+            self.sort_combo.addItems(["Loading..."])
+            self.sort_combo.setEnabled(False)  # Enabled by apply_catalog_diff once the models are in
         else:
              self.sort_combo.addItems(["N/A - Load Failed"]) # Indicate problem
              self.sort_combo.setEnabled(False) # Disable if no models
@@ -77,13 +73,25 @@ class AMMApp(QWidget):
         self.sort_combo.currentIndexChanged.connect(self.sort_models)
         sort_layout.addWidget(sort_label)
         sort_layout.addWidget(self.sort_combo)
+        self.filter_edit = QLineEdit()
+        self.filter_edit.setPlaceholderText("Filter models...")
+        self.filter_edit.textChanged.connect(self.filter_models)
+        sort_layout.addWidget(self.filter_edit)
         self.layout.addLayout(sort_layout)
 
-        # Model selection table with checkboxes
-        self.model_table = QTableWidget()
-        self.model_table.setColumnCount(5)
-        self.model_table.setHorizontalHeaderLabels(["Select", "Company", "Model", "Version", "Max Tokens"])
+        # Model selection table with checkboxes (check marks live in model_table_model.selection)
+        if self.models:
+            placeholder = "No models available."
+        elif defer_catalog and self.catalog_service is not None:
+            placeholder = "Loading models..."
+        else:
+            placeholder = "Model loading failed."
+        self.model_table_model = ModelTableModel(self.models, placeholder=placeholder, parent=self)
+        self.model_proxy = ModelSortProxy(self.model_table_model, parent=self)
+        self.model_table = QTableView()
+        self.model_table.setModel(self.model_proxy)
         self.model_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.model_table.verticalHeader().setVisible(False)
         self.model_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.model_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
         self.model_table.setSortingEnabled(True)
@@ -112,6 +120,24 @@ class AMMApp(QWidget):
         button_layout.addWidget(self.run_button)
         self.layout.addLayout(button_layout)
 
+        # Background task status (file loading / assessment), hidden while idle
+        status_layout = QHBoxLayout()
+        self.status_label = QLabel("")
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setRange(0, 100)
+        self.cancel_button = QPushButton("Cancel")
+        self.cancel_button.clicked.connect(self.cancel_background_task)
+        status_layout.addWidget(self.status_label)
+        status_layout.addWidget(self.progress_bar)
+        status_layout.addWidget(self.cancel_button)
+        self.layout.addLayout(status_layout)
+        self.thread_pool = QThreadPool.globalInstance()
+        self.active_worker = None
+        self.show_task_status(False)
+
+        # Whole-file counts when the text box only holds a preview of the uploaded file
+        self.uploaded_file_counts = None
+
         # Word and Character counters
         self.word_count_label = QLabel("Words: 0")
         self.char_count_label = QLabel("Characters: 0")
@@ -120,12 +146,28 @@ class AMMApp(QWidget):
         counter_layout.addWidget(self.char_count_label)
         self.layout.addLayout(counter_layout)
 
-        # Text box
+        # Text box; counts are kept up to date per edited line, not recounted per keystroke
         self.text_edit = QTextEdit()
         self.text_edit.setPlaceholderText("Paste text here or upload a file...")
-        self.text_edit.textChanged.connect(self.update_counters)
+        self.text_counter = DocumentCounter(self.text_edit.document(), on_change=self.update_counters)
         self.layout.addWidget(self.text_edit)
 
+        # Page controls, shown while the text box pages through a large uploaded file
+        self.file_pager = None
+        self.page_index = 0
+        page_layout = QHBoxLayout()
+        self.prev_page_button = QPushButton("< Previous Page")
+        self.prev_page_button.clicked.connect(lambda: self.show_page(self.page_index - 1))
+        self.page_label = QLabel("")
+        self.page_label.setAlignment(Qt.AlignCenter)
+        self.next_page_button = QPushButton("Next Page >")
+        self.next_page_button.clicked.connect(lambda: self.show_page(self.page_index + 1))
+        page_layout.addWidget(self.prev_page_button)
+        page_layout.addWidget(self.page_label)
+        page_layout.addWidget(self.next_page_button)
+        self.layout.addLayout(page_layout)
+        self.show_page_controls(False)
+
         # Remove old Clear Text and Close button layouts
         # Add new bottom button row: Clear Text (blue) and Close (red), centered
         bottom_button_layout = QHBoxLayout()
@@ -183,292 +225,247 @@ class AMMApp(QWidget):
             except Exception as e:
                 log_error("Failed to load saved icon path.", error=e)
 
-        # Populate table initially only if models loaded successfully
+        # Initial sort only if models loaded successfully
         if self.models:
-            self.sort_models() # Populate table initially
-        else:
-            self.model_table.setRowCount(1)
-            for col in range(self.model_table.columnCount()):
-                self.model_table.setItem(0, col, QTableWidgetItem("Model loading failed."))
-                self.model_table.item(0, col).setFlags(Qt.NoItemFlags)
+            self.sort_models()
+
+        # Pick up price changes in model_reference.csv without a restart
+        if self.catalog_service is not None:
+            self.catalog_timer = QTimer(self)
+            self.catalog_timer.timeout.connect(self.reload_catalog)
+            self.catalog_timer.start(int(CATALOG_POLL_INTERVAL * 1000))  # reload_catalog waits while the load worker runs
+            if defer_catalog:
+                self.start_background_task(CatalogLoadWorker(self.catalog_service), self.catalog_loaded)
 
     def sort_models(self):
         if not self.models: # Don't try to sort if loading failed
              return
 
         current_sort_key = self.sort_combo.currentText()
+        column = SORT_COLUMNS.get(current_sort_key, SORT_COLUMNS["Company"])
+        # Sort case-insensitive; Max Tokens numerically, largest first
+        order = Qt.DescendingOrder if current_sort_key == "Max Tokens" else Qt.AscendingOrder
+        self.model_table.sortByColumn(column, order)
 
-        if current_sort_key == "Max Tokens":
-             sort_func = lambda x: int(x.get("max_tokens", 0))
-             reverse = True
-        elif current_sort_key == "Company":
-             sort_func = lambda x: x.get("company", "").lower() # Sort case-insensitive
-        elif current_sort_key == "Model":
-             sort_func = lambda x: x.get("model", "").lower() # Sort case-insensitive
-        else: # Default or fallback
-             sort_func = lambda x: x.get("company", "").lower()
+    def filter_models(self, text):
+        self.model_proxy.set_filter_text(text)
 
+    def reload_catalog(self):
+        if self.active_worker is not None:
+            return  # Don't change prices under a running assessment; retry on the next tick
         try:
-            self.sorted_models = sorted(self.models, key=sort_func)
+            diff = self.catalog_service.poll()
         except Exception as e:
-            print(f"Error during sorting: {e}")
-            # Handle error, maybe revert to unsorted or default sort
-            self.sorted_models = self.models
-        self.populate_model_list()
-
-    def populate_model_list(self):
-        self.model_table.setRowCount(0)
-        if not self.sorted_models:
-            self.model_table.setRowCount(1)
-            for col in range(self.model_table.columnCount()):
-                self.model_table.setItem(0, col, QTableWidgetItem("No models available."))
-                self.model_table.item(0, col).setFlags(Qt.NoItemFlags)
+            log_error("Failed to reload the model catalog.", error=e)
+            return
+        if diff:
+            self.apply_catalog_diff(diff)
+
+    def catalog_loaded(self, diff):
+        if diff:
+            self.apply_catalog_diff(diff)
             return
-        for row, model in enumerate(self.sorted_models):
-            self.model_table.insertRow(row)
-            # Checkbox with left padding
-            checkbox = QCheckBox()
-            checkbox.setStyleSheet("padding-left: 16px;")
-            self.model_table.setCellWidget(row, 0, checkbox)
-            self.model_table.setItem(row, 1, QTableWidgetItem(model.get('company', 'N/A')))
-            self.model_table.setItem(row, 2, QTableWidgetItem(model.get('model', 'N/A')))
-            self.model_table.setItem(row, 3, QTableWidgetItem(str(model.get('version', 'N/A'))))
-            self.model_table.setItem(row, 4, QTableWidgetItem(str(model.get('max_tokens', 'N/A'))))
+        print("CRITICAL ERROR: Could not load model data.")
+        self.sort_combo.clear()
+        self.sort_combo.addItems(["N/A - Load Failed"])
+        self.model_table_model.placeholder = "Model loading failed."
+        self.model_table_model.set_models([])  # Repaints the placeholder row
+
+    def apply_catalog_diff(self, diff):
+        """Updates only the model_table rows a catalog reload touched."""
+        was_empty = not self.model_table_model.records
+        self.model_table_model.apply_diff(diff)
+        if was_empty and not self.sort_combo.isEnabled():
+            # Loading had failed at startup; the sort controls are usable now
+            self.sort_combo.clear()
+            self.sort_combo.addItems(["Company", "Model", "Max Tokens"])
+            self.sort_combo.setEnabled(True)
+            self.sort_models()
+
+    def visible_source_rows(self):
+        """Source rows of the models passing the filter, in display order."""
+        proxy = self.model_proxy
+        return [proxy.mapToSource(proxy.index(row, 0)).row() for row in range(proxy.rowCount())]
 
     def select_all_models(self):
-        for row in range(self.model_table.rowCount()):
-            widget = self.model_table.cellWidget(row, 0)
-            if isinstance(widget, QCheckBox):
-                widget.setChecked(True)
+        if self.model_proxy.filter_text:
+            self.model_table_model.set_all_checked(True, self.visible_source_rows())
+        else:
+            self.model_table_model.set_all_checked(True)
 
     def clear_all_models(self):
-        for row in range(self.model_table.rowCount()):
-            widget = self.model_table.cellWidget(row, 0)
-            if isinstance(widget, QCheckBox):
-                widget.setChecked(False)
+        self.model_table_model.set_all_checked(False)
 
     def selected_models_info(self):
-        selected = []
-        for row, model in enumerate(self.sorted_models):
-            widget = self.model_table.cellWidget(row, 0)
-            if isinstance(widget, QCheckBox) and widget.isChecked():
-                selected.append(model)
-        return selected
+        # Checked models in display order, then any that the filter is hiding
+        table_model = self.model_table_model
+        if not table_model.selection or not table_model.records:
+            return []
+        rows = self.visible_source_rows()
+        visible = set(rows)
+        rows += [row for row in range(len(table_model.records)) if row not in visible]
+        return [table_model.model_at(row) for row in rows if table_model.is_checked(row)]
 
     def update_counters(self):
-        text = self.text_edit.toPlainText()
+        if self.uploaded_file_counts:
+            # Text box holds one page of the uploaded file
+            self.word_count_label.setText(f"Words: {self.uploaded_file_counts['word_count']}")
+            self.char_count_label.setText(f"Characters: {self.uploaded_file_counts['char_count']}")
+            return
         # Simple word count, might not be perfect for all cases
-        word_count = len(text.split()) if text else 0
-        char_count = len(text)
-        self.word_count_label.setText(f"Words: {word_count}")
-        self.char_count_label.setText(f"Characters: {char_count}")
+        self.word_count_label.setText(f"Words: {self.text_counter.word_count}")
+        self.char_count_label.setText(f"Characters: {self.text_counter.char_count}")
 
     def is_text_only_selected(self):
-        selected_models = [item.text() for item in self.model_table.selectedIndexes()]
-        for model in self.sorted_models:
-            model_label = f"{model['company']} - {model['model']} - {model['max_tokens']} tokens"
-            if model_label in selected_models:
-                if 'Text' not in model.get('api_types', []):
-                    return False
-        return True if selected_models else False
+        selected_rows = self.model_table.selectionModel().selectedRows()
+        for index in selected_rows:
+            if not index.data(MODEL_ROLE)['capabilities'] & CAP_TEXT:
+                return False
+        return True if selected_rows else False
 
     def file_type_supported(self, file_is_binary, model):
-        api_types = [t.lower() for t in model.get('api_types', [])]
         if file_is_binary:
-            return any(t in api_types for t in ['image', 'multi-modal', 'multimodal'])
+            return bool(model['capabilities'] & (CAP_IMAGE | CAP_MULTIMODAL))
         else:
-            return 'text' in api_types
+            return bool(model['capabilities'] & CAP_TEXT)
 
     def get_file_type_label(self, path, is_binary):
-        if not is_binary:
-            ext = os.path.splitext(path)[1].lower()
-            if ext in ['.py', '.js', '.cpp', '.c', '.java', '.rb', '.go', '.rs', '.ts', '.php', '.cs', '.swift', '.kt', '.scala', '.sh', '.bat', '.pl', '.r', '.jl', '.lua', '.sql', '.html', '.css', '.json', '.xml', '.yaml', '.yml', '.md', '.ipynb']:
-                return 'Code'
-            return 'Text'
-        ext = os.path.splitext(path)[1].lower()
-        if ext in ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm']:
-            return 'Video'
-        elif ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.ico']:
-            return 'Image'
-        elif ext in ['.mp3', '.wav', '.aac', '.ogg', '.flac', '.m4a']:
-            return 'Audio'
-        elif ext in ['.pdf']:
-            return 'PDF'
-        elif ext in ['.zip', '.rar', '.7z', '.tar', '.gz']:
-            return 'Archive'
-        else:
-            return 'Unknown'
+        return get_file_type_label(path, is_binary)
+
+    def show_task_status(self, visible):
+        self.status_label.setVisible(visible)
+        self.progress_bar.setVisible(visible)
+        self.cancel_button.setVisible(visible)
+        self.upload_button.setEnabled(not visible)
+        self.run_button.setEnabled(not visible)
+
+    def start_background_task(self, worker, on_finished):
+        """Runs a worker on the thread pool; on_finished(result) is called on the GUI thread."""
+        self.active_worker = worker
+        worker.signals.progress.connect(self.update_task_progress)
+        worker.signals.finished.connect(self.end_background_task)  # Before on_finished, which may open a modal
+        worker.signals.finished.connect(on_finished)
+        worker.signals.failed.connect(self.background_task_failed)
+        worker.signals.cancelled.connect(self.end_background_task)
+        self.progress_bar.setValue(0)
+        self.status_label.setText("Working...")
+        self.show_task_status(True)
+        self.cancel_button.setVisible(worker.cancellable)
+        self.thread_pool.start(worker)
+
+    def update_task_progress(self, percent, message):
+        self.progress_bar.setValue(percent)
+        self.status_label.setText(message)
+
+    def background_task_failed(self, message):
+        print(f"Background task failed: {message}")
+        self.end_background_task()
+
+    def end_background_task(self, *args):
+        self.active_worker = None
+        self.show_task_status(False)
+
+    def cancel_background_task(self):
+        if self.active_worker is not None and self.active_worker.cancellable:
+            self.active_worker.cancel()
+            self.status_label.setText("Cancelling...")
 
     def upload_file(self):
         path, _ = QFileDialog.getOpenFileName(self, "Select File to Assess", "", "All Files (*.*)")
         if path:
+            self.close_file_pager()
             self.uploaded_file_path = path
-            try:
-                is_binary = False
-                ext = os.path.splitext(path)[1].lower()
-                # Check for image file
-                if ext in ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.ico']:
-                    try:
-                        with Image.open(path) as img:
-                            img.verify()  # Will raise if image is corrupt
-                    except Exception as e:
-                        log_error("Failed to decode image file (possibly corrupt or unsupported).", file_path=path, error=e)
-                        self.text_edit.setPlainText(f"Could not decode image: {os.path.basename(path)}")
-                        return  # Stop further processing
-                # Existing logic for text/binary detection...
-                try:
-                    with open(path, 'r', encoding='utf-8') as f:
-                        f.read(1024)
-                except Exception as e:
-                    is_binary = True
-                    log_error("File detected as binary or failed to read as text.", file_path=path, error=e)
-                if is_binary:
-                    file_size = os.path.getsize(path)
-                    self.text_edit.setPlainText(f"Binary file detected. Size: {file_size} bytes")
-                else:
-                    try:
-                        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
-                            content = f.read()  # No character limit
-                            self.text_edit.setPlainText(content)
-                    except Exception as e:
-                        log_error("Failed to read file as text.", file_path=path, error=e)
-                        self.text_edit.setPlaceholderText(f"Could not read file: {os.path.basename(path)}")
-                print(f"File selected: {path}")
-            except Exception as e:
-                log_error("General file read error in upload_file.", file_path=path, error=e)
-                print(f"Error reading file {path}: {e}")
-                self.text_edit.setPlaceholderText(f"Could not read file: {os.path.basename(path)}")
+            self.uploaded_file_counts = None
+            print(f"File selected: {path}")
+            self.start_background_task(FileLoadWorker(path), self.file_loaded)
+
+    def file_loaded(self, result):
+        if result["path"] != self.uploaded_file_path:
+            return  # Cleared or replaced while loading
+        self.uploaded_file_counts = result["counts"]
+        if result["paged"]:
+            self.open_file_pager(result["path"])
+        elif result["text"] is not None:
+            self.text_edit.setPlainText(result["text"])
+        else:
+            self.text_edit.setPlaceholderText(result["placeholder"])
+
+    def open_file_pager(self, path):
+        try:
+            self.file_pager = TextFilePager(path)
+        except Exception as e:
+            log_error("Failed to open file for paged preview.", file_path=path, error=e)
+            self.text_edit.setPlaceholderText(f"Could not read file: {os.path.basename(path)}")
+            return
+        # A page is only a view of the file (the assessment reads the file itself)
+        self.text_edit.setReadOnly(True)
+        self.show_page_controls(True)
+        self.show_page(0)
+
+    def show_page(self, index):
+        if self.file_pager is None:
+            return
+        self.page_index = max(0, min(index, self.file_pager.page_count - 1))
+        self.text_edit.setPlainText(self.file_pager.page(self.page_index))
+        self.page_label.setText(f"Page {self.page_index + 1} of {self.file_pager.page_count}")
+        self.prev_page_button.setEnabled(self.page_index > 0)
+        self.next_page_button.setEnabled(self.page_index < self.file_pager.page_count - 1)
+
+    def show_page_controls(self, visible):
+        self.prev_page_button.setVisible(visible)
+        self.page_label.setVisible(visible)
+        self.next_page_button.setVisible(visible)
+
+    def close_file_pager(self):
+        if self.file_pager is not None:
+            self.file_pager.close()
+            self.file_pager = None
+        self.text_edit.setReadOnly(False)
+        self.show_page_controls(False)
 
     def run_assessment(self):
         selected_models = self.selected_models_info()
         if not selected_models:
             print("No models selected.")
             return
-        data = None
-        file_is_binary = False
-        file_type_label = None
-        file_size_bytes = 0
+        self.open_assessment_stores()
         if self.uploaded_file_path:
-            data_type = "File"
-            try:
-                try:
-                    with open(self.uploaded_file_path, 'r', encoding='utf-8') as f:
-                        f.read(1024)
-                except Exception as e:
-                    file_is_binary = True
-                    log_error("File detected as binary or failed to read as text in run_assessment.", file_path=self.uploaded_file_path, error=e)
-                file_type_label = self.get_file_type_label(self.uploaded_file_path, file_is_binary)
-                file_size_bytes = os.path.getsize(self.uploaded_file_path)
-                if file_is_binary:
-                    data = "X" * file_size_bytes
-                else:
-                    try:
-                        with open(self.uploaded_file_path, 'r', encoding='utf-8') as f:
-                            data = f.read()
-                    except Exception as e:
-                        log_error("Failed to read file as text in run_assessment.", file_path=self.uploaded_file_path, error=e)
-                        return
-            except Exception as e:
-                log_error("General file read error in run_assessment.", file_path=self.uploaded_file_path, error=e)
-                print(f"Failed to read file: {e}")
-                return
+            worker = AssessmentWorker(selected_models, path=self.uploaded_file_path, cache=self.measurement_cache, **self.history_options())
         elif self.text_edit.toPlainText():
-            data_type = "Text"
-            data = self.text_edit.toPlainText()
-            file_type_label = 'Text'
-            file_size_bytes = len(data.encode('utf-8'))
+            worker = AssessmentWorker(selected_models, text=self.text_edit.toPlainText(), **self.history_options())
         else:
             print("No input data.")
             return
-        if not data:
+        self.start_background_task(worker, self.assessment_finished)
+
+    def open_assessment_stores(self):
+        if self.stores_opened:
+            return
+        self.stores_opened = True
+        from result_cache import MeasurementCache
+        from history_store import HistoryStore
+
+        # Measurements of files assessed before are reused if the file hasn't changed
+        try:
+            self.measurement_cache = MeasurementCache()
+        except Exception as e:
+            log_error("Failed to open measurement cache; files will be re-measured each time.", error=e)
+
+        # Every assessment's results are kept for later spend queries (history_store.py)
+        try:
+            self.history_store = HistoryStore()
+        except Exception as e:
+            log_error("Failed to open assessment history; results will not be recorded.", error=e)
+
+    def history_options(self):
+        revision = self.catalog_service.revision if self.catalog_service is not None else None
+        return {"history": self.history_store, "catalog_revision": revision}
+
+    def assessment_finished(self, outcome):
+        if outcome is None:
             print("Input data is empty.")
             return
-        results = []
-        unsupported_models = []
-        for model in selected_models:
-            considered_type = file_type_label
-            api_types = [t.lower() for t in model.get('api_types', [])]
-            cost = 'Not Supported'
-            send_tokens = get_tokens = total_model_tokens = total_tokens = 'Not Supported'
-            # Treat code files as text if model supports text but not code
-            if considered_type == 'Code' and ('code' in api_types or 'text' in api_types):
-                # Use text logic for code files if 'text' is supported
-                if model['input_cost'] is not None and model['output_cost'] is not None and model['max_tokens'] is not None:
-                    estimated_input_tokens = max(1, int(file_size_bytes / 4))
-                    estimated_output_tokens = int(estimated_input_tokens * 0.5)
-                    total_model_tokens = estimated_input_tokens + estimated_output_tokens
-                    send_tokens = estimated_input_tokens
-                    get_tokens = estimated_output_tokens
-                    total_tokens = total_model_tokens
-                    cost = (send_tokens / 1000000) * model['input_cost'] + (get_tokens / 1000000) * model['output_cost']
-                    cost = f"${cost:.6f}"
-                else:
-                    cost = 'Not Supported'
-            # TEXT
-            elif considered_type == 'Text' and 'text' in api_types:
-                if model['input_cost'] is not None and model['output_cost'] is not None and model['max_tokens'] is not None:
-                    estimated_input_tokens = max(1, int(file_size_bytes / 4))
-                    estimated_output_tokens = int(estimated_input_tokens * 0.5)
-                    total_model_tokens = estimated_input_tokens + estimated_output_tokens
-                    send_tokens = estimated_input_tokens
-                    get_tokens = estimated_output_tokens
-                    total_tokens = total_model_tokens
-                    cost = (send_tokens / 1000000) * model['input_cost'] + (get_tokens / 1000000) * model['output_cost']
-                    cost = f"${cost:.6f}"
-                else:
-                    cost = 'Not Supported'
-            # VIDEO
-            elif considered_type == 'Video' and ('video' in api_types or 'multi-modal' in api_types or 'multimodal' in api_types):
-                file_size_mb = file_size_bytes / (1024 * 1024)
-                estimated_minutes = file_size_mb
-                per_min_cost = model.get('video_cost', None)
-                if per_min_cost is not None:
-                    cost = estimated_minutes * per_min_cost
-                    cost = f"${cost:.6f}"
-                else:
-                    # Use hardcoded default if not found
-                    default_video_cost = 0.05
-                    cost = estimated_minutes * default_video_cost
-                    cost = f"${cost:.6f} (default rate)"
-            # AUDIO
-            elif considered_type == 'Audio' and ('audio' in api_types or 'multi-modal' in api_types or 'multimodal' in api_types):
-                file_size_mb = file_size_bytes / (1024 * 1024)
-                estimated_minutes = file_size_mb
-                per_min_cost = model.get('audio_cost', None)
-                if per_min_cost is not None:
-                    cost = estimated_minutes * per_min_cost
-                    cost = f"${cost:.6f}"
-                else:
-                    cost = 'Not Supported'
-            # IMAGE
-            elif considered_type == 'Image' and ('image' in api_types or 'multi-modal' in api_types or 'multimodal' in api_types):
-                per_image_cost = model.get('image_cost', None)
-                estimated_output_tokens = 512  # or model.get('image_output_tokens', 512)
-                if per_image_cost is not None and model['output_cost'] is not None:
-                    cost = per_image_cost + ((estimated_output_tokens / 1000000) * model['output_cost'])
-                    cost = f"${cost:.6f}"
-                    get_tokens = estimated_output_tokens
-                    send_tokens = total_model_tokens = total_tokens = 'Not Supported'
-                else:
-                    cost = 'Not Supported'
-            # UNKNOWN
-            else:
-                cost = 'Not Supported'
-            if cost == 'Not Supported':
-                unsupported_models.append(f"{model['company']} - {model['model']}")
-                continue
-            results.append({
-                "Company": model['company'],
-                "Model": model['model'],
-                "Version": model['version'],
-                "File Type Considered": considered_type,
-                "API Types": ", ".join(model['api_types']),
-                "Max Tokens per Call": model['max_tokens'] if model['max_tokens'] is not None else 'Not Supported',
-                "Send Tokens": send_tokens,
-                "Get Tokens": get_tokens,
-                "Total Tokens": total_tokens,
-                "Total Cost (USD)": cost
-            })
+        results, unsupported_models = outcome
         if unsupported_models:
             # Show a pop-up with a copyable text box listing unsupported models
             from PySide6.QtWidgets import QDialog, QVBoxLayout, QLabel, QTextEdit, QPushButton
@@ -497,16 +494,20 @@ class AMMApp(QWidget):
         dialog.setWindowTitle("Assessment Results")
         dialog.resize(1200, 600)  # 2x wider than typical
         layout = QVBoxLayout(dialog)
+        import estimator  # Already loaded by the assessment worker
 
-        table = QTableWidget()
-        table.setColumnCount(len(results[0]))
-        table.setHorizontalHeaderLabels(results[0].keys())
-        table.setRowCount(len(results))
-        for row_num, row_data in enumerate(results):
-            for col_num, (key, value) in enumerate(row_data.items()):
-                table.setItem(row_num, col_num, QTableWidgetItem(str(value)))
+        with metrics.timed("render"):
+            shown = [estimator.display_row(row) for row in results]
+            table = QTableWidget()
+            table.setColumnCount(len(shown[0]))
+            table.setHorizontalHeaderLabels(shown[0].keys())
+            table.setRowCount(len(shown))
+            for row_num, row_data in enumerate(shown):
+                for col_num, (key, value) in enumerate(row_data.items()):
+                    table.setItem(row_num, col_num, QTableWidgetItem(str(value)))
 
-        table.setSortingEnabled(True)  # Enable sorting on columns
+            table.setSortingEnabled(True)  # Enable sorting on columns
+        metrics.count("amm_rendered_rows_total", len(shown))
 
         layout.addWidget(table)
 
@@ -531,17 +532,26 @@ class AMMApp(QWidget):
         dialog.exec()
 
     def export_to_excel(self, results):
-        import pandas as pd
+        import estimator
+        import result_export  # Loaded on first export, not at startup
 
-        path, _ = QFileDialog.getSaveFileName(self, "Save As", "assessment_results.xlsx", "Excel Files (*.xlsx)")
+        path, selected_filter = QFileDialog.getSaveFileName(self, "Save As", "assessment_results.xlsx", "Excel Files (*.xlsx);;CSV Files (*.csv);;Parquet Files (*.parquet)")
         if path:
-            df = pd.DataFrame(results)
-            df.to_excel(path, index=False)
+            fmt = result_export.export_format(path) or selected_filter.split("*.")[-1].rstrip(")")
+            try:
+                result_export.export_rows(results, path, fmt, columns=estimator.NUMERIC_RESULT_COLUMNS)
+            except (ImportError, OSError, ValueError) as e:
+                log_error("Failed to export assessment results.", file_path=path, error=e)
+                print(f"[ERROR] Could not export assessment results to {path}: {e}")
+                return
             print(f"Exported assessment results to {path}")
 
         # Maybe display results in a new window or a dedicated results area
 
     def clear_text_and_file(self):
+        self.cancel_background_task()
+        self.close_file_pager()
+        self.uploaded_file_counts = None
         self.text_edit.clear()
         self.uploaded_file_path = None
         self.uploaded_file_type_label = None
@@ -558,9 +568,12 @@ class AMMApp(QWidget):
                 log_error("Failed to set or save app icon.", file_path=path, error=e)
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
+    # The window shows first and the catalog loads behind it; --sync-startup loads it before showing
+    sync_startup = "--sync-startup" in sys.argv
+    metrics.configure_from_env()  # AMM_METRICS / AMM_PROFILE, see metrics.py
+    app = QApplication([arg for arg in sys.argv if arg != "--sync-startup"])
     # Apply styles or settings to the app if desired
     # app.setStyle('Fusion')
-    window = AMMApp()
+    window = AMMApp(defer_catalog=not sync_startup)
     window.show()
     sys.exit(app.exec())
\ No newline at end of file
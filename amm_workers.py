@@ -0,0 +1,215 @@
+import os
+import threading
+
+from PySide6.QtCore import QObject, QRunnable, Signal
+
+import metrics
+from error_log import log_error, log_debug
+from file_detect import detect_file
+from file_stream import read_text_preview_stream, scan_text_stream, PAGE_BYTES
+
+# --- Background workers for the AMM window ---
+# File loading and assessment run on QThreadPool threads so the window keeps
+# repainting while a large file is verified, scanned or tokenized. Results
+# come back to the GUI thread through WorkerSignals (queued connections).
+# estimator (and the probes, tokenizers and stores it pulls in) is imported
+# by the workers that need it, so none of it loads before the window shows.
+
+
+class Cancelled(Exception):
+    """Raised inside a worker once cancel() has been requested."""
+
+
+class WorkerSignals(QObject):
+    progress = Signal(int, str)   # percent (0-100), status message
+    finished = Signal(object)     # worker-specific result
+    failed = Signal(str)          # error message
+    cancelled = Signal()
+
+
+class _Worker(QRunnable):
+    """
+    Base worker: cancellation flag, progress helper and signal plumbing.
+    Subclasses implement work(), whose return value is emitted as finished.
+    """
+
+    cancellable = True  # False for workers that never call check_cancelled()
+
+    def __init__(self):
+        super().__init__()
+        # The window keeps a reference while the worker runs; don't let Qt delete it under us
+        self.setAutoDelete(False)
+        self.signals = WorkerSignals()
+        self._cancel_event = threading.Event()
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise Cancelled()
+
+    def byte_progress(self, total, message):
+        """Returns a progress(bytes_read) callback that also honours cancel()."""
+        def report(done):
+            self.check_cancelled()
+            self.signals.progress.emit(min(100, int(done * 100 / total)) if total else 100, message)
+        return report
+
+    def run(self):
+        try:
+            with metrics.profiled(type(self).__name__):
+                result = self.work()
+        except Cancelled:
+            self.signals.cancelled.emit()
+            return
+        except Exception as e:
+            log_error(f"Background task failed in {type(self).__name__}.", error=e)
+            self.signals.failed.emit(str(e))
+            return
+        self.signals.finished.emit(result)
+
+
+class CatalogLoadWorker(_Worker):
+    """
+    Parses the model catalog CSV for a CatalogService created with
+    load=False, so the window can show before the catalog is loaded.
+
+    Result: the CatalogDiff from CatalogService.load() (every row added).
+    """
+
+    cancellable = False  # A half-loaded catalog is no use; it always runs to the end
+
+    def __init__(self, service):
+        super().__init__()
+        self.service = service
+
+    def work(self):
+        self.signals.progress.emit(0, "Loading models...")
+        return self.service.load()
+
+
+class FileLoadWorker(_Worker):
+    """
+    Prepares an uploaded file for the text box: image verify, UTF-8 probe,
+    and either its text or, for files over PAGE_BYTES (which the window
+    pages through with a TextFilePager), whole-file counts.
+
+    Result: {'path', 'text': str or None, 'placeholder': str or None,
+             'counts': dict or None, 'paged': bool}
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def work(self):
+        path = self.path
+        name = os.path.basename(path)
+        result = {"path": path, "text": None, "placeholder": None, "counts": None, "paged": False}
+        self.signals.progress.emit(0, f"Loading {name}...")
+        # One open for detection, image verify, preview and counting
+        with open(path, 'rb') as f:
+            with metrics.timed("detect"):
+                descriptor = detect_file(path, f)
+            f.seek(0)
+            if descriptor.file_type == 'Image':
+                from estimator import verify_image
+                try:
+                    verify_image(f)  # Will raise if image is corrupt
+                except Exception as e:
+                    log_error("Failed to decode image file (possibly corrupt or unsupported).", file_path=path, error=e)
+                    result["text"] = f"Could not decode image: {name}"
+                    return result
+            self.check_cancelled()
+            if descriptor.is_binary:
+                log_debug("File detected as binary or failed to read as text.", file_path=path, error=descriptor.probe_error)
+                result["text"] = f"Binary file detected. Size: {descriptor.size_bytes} bytes"
+                return result
+            try:
+                with metrics.timed("read"):
+                    if descriptor.size_bytes > PAGE_BYTES:
+                        # Too big for the text box: the window shows it a page at a time,
+                        # and the counters show these whole-file totals
+                        result["counts"] = scan_text_stream(f, progress=self.byte_progress(descriptor.size_bytes, f"Counting {name}..."))
+                        result["paged"] = True
+                    else:
+                        result["text"], _ = read_text_preview_stream(f)
+            except Cancelled:
+                raise
+            except Exception as e:
+                log_error("Failed to read file as text.", file_path=path, error=e)
+                result["text"] = None
+                result["placeholder"] = f"Could not read file: {name}"
+        return result
+
+
+class AssessmentWorker(_Worker):
+    """
+    Measures the input (uploaded file or pasted text) and prices it against
+    the selected models.
+
+    Result: (results, unsupported_models) as from estimator.assess with
+    numeric rows (costs as floats; see estimator.display_row), or None if the
+    input turned out to be empty. With a history store the results are also
+    recorded there.
+    """
+
+    def __init__(self, models, path=None, text=None, cache=None, history=None, catalog_revision=None):
+        super().__init__()
+        self.models = models
+        self.path = path
+        self.text = text
+        self.cache = cache
+        self.history = history
+        self.catalog_revision = catalog_revision
+
+    def work(self):
+        import estimator
+
+        tokenizer_names = estimator.tokenizer_names(self.models)
+        if self.path:
+            name = os.path.basename(self.path)
+            progress = self.byte_progress(os.path.getsize(self.path), f"Measuring {name}...")
+            self.signals.progress.emit(0, f"Measuring {name}...")
+
+            def measure(path, names):
+                return estimator.measure_file(path, names, progress=progress)
+            try:
+                if self.cache is not None:
+                    measurement = self.cache.measure(self.path, tokenizer_names, measure)
+                    self.cache.flush()
+                else:
+                    measurement = measure(self.path, tokenizer_names)
+            except Cancelled:
+                raise
+            except Exception as e:
+                log_error("Failed to read file as text in run_assessment.", file_path=self.path, error=e)
+                raise
+            if measurement["is_binary"]:
+                log_debug("File detected as binary or failed to read as text in run_assessment.", file_path=self.path, error=measurement["probe_error"])
+        else:
+            self.signals.progress.emit(0, "Measuring text...")
+            measurement = estimator.measure_text(self.text, tokenizer_names)
+        self.check_cancelled()
+        if not measurement["size_bytes"]:
+            return None
+        self.signals.progress.emit(100, "Pricing...")
+        outcome = estimator.assess(measurement, self.models, numeric=True)
+        if self.history is not None:
+            self.record_history(measurement, outcome[0])
+        return outcome
+
+    def record_history(self, measurement, results):
+        from history_store import text_hash
+
+        try:
+            if self.path:
+                # Without the cache the file is recorded unfingerprinted rather than read again
+                digest = self.cache.fingerprint(self.path) if self.cache is not None else None
+            else:
+                digest = text_hash(self.text)
+            self.history.record(measurement, results, digest, self.catalog_revision, source="gui")
+        except Exception as e:
+            # The estimate itself is fine; don't fail it over the history
+            log_error("Failed to record assessment history.", file_path=self.path, error=e)
@@ -0,0 +1,79 @@
+import gzip
+import os
+import tarfile
+import zipfile
+
+# --- Archive members without extraction ---
+# Hands out an archive's members one at a time as readable streams straight
+# from the archive: nothing is written to disk and only the current member is
+# open. Zip members are listed from the central directory; tar (plain or
+# gzip-compressed) is read as a forward-only stream, so a multi-GB tarball is
+# walked in a single pass; a plain .gz file is its one member.
+
+ARCHIVE_FORMATS = ('zip', 'tar', 'gz')  # Formats iter_archive_members can open (not rar/7z)
+
+
+def _is_gzipped_tar(f):
+    try:
+        with gzip.GzipFile(fileobj=f) as stream:
+            block = stream.read(tarfile.BLOCKSIZE)
+    except (OSError, EOFError):
+        return False
+    finally:
+        f.seek(0)
+    return block[257:262] == b'ustar'
+
+
+def _iter_zip(f):
+    with zipfile.ZipFile(f) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            try:
+                member = archive.open(info)
+            except (RuntimeError, NotImplementedError, zipfile.BadZipFile):
+                yield info.filename, info.file_size, None  # Encrypted or unsupported compression
+                continue
+            with member:
+                yield info.filename, info.file_size, member
+
+
+def _iter_tar(f, mode):
+    with tarfile.open(fileobj=f, mode=mode) as archive:
+        for info in archive:
+            if info.isfile():
+                yield info.name, info.size, archive.extractfile(info)
+            archive.members = []  # Stream mode would otherwise keep every header seen
+
+
+def iter_archive_members(f, fmt, path):
+    """
+    Walks an archive's file members lazily.
+
+    Args:
+        f (file): The archive, opened in binary mode and positioned at the start.
+        fmt (str): Format from file_detect (descriptor.format): 'zip', 'tar'
+                   or 'gz'. Other formats yield nothing.
+        path (str): The archive's path (names the member of a plain .gz).
+
+    Yields:
+        tuple: (member name, size in bytes or None if the archive doesn't
+               record it, binary stream or None if the member can't be
+               read). A stream is only valid until the next member is
+               requested.
+
+    Raises:
+        zipfile.BadZipFile / tarfile.TarError / OSError: If the archive is corrupt.
+    """
+    if fmt == 'zip':
+        yield from _iter_zip(f)
+    elif fmt == 'tar':
+        yield from _iter_tar(f, 'r|')
+    elif fmt == 'gz':
+        if _is_gzipped_tar(f):
+            yield from _iter_tar(f, 'r|gz')
+            return
+        name = os.path.basename(path)
+        name = name[:-3] if name.lower().endswith('.gz') else name
+        with gzip.GzipFile(fileobj=f) as member:
+            yield name, None, member
@@ -0,0 +1,663 @@
+import argparse
+import asyncio
+import atexit
+import csv
+import datetime
+import fnmatch
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import struct
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+import wave
+import zipfile
+import zlib
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Benchmark suite ---
+# Times the estimator, catalog loader, model table, exporter and estimation
+# server on synthetic fixtures of increasing size and writes the results as
+# JSON, so releases can be compared on throughput and peak RSS:
+#
+#   python benchmarks.py --output base.json
+#   python benchmarks.py --output new.json --filter "measure/*"
+#   python benchmarks.py --compare base.json new.json
+#
+# Fixtures are generated from a fixed seed (catalogs are built from the rows
+# of model_reference.csv). Each case runs in its own interpreter, so its
+# peak RSS is its own and earlier cases don't warm its caches; within a
+# case the OS file cache is warm after the first run, so both the best and
+# the median time are reported.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FORMAT = "amm-benchmarks"
+RESULTS_VERSION = 1
+FIXTURES_VERSION = 1
+SEED = 20240601
+KB = 1024
+MB = 1024 * 1024
+
+# Fixture sizes: catalog rows, text/code file bytes, media files per corpus,
+# archive members and exported rows
+FULL_SIZES = {
+    "catalog_rows": [10, 1000, 100000],
+    "text_bytes": [64 * KB, 4 * MB, 64 * MB],
+    "media_files": [10, 100, 1000],
+    "archive_members": [10, 1000, 10000],
+    "export_rows": [1000, 100000],
+}
+QUICK_SIZES = {
+    "catalog_rows": [10, 1000],
+    "text_bytes": [64 * KB, 1 * MB],
+    "media_files": [10, 100],
+    "archive_members": [10, 1000],
+    "export_rows": [1000, 10000],
+}
+PRICE_CATALOG_ROWS = 1000       # Catalog size for the per-pair pricing cases
+PRICE_MEASUREMENTS_PER_KIND = 20
+IMAGE_SIZES = [(640, 480), (1024, 768), (1920, 1080), (4000, 3000), (512, 512), (768, 1366)]
+AUDIO_SECONDS = 2
+VIDEO_MDAT_BYTES = 16 * KB
+ARCHIVE_MEMBER_BYTES = 4 * KB
+SERVER_REQUESTS = 20000         # Requests sent to estimate_server per run...
+SERVER_CONNECTIONS = 64         # ...over this many keep-alive connections
+
+_WORDS = ("the of and to in is for on that with as are this be by from at or an it model token cost price "
+          "input output file image audio video archive call budget context window stream batch rate "
+          "catalog measurement estimate provider request response latency throughput memory").split()
+
+
+def size_label(n, unit=""):
+    """Short label for a size: 65536 bytes -> '64KB', 100000 rows -> '100k'."""
+    if unit == "B":
+        for suffix, scale in (("MB", MB), ("KB", KB)):
+            if n >= scale and n % scale == 0:
+                return f"{n // scale}{suffix}"
+        return f"{n}B"
+    for suffix, scale in (("M", 1000000), ("k", 1000)):
+        if n >= scale and n % scale == 0:
+            return f"{n // scale}{suffix}"
+    return str(n)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB, or None if it can't be read."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / MB if sys.platform == "darwin" else peak / KB  # Bytes on macOS, KB elsewhere
+    try:
+        import psutil
+    except ImportError:
+        return None
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / MB
+
+
+# --- Fixtures ---
+
+def _text_block(rng, size):
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(_WORDS)
+        words.append(word)
+        length += len(word) + 1
+        if rng.random() < 0.08:
+            words[-1] += ".\n" if rng.random() < 0.3 else ","
+    return " ".join(words).encode("utf-8")[:size]
+
+
+def _code_block(rng, size):
+    lines = []
+    length = 0
+    i = 0
+    while length < size:
+        name = f"{rng.choice(_WORDS)}_{rng.choice(_WORDS)}_{i}"
+        body = (f"def {name}(items, rate=0.{rng.randint(1, 99)}):\n"
+                f"    \"\"\"Returns the {rng.choice(_WORDS)} of each {rng.choice(_WORDS)}.\"\"\"\n"
+                f"    total = 0\n"
+                f"    for item in items:\n"
+                f"        total += item.get('{rng.choice(_WORDS)}', {rng.randint(0, 9999)}) * rate\n"
+                f"    return total\n\n\n")
+        lines.append(body)
+        length += len(body)
+        i += 1
+    return "".join(lines).encode("utf-8")[:size]
+
+
+def _write_repeated(path, size, make_block, rng):
+    # Four distinct 1 MB blocks, cycled, keep generation of big files fast
+    blocks = [make_block(rng, min(size, MB)) for _ in range(4 if size > MB else 1)]
+    with open(path, "wb") as f:
+        written = i = 0
+        while written < size:
+            block = blocks[i % len(blocks)][:size - written]
+            f.write(block)
+            written += len(block)
+            i += 1
+
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def _png_bytes(width, height, idat_cache):
+    if (width, height) not in idat_cache:
+        raw = (b"\x00" + b"\x80" * width) * height  # Filter byte + one grey row
+        idat_cache[(width, height)] = zlib.compress(raw, 9)
+    header = _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 0, 0, 0, 0))
+    return b"\x89PNG\r\n\x1a\n" + header + _png_chunk(b"IDAT", idat_cache[(width, height)]) + _png_chunk(b"IEND", b"")
+
+
+def _mp4_box(kind, payload):
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def _mp4_bytes(duration_ms):
+    mvhd = _mp4_box(b"mvhd", b"\0" * 12 + struct.pack(">II", 1000, duration_ms) + b"\0" * 80)
+    return _mp4_box(b"ftyp", b"isom\0\0\0\0isom") + _mp4_box(b"mdat", b"\0" * VIDEO_MDAT_BYTES) + _mp4_box(b"moov", mvhd)
+
+
+def _write_catalog(path, rows):
+    with open(os.path.join(SCRIPT_DIR, "model_reference.csv"), encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        templates = [row for row in reader if row]
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for i in range(rows):
+            row = list(templates[i % len(templates)])
+            if i >= len(templates):
+                row[1] = f"{row[1]}-bench{i}"
+            writer.writerow(row)
+
+
+def fixture_paths(root, sizes):
+    """Where each fixture lives: {'catalog': {rows: path}, 'text'/'code': {bytes: path},
+    'image'/'audio'/'video': {count: [paths]}, 'zip'/'targz': {members: path}}."""
+    largest = max(sizes["media_files"])
+    media = {}
+    for kind, ext in (("image", "png"), ("audio", "wav"), ("video", "mp4")):
+        files = [os.path.join(root, kind, f"{kind}-{i:05d}.{ext}") for i in range(largest)]
+        media[kind] = {n: files[:n] for n in sizes["media_files"]}
+    return {
+        "catalog": {n: os.path.join(root, "catalogs", f"catalog-{n}.csv") for n in sizes["catalog_rows"]},
+        "text": {n: os.path.join(root, "text", f"text-{size_label(n, 'B')}.txt") for n in sizes["text_bytes"]},
+        "code": {n: os.path.join(root, "code", f"code-{size_label(n, 'B')}.py") for n in sizes["text_bytes"]},
+        **media,
+        "zip": {n: os.path.join(root, "archive", f"members-{n}.zip") for n in sizes["archive_members"]},
+        "targz": {n: os.path.join(root, "archive", f"members-{n}.tar.gz") for n in sizes["archive_members"]},
+    }
+
+
+def build_fixtures(root, sizes):
+    """Generates every fixture under root (skipped if root already holds this set)."""
+    manifest_path = os.path.join(root, "fixtures.json")
+    manifest = {"version": FIXTURES_VERSION, "seed": SEED, "sizes": sizes}
+    try:
+        with open(manifest_path, encoding="utf-8") as f:
+            if json.load(f) == manifest:
+                return
+    except (OSError, ValueError):
+        pass
+    rng = random.Random(SEED)
+    paths = fixture_paths(root, sizes)
+    for sub in ("catalogs", "text", "code", "image", "audio", "video", "archive"):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+    for rows, path in paths["catalog"].items():
+        _write_catalog(path, rows)
+    for size, path in paths["text"].items():
+        _write_repeated(path, size, _text_block, rng)
+    for size, path in paths["code"].items():
+        _write_repeated(path, size, _code_block, rng)
+    idat_cache = {}
+    largest = max(sizes["media_files"])
+    for i, path in enumerate(paths["image"][largest]):
+        with open(path, "wb") as f:
+            f.write(_png_bytes(*IMAGE_SIZES[i % len(IMAGE_SIZES)], idat_cache))
+    for path in paths["audio"][largest]:
+        with wave.open(path, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(1)
+            w.setframerate(8000)
+            w.writeframes(b"\x80" * 8000 * AUDIO_SECONDS)
+    for path in paths["video"][largest]:
+        with open(path, "wb") as f:
+            f.write(_mp4_bytes(rng.randint(5000, 600000)))
+    for members, path in paths["zip"].items():
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+            for i in range(members):
+                archive.writestr(f"docs/doc-{i:05d}.txt", _text_block(rng, ARCHIVE_MEMBER_BYTES))
+    for members, path in paths["targz"].items():
+        with tarfile.open(path, "w:gz") as archive:
+            for i in range(members):
+                data = _text_block(rng, ARCHIVE_MEMBER_BYTES)
+                info = tarfile.TarInfo(f"docs/doc-{i:05d}.txt")
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+
+# --- Cases ---
+
+class Case:
+    """
+    One benchmark: setup(fixtures) builds the untimed state, run(state)
+    does the timed work and returns (items processed, bytes processed).
+    """
+
+    def __init__(self, name, group, setup, run, unit="items", **params):
+        self.name = name
+        self.group = group
+        self.setup = setup
+        self.run = run
+        self.unit = unit
+        self.params = params
+
+
+def _file_bytes(paths):
+    return sum(os.path.getsize(p) for p in paths)
+
+
+def _detect_setup(paths):
+    return lambda fixtures: list(paths)
+
+
+def _detect_run(paths):
+    from file_detect import detect_file
+    for path in paths:
+        with open(path, "rb") as f:
+            detect_file(path, f)
+    return len(paths), 0  # Only headers are read
+
+
+def _shipped_models():
+    from model_loader import load_models_from_csv
+    return load_models_from_csv()
+
+
+def _measure_setup(paths):
+    def setup(fixtures):
+        import estimator
+        return list(paths), estimator.tokenizer_names(_shipped_models())
+    return setup
+
+
+def _measure_run(state):
+    import estimator
+    paths, names = state
+    for path in paths:
+        estimator.measure_file(path, names)
+    return len(paths), _file_bytes(paths)
+
+
+def _assess_setup(paths):
+    def setup(fixtures):
+        import estimator
+        models = _shipped_models()
+        return list(paths), models, estimator.tokenizer_names(models)
+    return setup
+
+
+def _assess_run(state):
+    # What the GUI's AssessmentWorker does per Run Assessment click
+    import estimator
+    paths, models, names = state
+    for path in paths:
+        estimator.assess(estimator.measure_file(path, names), models, numeric=True)
+    return len(paths), _file_bytes(paths)
+
+
+def _price_setup(catalog_path):
+    def setup(fixtures):
+        import estimator
+        from model_loader import load_models_from_csv
+        models = load_models_from_csv(catalog_path)
+        names = estimator.tokenizer_names(models)
+        paths = fixtures["text"][min(fixtures["text"])], fixtures["code"][min(fixtures["code"])], fixtures["zip"][min(fixtures["zip"])]
+        for kind in ("image", "audio", "video"):
+            paths += tuple(fixtures[kind][max(fixtures[kind])][:PRICE_MEASUREMENTS_PER_KIND])
+        return models, [estimator.measure_file(path, names) for path in paths]
+    return setup
+
+
+def _price_scalar_run(state):
+    import estimator
+    models, measurements = state
+    for measurement in measurements:
+        estimator.assess(measurement, models)
+    return len(models) * len(measurements), 0
+
+
+def _price_matrix_run(state):
+    import cost_matrix
+    models, measurements = state
+    matrix = cost_matrix.compute_cost_matrix(measurements, models)
+    for i in range(len(measurements)):
+        matrix.assessment(i)
+    return len(models) * len(measurements), 0
+
+
+def _catalog_run(path):
+    def run(state):
+        from model_loader import load_models_from_csv
+        return len(load_models_from_csv(path, use_snapshot=False)), os.path.getsize(path)
+    return run
+
+
+def _snapshot_setup(path):
+    def setup(fixtures):
+        import catalog_snapshot
+        snapshot, _ = catalog_snapshot.compile_snapshot(path)
+        return snapshot
+    return setup
+
+
+def _snapshot_run(path):
+    def run(snapshot):
+        from model_loader import load_models_from_csv
+        models = load_models_from_csv(path)  # Hashes the CSV, then maps the snapshot
+        return len(models), os.path.getsize(snapshot)
+    return run
+
+
+def _table_setup(path):
+    def setup(fixtures):
+        from PySide6.QtCore import QCoreApplication
+        from model_loader import load_models_from_csv
+        app = QCoreApplication.instance() or QCoreApplication([])
+        return app, load_models_from_csv(path)
+    return setup
+
+
+def _table_run(state):
+    # Builds the model table as AMMApp does, then sorts by every column and filters
+    from PySide6.QtCore import Qt
+    from model_table import ModelTableModel, ModelSortProxy, SORT_COLUMNS
+    _, models = state
+    table_model = ModelTableModel(models)
+    proxy = ModelSortProxy(table_model)
+    for column in SORT_COLUMNS.values():
+        proxy.sort(column, Qt.AscendingOrder)
+        proxy.sort(column, Qt.DescendingOrder)
+    proxy.set_filter_text("gpt")
+    proxy.rowCount()
+    proxy.set_filter_text("")
+    return len(models), 0
+
+
+def _export_setup(fmt, rows):
+    def setup(fixtures):
+        import estimator
+        import result_export
+        package = {"xlsx": "openpyxl", "parquet": "pyarrow"}.get(fmt)
+        if package is not None:
+            __import__(package)  # ImportError marks the case skipped
+        models = _shipped_models()
+        measurement = estimator.measure_file(fixtures["text"][min(fixtures["text"])], estimator.tokenizer_names(models))
+        template, _ = estimator.assess(measurement, models, numeric=True)
+        out_dir = tempfile.mkdtemp(prefix="amm-bench-export-")
+        return result_export, template, rows, os.path.join(out_dir, f"results.{fmt}")
+    return setup
+
+
+def _export_run(state):
+    result_export, template, rows, path = state
+    generated = ({"File": f"/bench/file-{i // len(template):07d}", **template[i % len(template)]} for i in range(rows))
+    count = result_export.export_rows(generated, path)
+    return count, os.path.getsize(path)
+
+
+def _startup_run(state):
+    import startup_bench
+    timings, _ = startup_bench.run_once()
+    return 1, 0, timings
+
+
+def _server_setup(fixtures):
+    # The server runs in its own interpreter so the client doesn't share its event loop
+    proc = subprocess.Popen([sys.executable, os.path.join(SCRIPT_DIR, "estimate_server.py"), "--port", "0"],
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, cwd=SCRIPT_DIR)
+    atexit.register(proc.kill)
+    for line in proc.stderr:
+        if "Serving estimates" in line:
+            port = int(line.rsplit(":", 1)[1])
+            break
+    else:
+        raise RuntimeError(f"estimate_server.py failed to start (exit {proc.wait()}).")
+    bodies = [json.dumps(request).encode('utf-8') for request in (
+        {"bytes": 12345},
+        {"text": " ".join(_WORDS[:200])},
+        {"bytes": 3 * MB, "file_type": "Video", "duration_seconds": 95},
+        {"bytes": 250 * KB, "file_type": "Image", "width": 1920, "height": 1080},
+    )]
+    return port, [f"POST /estimate HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\n\r\n".encode('latin-1') + body for body in bodies]
+
+
+def _server_run(state):
+    port, messages = state
+
+    async def client(count, offset):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        received = 0
+        for i in range(count):
+            writer.write(messages[(offset + i) % len(messages)])
+            head = await reader.readuntil(b"\r\n\r\n")
+            if not head.startswith(b"HTTP/1.1 200"):
+                raise RuntimeError(f"estimate_server answered {head.splitlines()[0]!r}")
+            length = int(head.lower().split(b"content-length:")[1].split(b"\r\n")[0])
+            received += len(await reader.readexactly(length))
+        writer.close()
+        return received
+
+    async def run():
+        per_connection = SERVER_REQUESTS // SERVER_CONNECTIONS
+        return sum(await asyncio.gather(*(client(per_connection, i) for i in range(SERVER_CONNECTIONS)))), per_connection * SERVER_CONNECTIONS
+
+    received, sent = asyncio.run(run())
+    return sent, received
+
+
+def build_cases(fixtures, sizes):
+    """All cases for a fixture set, in run order."""
+    cases = []
+    for rows, path in fixtures["catalog"].items():
+        cases.append(Case(f"catalog_load/{size_label(rows)}", "catalog_load", lambda fixtures: None, _catalog_run(path), "rows", rows=rows))
+    for rows, path in fixtures["catalog"].items():
+        cases.append(Case(f"catalog_snapshot/{size_label(rows)}", "catalog_load", _snapshot_setup(path), _snapshot_run(path), "rows", rows=rows))
+    for rows, path in fixtures["catalog"].items():
+        cases.append(Case(f"model_table/{size_label(rows)}", "model_table", _table_setup(path), _table_run, "rows", rows=rows))
+    corpora = []
+    for kind in ("text", "code"):
+        corpora += [(f"{kind}-{size_label(size, 'B')}", [path], dict(kind=kind, bytes=size)) for size, path in fixtures[kind].items()]
+    for kind in ("image", "audio", "video"):
+        corpora += [(f"{kind}-{size_label(n)}", paths, dict(kind=kind, files=n)) for n, paths in fixtures[kind].items()]
+    for kind in ("zip", "targz"):
+        corpora += [(f"{kind}-{size_label(n)}", [path], dict(kind=kind, members=n)) for n, path in fixtures[kind].items()]
+    for label, paths, params in corpora:
+        cases.append(Case(f"detect/{label}", "detect", _detect_setup(paths), _detect_run, "files", **params))
+    for label, paths, params in corpora:
+        cases.append(Case(f"measure/{label}", "measure", _measure_setup(paths), _measure_run, "files", **params))
+    for label, paths, params in corpora:
+        cases.append(Case(f"assess/{label}", "assess", _assess_setup(paths), _assess_run, "files", **params))
+    price_rows = PRICE_CATALOG_ROWS if PRICE_CATALOG_ROWS in fixtures["catalog"] else max(fixtures["catalog"])
+    cases.append(Case(f"price_scalar/{size_label(price_rows)}", "price", _price_setup(fixtures["catalog"][price_rows]), _price_scalar_run, "pairs", models=price_rows))
+    for rows, path in fixtures["catalog"].items():
+        cases.append(Case(f"price_matrix/{size_label(rows)}", "price", _price_setup(path), _price_matrix_run, "pairs", models=rows))
+    for fmt in ("csv", "jsonl", "xlsx", "parquet"):
+        for rows in sizes["export_rows"]:
+            cases.append(Case(f"export/{fmt}-{size_label(rows)}", "export", _export_setup(fmt, rows), _export_run, "rows", format=fmt, rows=rows))
+    cases.append(Case("startup/window", "startup", lambda fixtures: None, _startup_run, "launches"))
+    cases.append(Case("server/estimate", "server", _server_setup, _server_run, "requests", connections=SERVER_CONNECTIONS))
+    return cases
+
+
+def run_case(case, fixtures, repeat):
+    """Runs one case in this process and returns its result dict."""
+    result = {"name": case.name, "group": case.group, "unit": case.unit, "params": case.params}
+    try:
+        state = case.setup(fixtures)
+    except ImportError as e:
+        return dict(result, skipped=f"missing dependency: {e}")
+    setup_peak = peak_rss_mb()
+    seconds = []
+    items = size = 0
+    extra = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        outcome = case.run(state)
+        seconds.append(time.perf_counter() - start)
+        items, size = outcome[0], outcome[1]
+        if len(outcome) > 2:
+            extra = outcome[2]
+    best = min(seconds)
+    result.update({
+        "items": items,
+        "bytes": size,
+        "seconds": seconds,
+        "min_seconds": best,
+        "median_seconds": statistics.median(seconds),
+        "items_per_second": items / best if best else None,
+        "mb_per_second": size / MB / best if best and size else None,
+        "setup_peak_rss_mb": setup_peak,
+        "peak_rss_mb": peak_rss_mb(),
+    })
+    if extra is not None:
+        result["details"] = extra
+    return result
+
+
+def _git_revision():
+    try:
+        proc = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=SCRIPT_DIR, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return proc.stdout.strip() or None
+
+
+def _load_fixture_set(root):
+    with open(os.path.join(root, "fixtures.json"), encoding="utf-8") as f:
+        sizes = json.load(f)["sizes"]
+    return fixture_paths(root, sizes), sizes
+
+
+def run_suite(root, patterns, repeat, log=sys.stderr):
+    """Runs the matching cases, each in a fresh interpreter, and returns their results."""
+    fixtures, sizes = _load_fixture_set(root)
+    results = []
+    for case in build_cases(fixtures, sizes):
+        if patterns and not any(fnmatch.fnmatch(case.name, pattern) for pattern in patterns):
+            continue
+        print(f"[INFO] {case.name} ...", file=log, flush=True)
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), "--run-case", case.name, "--fixtures", root, "--repeat", str(repeat)],
+                              capture_output=True, text=True, cwd=SCRIPT_DIR)
+        lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+        if proc.returncode != 0 or not lines:
+            print(f"[ERROR] {case.name} failed (exit {proc.returncode}).", file=log)
+            results.append({"name": case.name, "group": case.group, "error": proc.stderr.strip()[-2000:]})
+            continue
+        results.append(json.loads(lines[-1]))
+    return results
+
+
+def compare(base_path, new_path, threshold):
+    """
+    Prints throughput and peak RSS of two result files side by side.
+
+    Returns:
+        int: 1 if a case present in both got slower than threshold (a
+             fraction, e.g. 0.2 for 20 %), else 0.
+    """
+    with open(base_path, encoding="utf-8") as f:
+        base = {case["name"]: case for case in json.load(f)["cases"]}
+    with open(new_path, encoding="utf-8") as f:
+        new = json.load(f)["cases"]
+    regressed = False
+    print(f"{'case':34} {'base/s':>12} {'new/s':>12} {'change':>8} {'base MB':>8} {'new MB':>8}")
+    for case in new:
+        old = base.get(case["name"])
+        if old is None or not old.get("items_per_second") or not case.get("items_per_second"):
+            continue
+        change = case["items_per_second"] / old["items_per_second"] - 1
+        flag = ""
+        if change < -threshold:
+            flag = "  SLOWER"
+            regressed = True
+        print(f"{case['name']:34} {old['items_per_second']:12.1f} {case['items_per_second']:12.1f} {change:+8.1%} "
+              f"{old.get('peak_rss_mb') or 0:8.1f} {case.get('peak_rss_mb') or 0:8.1f}{flag}")
+    return 1 if regressed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmarks AMM's hot paths on synthetic fixtures and writes the results as JSON.")
+    parser.add_argument("--output", default="-", help="Results JSON file (default: stdout).")
+    parser.add_argument("--filter", action="append", help="Only run cases whose name matches this glob, e.g. 'measure/*' (repeatable).")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per case (default 3).")
+    parser.add_argument("--quick", action="store_true", help="Smaller fixtures (no 100k-row catalog or 64 MB files).")
+    parser.add_argument("--fixtures", help="Fixture directory to reuse (generated there if missing). Default: a temporary directory.")
+    parser.add_argument("--list", action="store_true", help="List the case names and exit.")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NEW"), help="Compare two results files instead of running.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="With --compare, exit 1 if any case lost more than this fraction of its throughput (default 0.2).")
+    parser.add_argument("--run-case", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(args.compare[0], args.compare[1], args.threshold)
+    if args.run_case:
+        fixtures, sizes = _load_fixture_set(args.fixtures)
+        case = next(case for case in build_cases(fixtures, sizes) if case.name == args.run_case)
+        print(json.dumps(run_case(case, fixtures, args.repeat)))
+        return 0
+
+    sizes = QUICK_SIZES if args.quick else FULL_SIZES
+    if args.list:
+        for case in build_cases(fixture_paths("", sizes), sizes):
+            print(case.name)
+        return 0
+    root = args.fixtures or tempfile.mkdtemp(prefix="amm-bench-")
+    try:
+        print(f"[INFO] Building fixtures in {root} ...", file=sys.stderr, flush=True)
+        build_fixtures(root, sizes)
+        cases = run_suite(root, args.filter, args.repeat)
+    finally:
+        if not args.fixtures:
+            shutil.rmtree(root, ignore_errors=True)
+    results = {
+        "format": RESULTS_FORMAT,
+        "version": RESULTS_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "quick": args.quick,
+        "repeat": args.repeat,
+        "fixture_sizes": sizes,
+        "cases": cases,
+    }
+    text = json.dumps(results, indent=2)
+    if args.output == "-":
+        print(text)
+    else:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    return 1 if any("error" in case for case in cases) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
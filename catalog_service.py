@@ -0,0 +1,113 @@
+import os
+import threading
+
+from model_loader import load_models_from_csv, catalog_revision, ModelCatalog, CSV_PATH
+
+# --- Hot-reloading model catalog ---
+# Keeps one ModelCatalog in step with model_reference.csv while the app (or a
+# long-running service) is up. poll() is a single stat() when nothing changed;
+# only a new size/mtime leads to a re-parse, and the result is applied as a
+# row-level diff (ModelCatalog.reconcile), so unchanged model records - and
+# whatever the caller built from them - are left alone. Loads go through the
+# binary snapshot (catalog_snapshot.py) when it matches the CSV, and a CSV
+# that had to be parsed gets a fresh snapshot for next time.
+
+POLL_INTERVAL = 2.0  # Seconds between checks of the CSV
+
+
+def _stat_signature(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_size, st.st_mtime_ns, st.st_ino)
+
+
+class CatalogService:
+    """
+    Owns the live model catalog and reloads it when the CSV changes.
+
+    Args:
+        csv_path (str): Catalog CSV to load and watch.
+        load (bool): Parse the CSV now. With False the catalog starts empty
+                     and load() fills it later, e.g. from a background
+                     thread so a window can show first.
+    """
+
+    def __init__(self, csv_path=CSV_PATH, load=True):
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._signature = None
+        self.revision = None
+        self.catalog = ModelCatalog()
+        self._thread = None
+        self._stop_event = threading.Event()
+        if load:
+            self.load()
+
+    def load(self):
+        """
+        Parses the CSV into self.catalog unconditionally (in place, like poll).
+
+        Returns:
+            CatalogDiff: The rows added/changed/removed (falsy if none, e.g.
+                         when the file could not be loaded).
+        """
+        with self._lock:
+            self._signature = _stat_signature(self.csv_path)
+            self.revision = catalog_revision(self.csv_path)
+            return self.catalog.reconcile(load_models_from_csv(self.csv_path, write_snapshot=True))
+
+    def poll(self):
+        """
+        Checks the CSV once and applies any row changes to self.catalog.
+
+        Returns:
+            CatalogDiff: The applied changes, or None if the file is unchanged
+                         (or was changed but could not be loaded).
+        """
+        with self._lock:
+            signature = _stat_signature(self.csv_path)
+            if signature == self._signature:
+                return None
+            self._signature = signature
+            revision = catalog_revision(self.csv_path)
+            if revision is None or revision == self.revision:
+                return None  # Missing (mid-save) or touched without changes
+            fresh = load_models_from_csv(self.csv_path, write_snapshot=True)
+            if not fresh:
+                print(f"[WARNING] Reloaded catalog {self.csv_path} has no models; keeping the current ones.")
+                return None
+            self.revision = revision
+            diff = self.catalog.reconcile(fresh)
+            if diff:
+                print(f"[INFO] Model catalog reloaded: {len(diff.added)} added, {len(diff.removed)} removed, {len(diff.changed)} changed.")
+            return diff
+
+    def start(self, on_change=None, interval=POLL_INTERVAL):
+        """
+        Polls from a background thread (for headless services; the GUI polls
+        from a QTimer instead). on_change(diff) is called after each reload
+        that changed something.
+        """
+        if self._thread is not None:
+            return
+        self._stop_event.clear()
+
+        def watch():
+            while not self._stop_event.wait(interval):
+                try:
+                    diff = self.poll()
+                except Exception as e:
+                    print(f"[ERROR] Catalog reload failed: {e}")
+                    continue
+                if diff and on_change is not None:
+                    on_change(diff)
+        self._thread = threading.Thread(target=watch, name="catalog-watch", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
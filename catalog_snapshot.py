@@ -0,0 +1,273 @@
+import argparse
+import gc
+import hashlib
+import mmap
+import os
+import struct
+import sys
+
+from model_loader import CSV_COLUMNS, CSV_PATH, ModelRecord, ModelCatalog, parse_capabilities, _parse_api_types, _parse_float, _parse_int, _parse_keyword
+
+# --- Binary catalog snapshot ---
+# A compiled copy of model_reference.csv that loads without parsing text:
+# every CSV column is one fixed-width little-endian array (int64 / float64
+# with a validity byte array, or uint32 indexes into an interned string
+# table). Sections are 8-byte aligned, so the file can be mmap'ed and each
+# column read with a single memoryview cast. The capability and eligibility
+# masks are not stored: they are derived from the values on every load, so a
+# code update that changes those rules can't be undone by an old snapshot.
+#
+#   python catalog_snapshot.py                 # compiles model_reference.snapshot
+#   python catalog_snapshot.py --check         # is the snapshot current?
+#
+# The header records the SHA-256 of the CSV bytes it was built from and a
+# digest of CSV_COLUMNS. load_models_from_csv only uses the snapshot when
+# both match (any edit to the CSV or to the column schema falls back to
+# parsing the CSV). CatalogService rewrites the snapshot after such a parse.
+#
+# Layout: header | section table (offset, length as uint64 pairs) | sections:
+#   string offsets (uint32 x strings+1) | string bytes (UTF-8)
+#   per column: values (uint32 / int64 / float64 x rows) [+ validity (uint8 x rows)]
+
+MAGIC = b"AMMCSNAP"
+SNAPSHOT_VERSION = 2
+SNAPSHOT_EXTENSION = ".snapshot"
+
+_HEADER = struct.Struct("<8sI32s16sII")  # magic, version, source sha256, schema digest, rows, strings
+_SECTION = struct.Struct("<QQ")
+_NO_STRING = 0xFFFFFFFF
+_TUPLE_SEPARATOR = "\x1f"  # Joins api_types entries into one table string
+
+# Column kinds by parser: string / tuple of strings / nullable int64 / nullable float64
+_STRING, _TUPLE, _INT, _FLOAT = "s", "t", "q", "d"
+_KINDS = {str: _STRING, sys.intern: _STRING, _parse_keyword: _STRING, _parse_api_types: _TUPLE, _parse_int: _INT, _parse_float: _FLOAT}
+COLUMN_KINDS = tuple((attr, _KINDS[parse]) for attr, _, parse in CSV_COLUMNS)
+SCHEMA_DIGEST = hashlib.sha256(repr((SNAPSHOT_VERSION, COLUMN_KINDS)).encode('utf-8')).digest()[:16]
+
+
+def snapshot_path(csv_path=CSV_PATH):
+    """The snapshot that belongs to a catalog CSV (same name, .snapshot)."""
+    return os.path.splitext(csv_path)[0] + SNAPSHOT_EXTENSION
+
+
+def source_digest(data):
+    """SHA-256 of the CSV bytes, as stored in (and checked against) the header."""
+    return hashlib.sha256(data).digest()
+
+
+def _pad(n):
+    return -n % 8
+
+
+def encode_snapshot(catalog, digest):
+    """
+    Serializes a loaded catalog.
+
+    Args:
+        catalog (list): ModelRecords, e.g. load_models_from_csv(...,
+                        use_snapshot=False).
+        digest (bytes): source_digest() of the CSV it was loaded from.
+
+    Returns:
+        bytes: The snapshot file contents.
+
+    Raises:
+        OverflowError / struct.error: If a value doesn't fit its column width.
+    """
+    strings = {}
+
+    def intern(value):
+        if value is None:
+            return _NO_STRING
+        index = strings.get(value)
+        if index is None:
+            index = strings[value] = len(strings)
+        return index
+
+    sections = []
+    for attr, kind in COLUMN_KINDS:
+        values = [getattr(record, attr) for record in catalog]
+        if kind == _STRING:
+            sections.append(struct.pack(f"<{len(values)}I", *(intern(value) for value in values)))
+        elif kind == _TUPLE:
+            sections.append(struct.pack(f"<{len(values)}I", *(intern(None if value is None else _TUPLE_SEPARATOR.join(value)) for value in values)))
+        else:
+            sections.append(struct.pack(f"<{len(values)}{kind}", *(0 if value is None else value for value in values)))
+            sections.append(bytes(value is not None for value in values))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    offsets = [0]
+    for value in encoded:
+        offsets.append(offsets[-1] + len(value))
+    sections[:0] = [struct.pack(f"<{len(offsets)}I", *offsets), b"".join(encoded)]
+
+    header = _HEADER.pack(MAGIC, SNAPSHOT_VERSION, digest, SCHEMA_DIGEST, len(catalog), len(encoded))
+    position = len(header) + _SECTION.size * len(sections)
+    position += _pad(position)
+    table, body = [], []
+    for section in sections:
+        table.append(_SECTION.pack(position, len(section)))
+        body.append(section + b"\0" * _pad(len(section)))
+        position += len(section) + _pad(len(section))
+    prefix = header + b"".join(table)
+    return prefix + b"\0" * _pad(len(prefix)) + b"".join(body)
+
+
+def write_snapshot(catalog, digest, path):
+    """Writes encode_snapshot() to path atomically (temp file + rename)."""
+    data = encode_snapshot(catalog, digest)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
+
+
+def _read_column(view, section, fmt):
+    offset, length = section
+    with view[offset:offset + length] as raw, raw.cast(fmt) as typed:
+        return typed.tolist()
+
+
+def decode_snapshot(view, digest=None):
+    """
+    Rebuilds the ModelCatalog from snapshot bytes (any buffer, e.g. an mmap).
+
+    Returns:
+        ModelCatalog, or None if the buffer isn't a snapshot of this schema or,
+        when digest is given, was built from different CSV bytes.
+    """
+    if len(view) < _HEADER.size:
+        return None
+    magic, version, source, schema, rows, string_count = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != SNAPSHOT_VERSION or schema != SCHEMA_DIGEST or (digest is not None and source != digest):
+        return None
+    nullable = sum(1 for _, kind in COLUMN_KINDS if kind in (_INT, _FLOAT))
+    section_count = 2 + len(COLUMN_KINDS) + nullable
+    sections = [_SECTION.unpack_from(view, _HEADER.size + i * _SECTION.size) for i in range(section_count)]
+    if any(offset + length > len(view) for offset, length in sections):
+        return None
+    sections = iter(sections)
+
+    offsets = _read_column(view, next(sections), 'I')
+    blob_offset, _ = next(sections)
+    with view[blob_offset:blob_offset + offsets[-1]] as raw:
+        text = bytes(raw)
+    strings = [sys.intern(text[start:end].decode('utf-8')) for start, end in zip(offsets, offsets[1:])]
+    if len(strings) != string_count:
+        return None
+
+    columns = []
+    for _, kind in COLUMN_KINDS:
+        if kind == _STRING:
+            columns.append([None if index == _NO_STRING else strings[index] for index in _read_column(view, next(sections), 'I')])
+        elif kind == _TUPLE:
+            tuples = {}  # One shared tuple per distinct value, as interning would give
+            column = []
+            for index in _read_column(view, next(sections), 'I'):
+                value = tuples.get(index)
+                if value is None:
+                    value = tuples[index] = () if index == _NO_STRING or not strings[index] else tuple(sys.intern(item) for item in strings[index].split(_TUPLE_SEPARATOR))
+                column.append(value)
+            columns.append(column)
+        else:
+            values = _read_column(view, next(sections), kind)
+            valid = _read_column(view, next(sections), 'B')
+            columns.append([value if present else None for value, present in zip(values, valid)])
+    if any(len(column) != rows for column in columns):
+        return None
+    # api_types tuples are shared (see above), so each distinct one is parsed once
+    api_types = ModelRecord.FIELDS.index('api_types')
+    capabilities = {id(value): parse_capabilities(value) for value in columns[api_types]} if columns else {}
+    return ModelCatalog([ModelRecord.restore(i, values, capabilities[id(values[api_types])])
+                         for i, values in enumerate(zip(*columns))] if columns else [])
+
+
+def load_snapshot(path, digest=None):
+    """
+    Memory-maps and decodes a snapshot file.
+
+    Returns:
+        ModelCatalog, or None if the file is missing, stale (digest mismatch)
+        or not a readable snapshot; the caller then parses the CSV.
+    """
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None  # Missing, unreadable or empty
+    # Nothing built here can form a cycle; don't let the collector rescan
+    # the catalog over and over while a hundred thousand records are made
+    collecting = gc.isenabled()
+    gc.disable()
+    try:
+        with memoryview(mapped) as view:
+            return decode_snapshot(view, digest)
+    except (struct.error, ValueError, TypeError, UnicodeDecodeError, IndexError):
+        return None
+    finally:
+        if collecting:
+            gc.enable()
+        mapped.close()
+
+
+def compile_snapshot(csv_path=CSV_PATH, path=None):
+    """
+    Parses the CSV and writes its snapshot.
+
+    Returns:
+        tuple: (snapshot path, number of models).
+
+    Raises:
+        OSError: If the CSV can't be read or the snapshot can't be written.
+        ValueError: If the CSV has no loadable models.
+    """
+    from model_loader import load_models_from_csv
+
+    with open(csv_path, 'rb') as f:
+        data = f.read()
+    catalog = load_models_from_csv(csv_path, use_snapshot=False, data=data)
+    if not catalog:
+        raise ValueError(f"No models could be loaded from {csv_path}.")
+    path = path or snapshot_path(csv_path)
+    write_snapshot(catalog, source_digest(data), path)
+    return path, len(catalog)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compiles the model catalog CSV into a binary snapshot that loads without parsing.")
+    parser.add_argument("csv", nargs="?", default=CSV_PATH, help="Catalog CSV (default: model_reference.csv next to this script).")
+    parser.add_argument("--output", help="Snapshot path (default: the CSV path with a .snapshot extension).")
+    parser.add_argument("--check", action="store_true", help="Only report whether the snapshot matches the CSV (exit 1 if not).")
+    args = parser.parse_args(argv)
+    path = args.output or snapshot_path(args.csv)
+
+    if args.check:
+        try:
+            with open(args.csv, 'rb') as f:
+                digest = source_digest(f.read())
+        except OSError as e:
+            print(f"[ERROR] Could not read {args.csv}: {e}", file=sys.stderr)
+            return 1
+        catalog = load_snapshot(path, digest)
+        if catalog is None:
+            print(f"{path} is missing or out of date.")
+            return 1
+        print(f"{path} is current ({len(catalog)} models).")
+        return 0
+
+    try:
+        path, count = compile_snapshot(args.csv, path)
+    except (OSError, ValueError, OverflowError, struct.error) as e:
+        print(f"[ERROR] Could not compile {args.csv}: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {path} ({count} models, {os.path.getsize(path)} bytes).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,333 @@
+import argparse
+import collections
+import csv
+import fnmatch
+import json
+import os
+import re
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import estimator
+import tokenizer_registry
+from file_detect import detect_file
+from file_stream import scan_text_stream
+from model_loader import load_models_from_csv, CSV_PATH, FILE_TYPE_BITS
+from pdf_probe import probe_pdf
+
+# --- Context-window chunk planner ---
+# Splits an input that is too big for one call into calls that each fit a
+# model's 'Max Tokens per Call', leaving room for the response, optionally
+# repeating the end of each call at the start of the next (overlap). Split
+# points are found while the text streams past: text is counted a block at a
+# time while the open call has room, and word by word only around a split,
+# so planning is one linear pass whatever the file size.
+#
+#   python chunk_planner.py big.txt --overlap 200 --calls
+#
+# Cuts are only made where StreamingCounter may cut (before a space that
+# follows a non-space character), so the per-call counts add up to what the
+# tokenizer gives for the whole text.
+
+BLOCK_CHARS = 16384         # Text counted at once while the open call has room
+MAX_CARRY_CHARS = tokenizer_registry.MAX_CARRY_CHARS
+
+_WORD_SPLIT_RE = re.compile(r'(?<=\S)(?= )')
+
+PLAN_COLUMNS = ["Company", "Model", "Version", "Max Tokens per Call", "Call", "Start Char", "End Char", "Send Tokens", "Overlap Tokens", "Get Tokens", "Total Tokens", "Total Cost (USD)"]
+
+
+def _last_boundary(text, end):
+    """Last position <= end where text may be cut (0 if none)."""
+    cut = end
+    while True:
+        cut = text.rfind(' ', 0, cut)
+        if cut <= 0 or not text[cut - 1].isspace():
+            return max(cut, 0)
+
+
+class CallPlanner:
+    """
+    Splits a text fed in pieces into calls of at most budget input tokens.
+
+    Args:
+        tokenizer_name (str): Tokenizer to count with (see tokenizer_registry).
+        budget (int): Input tokens allowed per call.
+        overlap (int): Tokens from the end of each call repeated at the
+                       start of the next; must be under half the budget.
+
+    Attributes:
+        calls (list): (start char, end char, input tokens, overlap tokens)
+                      per call, filled in as the text is fed; complete
+                      after finish().
+    """
+
+    def __init__(self, tokenizer_name, budget, overlap=0):
+        if budget < 1 or overlap < 0 or overlap * 2 >= budget:
+            raise ValueError(f"overlap ({overlap}) must be under half the call budget ({budget})")
+        self.tokenizer_name = tokenizer_name
+        self.budget = budget
+        self.overlap = overlap
+        # The byte heuristic floors per piece, so count bytes and convert per call
+        self._scale = tokenizer_registry.BYTES_PER_TOKEN if tokenizer_name == tokenizer_registry.HEURISTIC_NAME else 1
+        self._capacity = budget * self._scale
+        self._overlap_units = overlap * self._scale
+        self.calls = []
+        self._carry = ""
+        self._pos = 0           # Characters placed into calls so far
+        self._start = 0         # Start character of the open call
+        self._used = 0          # Units in the open call
+        self._overlap_used = 0  # Units of the open call repeated from the previous one
+        self._tail = collections.deque()  # (text, units) at the end of the open call, for the next overlap
+        self._tail_units = 0
+
+    def _units(self, text):
+        if self._scale != 1:
+            return len(text.encode('utf-8'))
+        return tokenizer_registry.REGISTRY.count(text, self.tokenizer_name)
+
+    def feed(self, text):
+        text = self._carry + text
+        cut = _last_boundary(text, len(text))
+        if cut <= 0:
+            if len(text) < MAX_CARRY_CHARS:
+                self._carry = text
+                return
+            cut = len(text)  # No whitespace in sight; place it to keep memory bounded
+        self._carry = text[cut:]
+        start = 0
+        while start < cut:
+            end = min(cut, start + BLOCK_CHARS)
+            if end < cut:
+                boundary = _last_boundary(text, end)
+                end = boundary if boundary > start else cut
+            self._add_block(text[start:end])
+            start = end
+
+    def finish(self):
+        """Places any remaining text and closes the last call; returns self.calls."""
+        if self._carry:
+            self._add_block(self._carry)
+            self._carry = ""
+        if self._used > self._overlap_used or not self.calls:
+            self._close()
+        return self.calls
+
+    def _add_block(self, block):
+        units = self._units(block)
+        if self._used + units <= self._capacity:
+            self._append(block, units)
+            return
+        for word in _WORD_SPLIT_RE.split(block):
+            if word:
+                self._add_word(word)
+
+    def _add_word(self, word):
+        units = self._units(word)
+        if self._used + units > self._capacity and self._used > self._overlap_used:
+            self._close()
+        if self._used + units <= self._capacity or len(word) == 1:
+            self._append(word, units)
+            return
+        # A run without spaces longer than a call: split it (prefer a line break)
+        middle = word.rfind('\n', 0, len(word) // 2 + 1) + 1
+        if not 0 < middle < len(word):
+            middle = len(word) // 2
+        self._add_word(word[:middle])
+        self._add_word(word[middle:])
+
+    def _append(self, text, units):
+        self._used += units
+        self._pos += len(text)
+        if self._overlap_units:
+            self._tail.append((text, units))
+            self._tail_units += units
+            while self._tail and self._tail_units - self._tail[0][1] >= self._overlap_units:
+                self._tail_units -= self._tail.popleft()[1]
+
+    def _close(self):
+        self.calls.append((self._start, self._pos, int(self._used / self._scale), int(self._overlap_used / self._scale)))
+        # Carry the last overlap's worth of words into the next call
+        words = []
+        units = 0
+        for text, _ in reversed(self._tail):
+            if units >= self._overlap_units:
+                break
+            for word in reversed(_WORD_SPLIT_RE.split(text)):
+                if units >= self._overlap_units:
+                    break
+                if word:
+                    words.append((word, self._units(word)))
+                    units += words[-1][1]
+        words.reverse()
+        self._tail = collections.deque(words)
+        self._tail_units = units
+        self._start = self._pos - sum(len(word) for word, _ in words)
+        self._used = self._overlap_used = units
+
+
+class CallPlan:
+    """
+    The calls one model needs for an input, with their token counts and costs.
+
+    Attributes:
+        model (dict): The model.
+        budget (int): Input tokens allowed per call.
+        calls (list): (start char, end char, input tokens, overlap tokens)
+                      per call; character offsets are into the text that
+                      was planned (a PDF's extracted text for PDFs).
+    """
+
+    def __init__(self, model, budget, calls):
+        self.model = model
+        self.budget = budget
+        self.calls = calls
+
+    def call_rows(self):
+        """One row per call keyed by PLAN_COLUMNS."""
+        model = self.model
+        rows = []
+        for number, (start, end, input_tokens, overlap_tokens) in enumerate(self.calls, start=1):
+            send_tokens, get_tokens = estimator.estimate_text_tokens(0, input_tokens)
+            cost = (send_tokens / 1000000) * model['input_cost'] + (get_tokens / 1000000) * model['output_cost']
+            rows.append({
+                "Company": model['company'],
+                "Model": model['model'],
+                "Version": model['version'],
+                "Max Tokens per Call": model['max_tokens'],
+                "Call": number,
+                "Start Char": start,
+                "End Char": end,
+                "Send Tokens": send_tokens,
+                "Overlap Tokens": overlap_tokens,
+                "Get Tokens": get_tokens,
+                "Total Tokens": send_tokens + get_tokens,
+                "Total Cost (USD)": cost,
+            })
+        return rows
+
+    def totals(self, rows=None):
+        """Row keyed by PLAN_COLUMNS summing every call ('Call' holds the call count)."""
+        rows = self.call_rows() if rows is None else rows
+        total = {key: rows[0][key] for key in ("Company", "Model", "Version", "Max Tokens per Call")}
+        total.update({"Call": len(rows), "Start Char": rows[0]["Start Char"], "End Char": rows[-1]["End Char"]})
+        for key in ("Send Tokens", "Overlap Tokens", "Get Tokens", "Total Tokens", "Total Cost (USD)"):
+            total[key] = sum(row[key] for row in rows)
+        return total
+
+
+def _plannable(model):
+    return estimator.model_eligible_types(model) & FILE_TYPE_BITS['Text']
+
+
+def plan_stream(feed_text, models, overlap=0, output_reserve=None):
+    """
+    Plans the calls for a text against several models in one pass.
+
+    Models that share a tokenizer and a budget share one CallPlanner, and
+    token counts of identical blocks are shared through the registry's
+    count cache.
+
+    Args:
+        feed_text (callable): feed_text(consumers) streams the text, calling
+                              every consumer with each piece in order.
+        models (list): Catalog models.
+        overlap (int): Overlap tokens between consecutive calls.
+        output_reserve (int): See estimator.call_budget.
+
+    Returns:
+        tuple: (plans, unsupported_models) where plans is a list of
+               CallPlans and unsupported_models lists "Company - Model" for
+               models without text pricing or max_tokens, or whose budget
+               is too small for the overlap.
+    """
+    planners = {}
+    jobs = []
+    unsupported_models = []
+    for model in models:
+        budget = estimator.call_budget(model, output_reserve) if _plannable(model) else None
+        if budget is None or overlap * 2 >= budget:
+            unsupported_models.append(f"{model['company']} - {model['model']}")
+            continue
+        key = (tokenizer_registry.REGISTRY.name_for(model), budget)
+        if key not in planners:
+            planners[key] = CallPlanner(key[0], budget, overlap)
+        jobs.append((model, planners[key]))
+    feed_text([planner.feed for planner in planners.values()])
+    for planner in planners.values():
+        planner.finish()
+    return [CallPlan(model, planner.budget, planner.calls) for model, planner in jobs], unsupported_models
+
+
+def plan_text(text, models, overlap=0, output_reserve=None):
+    """plan_stream over an in-memory text (e.g. the GUI text box)."""
+    def feed_text(consumers):
+        for consume in consumers:
+            consume(text)
+    return plan_stream(feed_text, models, overlap, output_reserve)
+
+
+def plan_file(path, models, overlap=0, output_reserve=None):
+    """
+    plan_stream over a text, code or PDF file, read once in chunks.
+
+    Raises:
+        ValueError: For other file types (they are not priced by tokens).
+        UnicodeDecodeError: If a text file is not valid UTF-8.
+    """
+    with open(path, 'rb') as f:
+        descriptor = detect_file(path, f)
+        f.seek(0)
+        if descriptor.file_type == 'PDF':
+            return plan_stream(lambda consumers: probe_pdf(f, consumers), models, overlap, output_reserve)
+        if descriptor.is_binary:
+            raise ValueError(f"{descriptor.file_type} files are not priced by tokens and can't be chunked")
+        return plan_stream(lambda consumers: scan_text_stream(f, consumers=consumers), models, overlap, output_reserve)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plans the calls needed to send a text, code or PDF file to each model within its max tokens per call.")
+    parser.add_argument("path", help="File to plan ('-' reads text from stdin).")
+    parser.add_argument("--catalog", default=CSV_PATH, help="Model reference CSV (default: model_reference.csv next to this script).")
+    parser.add_argument("--model", action="append", help="Only plan models whose 'Company - Model' matches this glob (repeatable).")
+    parser.add_argument("--overlap", type=int, default=0, help="Tokens repeated from the end of each call at the start of the next (default 0).")
+    parser.add_argument("--output-reserve", type=int, help="Tokens reserved per call for the response (default: room for the estimated response).")
+    parser.add_argument("--calls", action="store_true", help="Emit a row per call as well as each model's total.")
+    parser.add_argument("--format", choices=["csv", "jsonl"], default="csv", help="Output format (default: csv).")
+    args = parser.parse_args(argv)
+
+    models = load_models_from_csv(args.catalog)
+    if args.model:
+        models = [m for m in models if any(fnmatch.fnmatch(f"{m['company']} - {m['model']}".lower(), pattern.lower()) for pattern in args.model)]
+    if not models:
+        print("[ERROR] No models to plan for.", file=sys.stderr)
+        return 1
+    try:
+        if args.path == '-':
+            plans, unsupported = plan_text(sys.stdin.read(), models, args.overlap, args.output_reserve)
+        else:
+            plans, unsupported = plan_file(args.path, models, args.overlap, args.output_reserve)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Could not plan {args.path}: {e}", file=sys.stderr)
+        return 1
+    for label in unsupported:
+        print(f"[INFO] Skipping {label}: no text pricing, or max tokens too small for the overlap.", file=sys.stderr)
+
+    writer = csv.DictWriter(sys.stdout, fieldnames=PLAN_COLUMNS) if args.format == "csv" else None
+    if writer is not None:
+        writer.writeheader()
+    for plan in plans:
+        rows = plan.call_rows()
+        out_rows = (rows if args.calls else []) + [dict(plan.totals(rows), Call=f"total ({len(rows)} calls)")]
+        for row in out_rows:
+            row = dict(row, **{"Total Cost (USD)": f"${row['Total Cost (USD)']:.6f}"})
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                sys.stdout.write(json.dumps(row) + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
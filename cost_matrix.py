@@ -0,0 +1,281 @@
+import numpy as np
+
+import estimator
+import tokenizer_registry
+from model_loader import FILE_TYPE_BITS, IMAGE_METHOD_TILES, has_image_token_formula
+
+# --- Vectorized file x model pricing ---
+# Prices N measured inputs against M models in one pass. Model prices and
+# capability flags are loaded into NumPy arrays once (ModelArrays); pricing a
+# block of files is then a handful of broadcast operations instead of a Python
+# loop per (file, model) pair. The numbers match estimator.price_model exactly.
+
+NO_TOKENS = -1  # Token cell value where the original table shows 'Not Supported'
+
+FILE_TYPE_CODES = {'Text': 0, 'Code': 1, 'Video': 2, 'Audio': 3, 'Image': 4, 'PDF': 5}
+UNKNOWN_TYPE_CODE = -1  # Archive (priced per cell from its members) and Unknown
+
+
+def _cost_array(models, key):
+    """Per-model price column as float64, with NaN where the CSV cell was empty."""
+    return np.array([np.nan if m.get(key) is None else m[key] for m in models], dtype=np.float64)
+
+
+def _param_array(models, key):
+    """Per-model image formula parameter as float64, with 0 where the CSV cell was empty."""
+    return np.array([m.get(key) or 0 for m in models], dtype=np.float64)
+
+
+class ModelArrays:
+    """
+    Column-oriented copy of a model list, built once and reused for every block.
+
+    Args:
+        models (list): Models as returned by load_models_from_csv.
+    """
+
+    def __init__(self, models):
+        self.models = list(models)
+        self.input_cost = _cost_array(self.models, 'input_cost')
+        self.output_cost = _cost_array(self.models, 'output_cost')
+        self.video_cost = _cost_array(self.models, 'video_cost')
+        self.audio_cost = _cost_array(self.models, 'audio_cost')
+        self.image_cost = _cost_array(self.models, 'image_cost')
+
+        # Image token formula (estimator.image_input_tokens) parameters
+        self.image_formula = np.array([has_image_token_formula(m) for m in self.models], dtype=bool)
+        self.image_tiles = self.image_formula & np.array([m.get('image_token_method') == IMAGE_METHOD_TILES for m in self.models], dtype=bool)
+        self.image_tile_size = _param_array(self.models, 'image_tile_size')
+        self.image_tokens_per_tile = _param_array(self.models, 'image_tokens_per_tile')
+        self.image_base_tokens = _param_array(self.models, 'image_base_tokens')
+        self.image_max_side = _param_array(self.models, 'image_max_side')
+        self.image_short_side = _param_array(self.models, 'image_short_side')
+        self.image_pixels_per_token = _param_array(self.models, 'image_pixels_per_token')
+
+        # Eligibility per file type code (rows line up with FILE_TYPE_CODES)
+        eligible = np.array([estimator.model_eligible_types(m) for m in self.models], dtype=np.int64)
+        self.supported = np.vstack([(eligible & FILE_TYPE_BITS[file_type]) != 0 for file_type in FILE_TYPE_CODES]) if self.models else np.zeros((len(FILE_TYPE_CODES), 0), dtype=bool)
+
+        # Static text columns of a result row, formatted once per model
+        self.row_prefix = [{
+            "Company": m['company'],
+            "Model": m['model'],
+            "Version": m['version'],
+        } for m in self.models]
+        self.row_api_types = [", ".join(m['api_types']) for m in self.models]
+        self.row_max_tokens = [m['max_tokens'] if m['max_tokens'] is not None else estimator.NOT_SUPPORTED for m in self.models]
+        self.row_max_tokens_numeric = [m['max_tokens'] for m in self.models]
+        # Input tokens per call (estimator.call_budget), 0 where there is none
+        self.call_budget = np.array([estimator.call_budget(m) or 0 for m in self.models], dtype=np.int64)
+        self.labels = [f"{m['company']} - {m['model']}" for m in self.models]
+
+        # Model columns per tokenizer that counts real text (the rest use the byte heuristic)
+        self.tokenizer_columns = {}
+        for j, m in enumerate(self.models):
+            name = tokenizer_registry.REGISTRY.name_for(m)
+            if name != tokenizer_registry.HEURISTIC_NAME:
+                self.tokenizer_columns.setdefault(name, []).append(j)
+        self.tokenizer_columns = {name: np.array(cols, dtype=np.int64) for name, cols in self.tokenizer_columns.items()}
+
+    def __len__(self):
+        return len(self.models)
+
+
+def _image_input_tokens(ma, width, height):
+    """
+    estimator.image_input_tokens for k images x every model, as a k x M
+    int64 array (0 in the columns of models without a formula). Each step is
+    the same float operation as in the scalar version, so counts match.
+    """
+    width = np.repeat(width[:, None], len(ma), axis=1)
+    height = np.repeat(height[:, None], len(ma), axis=1)
+    long_side = np.maximum(width, height)
+    fit = (ma.image_max_side > 0) & (long_side > ma.image_max_side)
+    scale = np.where(fit, ma.image_max_side / np.where(fit, long_side, 1), 1.0)
+    width, height = np.where(fit, width * scale, width), np.where(fit, height * scale, height)
+
+    short_side = np.minimum(width, height)
+    shrink = ma.image_tiles & (ma.image_short_side > 0) & (short_side > ma.image_short_side)
+    scale = np.where(shrink, ma.image_short_side / np.where(shrink, short_side, 1), 1.0)
+    tile_width, tile_height = np.where(shrink, width * scale, width), np.where(shrink, height * scale, height)
+    tile_size = np.where(ma.image_tiles, ma.image_tile_size, 1)
+    tiles = ma.image_tokens_per_tile * np.ceil(tile_width / tile_size) * np.ceil(tile_height / tile_size)
+
+    pixels_per_token = np.where(ma.image_pixels_per_token > 0, ma.image_pixels_per_token, 1)
+    pixels = np.ceil(width * height / pixels_per_token)
+    tokens = ma.image_base_tokens + np.where(ma.image_tiles, tiles, pixels)
+    return np.where(ma.image_formula, tokens, 0).astype(np.int64)
+
+
+class CostMatrix:
+    """
+    N x M pricing result. Unsupported cells hold NaN cost and NO_TOKENS.
+
+    Attributes:
+        file_types (list): File type label per input (length N).
+        supported (ndarray[bool]): N x M mask of priced cells.
+        send_tokens, get_tokens, total_tokens (ndarray[int64]): N x M token counts.
+        calls (ndarray[int64]): N x M calls needed under each model's call
+                                budget (estimator.calls_needed), NO_TOKENS if unknown.
+        total_cost (ndarray[float64]): N x M cost in USD.
+        default_rate (ndarray[bool]): N x M mask of video cells priced at DEFAULT_VIDEO_COST.
+    """
+
+    def __init__(self, model_arrays, file_types, supported, send_tokens, get_tokens, total_tokens, calls, total_cost, default_rate):
+        self.model_arrays = model_arrays
+        self.file_types = file_types
+        self.supported = supported
+        self.send_tokens = send_tokens
+        self.get_tokens = get_tokens
+        self.total_tokens = total_tokens
+        self.calls = calls
+        self.total_cost = total_cost
+        self.default_rate = default_rate
+
+    @property
+    def shape(self):
+        return self.supported.shape
+
+    def assessment(self, i, numeric=False):
+        """
+        Result rows for input i, formatted as in the assessment modal.
+
+        Args:
+            numeric (bool): Build numeric rows, see estimator.price_model.
+
+        Returns:
+            tuple: (results, unsupported_models), identical to estimator.assess.
+        """
+        ma = self.model_arrays
+        results = []
+        unsupported_models = []
+        missing = None if numeric else estimator.NOT_SUPPORTED
+        max_tokens = ma.row_max_tokens_numeric if numeric else ma.row_max_tokens
+        supported = self.supported[i].tolist()
+        send = self.send_tokens[i].tolist()
+        get = self.get_tokens[i].tolist()
+        total = self.total_tokens[i].tolist()
+        calls = self.calls[i].tolist()
+        cost = self.total_cost[i].tolist()
+        default_rate = self.default_rate[i].tolist()
+        for j in range(len(ma)):
+            if not supported[j]:
+                unsupported_models.append(ma.labels[j])
+                continue
+            row = {
+                **ma.row_prefix[j],
+                "File Type Considered": self.file_types[i],
+                "API Types": ma.row_api_types[j],
+                "Max Tokens per Call": max_tokens[j],
+                "Calls": calls[j] if calls[j] != NO_TOKENS else missing,
+                "Send Tokens": send[j] if send[j] != NO_TOKENS else missing,
+                "Get Tokens": get[j] if get[j] != NO_TOKENS else missing,
+                "Total Tokens": total[j] if total[j] != NO_TOKENS else missing,
+            }
+            if numeric:
+                row["Total Cost (USD)"] = cost[j]
+                row["Default Rate"] = default_rate[j]
+            else:
+                row["Total Cost (USD)"] = estimator.format_cost(cost[j], default_rate[j])
+            results.append(row)
+        return results, unsupported_models
+
+
+def compute_cost_matrix(measurements, models):
+    """
+    Prices every measurement against every model in one vectorized pass.
+
+    Args:
+        measurements (list): Dicts from estimator.measure_file / measure_text
+                             (only 'file_type', 'size_bytes',
+                             'text_bytes', 'duration_seconds', 'width',
+                             'height', 'members' and 'tokens' are used).
+        models (ModelArrays | list): Prebuilt ModelArrays, or a model list
+                                     (converted on the fly; prefer building
+                                     ModelArrays once when pricing many blocks).
+
+    Returns:
+        CostMatrix: N x M result.
+    """
+    ma = models if isinstance(models, ModelArrays) else ModelArrays(models)
+    n, m = len(measurements), len(ma)
+    file_types = [item["file_type"] for item in measurements]
+    type_codes = np.array([FILE_TYPE_CODES.get(t, UNKNOWN_TYPE_CODE) for t in file_types], dtype=np.int64)
+    size_bytes = np.array([item["size_bytes"] for item in measurements], dtype=np.float64)
+
+    # Look up each file's capability row; unknown types get an all-False row
+    supported_rows = np.vstack([ma.supported, np.zeros((1, m), dtype=bool)])
+    supported = supported_rows[type_codes]
+
+    is_text = (type_codes == FILE_TYPE_CODES['Text']) | (type_codes == FILE_TYPE_CODES['Code']) | (type_codes == FILE_TYPE_CODES['PDF'])
+    is_video = type_codes == FILE_TYPE_CODES['Video']
+    is_audio = type_codes == FILE_TYPE_CODES['Audio']
+    is_image = type_codes == FILE_TYPE_CODES['Image']
+
+    # Byte-heuristic Text/Code/PDF estimate depends only on the file, so compute it per row
+    text_bytes = np.array([item["size_bytes"] if item.get("text_bytes") is None else item["text_bytes"] for item in measurements], dtype=np.float64)
+    send_1d = np.maximum(1, (text_bytes / estimator.BYTES_PER_TOKEN).astype(np.int64))
+    minutes = np.array([estimator.media_minutes(item) for item in measurements], dtype=np.float64)
+
+    total_cost = np.full((n, m), np.nan)
+    send_tokens = np.full((n, m), NO_TOKENS, dtype=np.int64)
+    get_tokens = np.full((n, m), NO_TOKENS, dtype=np.int64)
+
+    with np.errstate(invalid='ignore'):
+        if is_text.any():
+            send = np.repeat(send_1d[is_text, None], m, axis=1)
+            # Swap in tokenizer counts for the model columns that share each tokenizer
+            text_items = [item for item, flag in zip(measurements, is_text) if flag]
+            for name, cols in ma.tokenizer_columns.items():
+                counts = np.array([item.get("tokens", {}).get(name, -1) for item in text_items], dtype=np.int64)
+                has_count = counts >= 0
+                if has_count.any():
+                    send[np.ix_(has_count, cols)] = np.maximum(1, counts[has_count])[:, None]
+            get = (send * estimator.OUTPUT_TOKEN_RATIO).astype(np.int64)
+            total_cost[is_text] = (send / 1000000) * ma.input_cost + (get / 1000000) * ma.output_cost
+            send_tokens[is_text] = send
+            get_tokens[is_text] = get
+        if is_video.any():
+            video_rate = np.where(np.isnan(ma.video_cost), estimator.DEFAULT_VIDEO_COST, ma.video_cost)
+            total_cost[is_video] = minutes[is_video, None] * video_rate
+        if is_audio.any():
+            total_cost[is_audio] = minutes[is_audio, None] * ma.audio_cost
+        if is_image.any():
+            image_items = [item for item, flag in zip(measurements, is_image) if flag]
+            known = [bool(item.get("width") and item.get("height")) for item in image_items]
+            width = np.array([item["width"] if ok else estimator.IMAGE_DEFAULT_SIDE for item, ok in zip(image_items, known)], dtype=np.float64)
+            height = np.array([item["height"] if ok else estimator.IMAGE_DEFAULT_SIDE for item, ok in zip(image_items, known)], dtype=np.float64)
+            send = _image_input_tokens(ma, width, height)
+            get = estimator.IMAGE_OUTPUT_TOKENS
+            formula_cost = (send / 1000000) * ma.input_cost + (get / 1000000) * ma.output_cost
+            flat_cost = ma.image_cost + (estimator.IMAGE_OUTPUT_TOKENS / 1000000) * ma.output_cost
+            total_cost[is_image] = np.where(ma.image_formula, formula_cost, flat_cost)
+            send_tokens[is_image] = np.where(ma.image_formula, send, NO_TOKENS)
+            get_tokens[is_image] = estimator.IMAGE_OUTPUT_TOKENS
+
+    default_rate = is_video[:, None] & np.isnan(ma.video_cost)[None, :]
+
+    # Archives mix member types, so their cells are priced one by one (there are few of them)
+    for i, file_type in enumerate(file_types):
+        if file_type != 'Archive':
+            continue
+        for j, model in enumerate(ma.models):
+            priced = estimator.price_archive(model, measurements[i])
+            if priced is None:
+                continue
+            send, get, total_cost[i, j], default_rate[i, j] = priced
+            send_tokens[i, j] = send if send is not None else NO_TOKENS
+            get_tokens[i, j] = get if get is not None else NO_TOKENS
+            supported[i, j] = True
+
+    total_tokens = np.where((send_tokens != NO_TOKENS) & (get_tokens != NO_TOKENS), send_tokens + get_tokens, NO_TOKENS)
+    has_budget = ma.call_budget > 0
+    calls = np.where((send_tokens != NO_TOKENS) & has_budget, -(-send_tokens // np.where(has_budget, ma.call_budget, 1)), NO_TOKENS)
+
+    # Blank out cells the capability mask rejects so callers can't misread them
+    total_cost[~supported] = np.nan
+    send_tokens[~supported] = NO_TOKENS
+    get_tokens[~supported] = NO_TOKENS
+    total_tokens[~supported] = NO_TOKENS
+    calls[~supported] = NO_TOKENS
+    return CostMatrix(ma, file_types, supported, send_tokens, get_tokens, total_tokens, calls, total_cost, default_rate & supported)
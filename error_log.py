@@ -0,0 +1,207 @@
+import atexit
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+# Helper to log errors to user's Downloads folder.
+# Lives outside amm.py so Qt-free modules and background workers can log too.
+#
+# Records are JSON lines. log_error only puts the record on a queue; a
+# writer thread (started on first use) appends whatever has queued up in one
+# write per FLUSH_INTERVAL, rotating the file at MAX_LOG_BYTES. Records below
+# LOG_LEVEL (set AMM_LOG_LEVEL=debug to see everything) are dropped before
+# any work is done, so routine notes such as "this upload is binary" cost
+# nothing unless asked for.
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+LOG_LEVEL = {name: level for level, name in LEVEL_NAMES.items()}.get(os.environ.get("AMM_LOG_LEVEL", "").lower(), WARNING)
+
+LOG_PATH = os.path.join(os.path.expanduser('~'), 'Downloads', 'AMM_error_log.jsonl')
+MAX_LOG_BYTES = 5 * 1024 * 1024  # Rotate past this size...
+BACKUP_COUNT = 3                 # ...keeping AMM_error_log.jsonl.1 .. .3
+FLUSH_INTERVAL = 1.0             # Seconds records may wait to be batched into one write
+MAX_QUEUED = 10000               # Records beyond this are dropped (and counted) rather than block
+
+DECODE_HINT = "The file is not a text file (e.g. a video, image or other binary file). This is normal for non-text files."
+
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class ErrorLogSink:
+    """
+    Queue-backed JSON-lines log file with batched writes and size rotation.
+
+    Args:
+        path (str): Log file.
+        max_bytes (int): Size at which the file is rotated (0 = never).
+        backup_count (int): Rotated files to keep (path.1 is the newest).
+        flush_interval (float): Longest a record waits before being written.
+    """
+
+    def __init__(self, path=LOG_PATH, max_bytes=MAX_LOG_BYTES, backup_count=BACKUP_COUNT, flush_interval=FLUSH_INTERVAL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self._queue = queue.Queue(MAX_QUEUED)
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def put(self, record):
+        """Queues a record dict for writing; never blocks."""
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self, timeout=5.0):
+        """Blocks until everything queued so far is written (or timeout passes)."""
+        if self._thread is None:
+            return
+        marker = _Flush()
+        self._queue.put(marker)
+        marker.done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """Writes what is queued and stops the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="error-log", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Keep collecting until the interval is up or someone asks for a flush/stop
+            while not isinstance(batch[-1], _Flush) and batch[-1] is not _STOP:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            records = [item for item in batch if isinstance(item, dict)]
+            if self.dropped:
+                dropped, self.dropped = self.dropped, 0
+                records.append(make_record(WARNING, f"{dropped} log records were dropped because the log queue was full."))
+            if records:
+                self._write(records)
+            for item in batch:
+                if isinstance(item, _Flush):
+                    item.done.set()
+            if batch[-1] is _STOP:
+                return
+
+    def _write(self, records):
+        lines = [(json.dumps(record, ensure_ascii=False) + "\n").encode('utf-8') for record in records]
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            # One append per file; a batch that crosses max_bytes is split around the rotation
+            chunk = []
+            for line in lines:
+                if self.max_bytes and size and size + len(line) > self.max_bytes:
+                    self._append(chunk)
+                    chunk = []
+                    self._rotate()
+                    size = 0
+                chunk.append(line)
+                size += len(line)
+            self._append(chunk)
+        except Exception as e:
+            print(f"Failed to write to error log: {e}")
+
+    def _append(self, chunk):
+        if chunk:
+            with open(self.path, 'ab') as f:
+                f.write(b"".join(chunk))
+
+    def _rotate(self):
+        if self.backup_count <= 0:
+            os.remove(self.path)
+            return
+        for i in range(self.backup_count - 1, 0, -1):
+            source = f"{self.path}.{i}"
+            if os.path.exists(source):
+                os.replace(source, f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+
+
+def _is_decode_error(error):
+    return isinstance(error, UnicodeDecodeError) or 'decode' in str(type(error)).lower() or 'decode' in str(error).lower()
+
+
+def make_record(level, message, file_path=None, error=None):
+    """The JSON-lines record written for one log call."""
+    record = {
+        "time": datetime.datetime.now().isoformat(timespec='milliseconds'),
+        "level": LEVEL_NAMES.get(level, str(level)),
+        "message": message,
+    }
+    if file_path:
+        record["file"] = file_path
+    if error:
+        record["error"] = repr(error)
+        record["error_type"] = type(error).__name__
+        # Add human-readable explanation for decode errors
+        if _is_decode_error(error):
+            record["hint"] = DECODE_HINT
+    return record
+
+
+SINK = ErrorLogSink()
+
+
+@atexit.register
+def _close_sink():
+    SINK.close()
+
+
+def log_error(message, file_path=None, error=None, level=ERROR):
+    """
+    Logs a message to the error log without blocking on the file.
+
+    Args:
+        message (str): What happened.
+        file_path (str): The file involved, if any.
+        error: The exception (or any value) that caused it, if any.
+        level (int): DEBUG, INFO, WARNING or ERROR; records below LOG_LEVEL
+                     are dropped.
+    """
+    if level < LOG_LEVEL:
+        return
+    try:
+        SINK.put(make_record(level, message, file_path, error))
+    except Exception as e:
+        print(f"Failed to write to error log: {e}")
+
+
+def log_debug(message, file_path=None, error=None):
+    """Logs an expected, routine event (dropped unless AMM_LOG_LEVEL=debug)."""
+    if DEBUG >= LOG_LEVEL:
+        log_error(message, file_path, error, DEBUG)
@@ -0,0 +1,476 @@
+import argparse
+import asyncio
+import base64
+import binascii
+import fnmatch
+import functools
+import json
+import math
+import os
+import sys
+import tempfile
+from urllib.parse import urlsplit, parse_qs
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import estimator
+import metrics
+from catalog_service import CatalogService, POLL_INTERVAL
+from model_loader import CSV_PATH
+
+# --- Local HTTP estimation service ---
+# Serves cost estimates over HTTP for services that can't drive the window.
+# The catalog is loaded once and kept warm (and hot-reloaded from the CSV,
+# as in the GUI). Requests that arrive within BATCH_WINDOW of each other are
+# priced together in one cost_matrix pass, so throughput under concurrent
+# load is bounded by JSON and HTTP handling, not by pricing.
+#
+#   python estimate_server.py --port 8765
+#   curl -s localhost:8765/estimate -d '{"text": "Hello world"}'
+#   curl -s localhost:8765/estimate -d '{"requests": [{"bytes": 50000}, {"bytes": 2000000, "file_type": "Video", "duration_seconds": 90}]}'
+#   curl -s "localhost:8765/estimate/file?name=report.pdf" --data-binary @report.pdf
+#
+# Endpoints:
+#   GET  /health          status, model count, catalog revision, batching counters
+#   GET  /models          the catalog
+#   GET  /metrics         stage timings and counters, Prometheus text format (see metrics.py)
+#   POST /estimate        one estimate request (JSON object) or {"requests": [...]}
+#   POST /estimate/file   raw file upload; ?name= gives the file name (type fallback)
+#
+# An estimate request is a JSON object with exactly one of:
+#   "text":   text to price
+#   "bytes":  a size in bytes, priced as "file_type" (default Text); Audio/Video
+#             may give "duration_seconds", Image "width"/"height"
+#   "file":   {"name": ..., "content_base64": ...}, an uploaded file
+# and optionally "models": ["OpenAI - *", ...] (globs on "Company - Model").
+# Each answer is {"file_type", "size_bytes", "results", "unsupported"} with
+# numeric result rows (estimator.price_model numeric=True), or {"error"}.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+BATCH_WINDOW = 0.001             # Seconds a request waits for others to share its pricing pass
+MAX_BATCH = 1024                 # Requests priced per pass at most
+MAX_JSON_BYTES = 64 * 1024 * 1024
+MAX_UPLOAD_BYTES = 1024 * 1024 * 1024
+INLINE_TEXT_BYTES = 64 * 1024    # Larger texts are measured on a worker thread
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+BYTE_COUNT_TYPES = ('Text', 'Code', 'PDF', 'Image', 'Audio', 'Video')
+MAX_INTEGER = 2 ** 63 - 1        # Integers are priced as int64 in cost_matrix
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 411: "Length Required",
+            413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error"}
+
+
+class RequestError(Exception):
+    """A client error, answered with its HTTP status and message."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+@functools.lru_cache(maxsize=256)
+def _model_filter(patterns, labels):
+    """Labels matching any of the glob patterns (case-insensitive)."""
+    patterns = [pattern.lower() for pattern in patterns]
+    return frozenset(label for label in labels if any(fnmatch.fnmatch(label.lower(), pattern) for pattern in patterns))
+
+
+def byte_count_measurement(size_bytes, file_type='Text', duration_seconds=None, width=None, height=None):
+    """A measurement for an input known only by its size (and type), shaped like measure_text's."""
+    measurement = estimator.measure_text("")
+    measurement.update({
+        "data_type": "Text" if file_type in ('Text', 'Code') else "Binary",
+        "file_type": file_type,
+        "size_bytes": size_bytes,
+        "is_binary": file_type not in ('Text', 'Code'),
+        "char_count": None,
+        "word_count": None,
+        "text_bytes": size_bytes if file_type in estimator.TEXT_PRICED_TYPES else None,
+        "duration_seconds": duration_seconds,
+        "width": width,
+        "height": height,
+    })
+    return measurement
+
+
+def _number(value, name, integer=False, required=False):
+    if value is None:
+        if required:
+            raise RequestError(f"'{name}' is required.")
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0 or (integer and not isinstance(value, int)):
+        raise RequestError(f"'{name}' must be a non-negative {'integer' if integer else 'number'}.")
+    if integer and value > MAX_INTEGER:
+        raise RequestError(f"'{name}' must be at most {MAX_INTEGER}.")
+    if not integer and not math.isfinite(value):
+        raise RequestError(f"'{name}' must be a finite number.")
+    return value
+
+
+def _upload_name(name):
+    """A client-supplied file name reduced to a safe base name ('upload' if nothing usable is left)."""
+    name = os.path.basename(name) if isinstance(name, str) else ""
+    return "upload" if name in ("", ".", "..") or "\0" in name else name
+
+
+class EstimateServer:
+    """
+    Prices estimate requests against a warm catalog, batching concurrent ones.
+
+    Args:
+        csv_path (str): Model reference CSV (watched for changes).
+        batch_window (float): See BATCH_WINDOW.
+        max_batch (int): See MAX_BATCH.
+    """
+
+    def __init__(self, csv_path=CSV_PATH, batch_window=BATCH_WINDOW, max_batch=MAX_BATCH):
+        self.catalog_service = CatalogService(csv_path)
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.batches = 0
+        self.batched_requests = 0
+        self._pending = []
+        self._flush_handle = None
+        self._server = None
+        self._poll_task = None
+        self._catalog_changed()
+
+    def _catalog_changed(self):
+        self.models = list(self.catalog_service.catalog)
+        self.labels = tuple(f"{m['company']} - {m['model']}" for m in self.models)
+        self.tokenizer_names = estimator.tokenizer_names(self.models)
+        try:
+            import cost_matrix
+            self._cost_matrix = cost_matrix
+            self.model_arrays = cost_matrix.ModelArrays(self.models)
+        except ImportError:
+            self._cost_matrix = self.model_arrays = None
+
+    # --- Pricing ---
+
+    def price(self, measurement):
+        """Queues a measurement for the next pricing pass; returns a future of (results, unsupported)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((measurement, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        self.batches += 1
+        self.batched_requests += len(batch)
+        try:
+            if self._cost_matrix is not None:
+                with metrics.timed("price"):
+                    matrix = self._cost_matrix.compute_cost_matrix([measurement for measurement, _ in batch], self.model_arrays)
+                    outcomes = [matrix.assessment(i, numeric=True) for i in range(len(batch))]
+                metrics.count("amm_assessments_total", len(batch))
+                metrics.count("amm_priced_pairs_total", len(batch) * len(self.models))
+            else:
+                outcomes = [estimator.assess(measurement, self.models, numeric=True) for measurement, _ in batch]
+        except Exception:
+            # Price the batch one request at a time, so only the request
+            # that breaks pricing gets the error
+            for measurement, future in batch:
+                try:
+                    outcome = estimator.assess(measurement, self.models, numeric=True)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(outcome)
+            return
+        for (_, future), outcome in zip(batch, outcomes):
+            if not future.done():
+                future.set_result(outcome)
+
+    async def estimate(self, request, upload_path=None):
+        """
+        Answers one estimate request (a parsed JSON object).
+
+        Raises:
+            RequestError: If the request is malformed.
+        """
+        if not isinstance(request, dict):
+            raise RequestError("An estimate request must be a JSON object.")
+        patterns = request.get("models")
+        if patterns is not None and (not isinstance(patterns, list) or not all(isinstance(p, str) for p in patterns)):
+            raise RequestError("'models' must be a list of strings.")
+        loop = asyncio.get_running_loop()
+        names = self.tokenizer_names
+        given = [key for key in ("text", "bytes", "file") if key in request]
+        if upload_path is not None:
+            measurement = await loop.run_in_executor(None, estimator.measure_file, upload_path, names)
+        elif len(given) != 1:
+            raise RequestError("Give exactly one of 'text', 'bytes' or 'file'.")
+        elif given[0] == "text":
+            text = request["text"]
+            if not isinstance(text, str):
+                raise RequestError("'text' must be a string.")
+            if len(text) > INLINE_TEXT_BYTES:
+                measurement = await loop.run_in_executor(None, estimator.measure_text, text, names)
+            else:
+                measurement = estimator.measure_text(text, names)
+        elif given[0] == "bytes":
+            file_type = request.get("file_type", "Text")
+            if file_type not in BYTE_COUNT_TYPES:
+                raise RequestError(f"'file_type' must be one of {', '.join(BYTE_COUNT_TYPES)}.")
+            measurement = byte_count_measurement(_number(request["bytes"], "bytes", integer=True, required=True), file_type,
+                                                 _number(request.get("duration_seconds"), "duration_seconds"),
+                                                 _number(request.get("width"), "width", integer=True),
+                                                 _number(request.get("height"), "height", integer=True))
+        else:
+            upload = request["file"]
+            if not isinstance(upload, dict) or not isinstance(upload.get("content_base64"), str):
+                raise RequestError("'file' must be {\"name\": ..., \"content_base64\": ...}.")
+            try:
+                data = base64.b64decode(upload["content_base64"], validate=True)
+            except (binascii.Error, ValueError):
+                raise RequestError("'file.content_base64' is not valid base64.")
+            measurement = await loop.run_in_executor(None, self._measure_bytes, data, _upload_name(upload.get("name")))
+        results, unsupported = await self.price(measurement)
+        if patterns is not None:
+            allowed = _model_filter(tuple(patterns), self.labels)
+            results = [row for row in results if f"{row['Company']} - {row['Model']}" in allowed]
+            unsupported = [label for label in unsupported if label in allowed]
+        return {"file_type": measurement["file_type"], "size_bytes": measurement["size_bytes"], "results": results, "unsupported": unsupported}
+
+    def _measure_bytes(self, data, name):
+        with tempfile.TemporaryDirectory(prefix="amm-upload-") as directory:
+            path = os.path.join(directory, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            return estimator.measure_file(path, self.tokenizer_names)
+
+    async def estimate_body(self, body):
+        """Answers a POST /estimate body: one request, or {"requests": [...]}."""
+        try:
+            request = json.loads(body)
+        except (UnicodeDecodeError, ValueError) as e:
+            raise RequestError(f"Body is not valid JSON: {e}")
+        if isinstance(request, dict) and "requests" in request:
+            requests = request["requests"]
+            if not isinstance(requests, list):
+                raise RequestError("'requests' must be a list.")
+            answers = await asyncio.gather(*(self.estimate(item) for item in requests), return_exceptions=True)
+            return {"results": [self._batch_answer(answer) for answer in answers]}
+        return await self.estimate(request)
+
+    @staticmethod
+    def _batch_answer(answer):
+        if isinstance(answer, RequestError):
+            return {"error": str(answer)}
+        if isinstance(answer, BaseException):
+            return {"error": f"Could not estimate: {answer!r}"}
+        return answer
+
+    def health(self):
+        return {
+            "status": "ok",
+            "models": len(self.models),
+            "catalog_revision": self.catalog_service.revision,
+            "batches": self.batches,
+            "batched_requests": self.batched_requests,
+        }
+
+    def model_list(self):
+        fields = ("company", "model", "version", "api_types", "max_tokens", "input_cost", "output_cost", "video_cost", "audio_cost", "image_cost")
+        return {"models": [{field: (list(m[field]) if field == "api_types" else m[field]) for field in fields} for m in self.models]}
+
+    # --- HTTP ---
+
+    async def _read_upload(self, reader, length):
+        if length > MAX_UPLOAD_BYTES:
+            raise RequestError(f"Upload is larger than {MAX_UPLOAD_BYTES} bytes.", 413)
+        handle, path = tempfile.mkstemp(prefix="amm-upload-")
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                remaining = length
+                while remaining:
+                    chunk = await reader.readexactly(min(remaining, UPLOAD_CHUNK_BYTES))
+                    f.write(chunk)
+                    remaining -= len(chunk)
+        except BaseException:
+            os.remove(path)
+            raise
+        return path
+
+    async def _estimate_upload(self, reader, length, query):
+        path = await self._read_upload(reader, length)
+        try:
+            # Keep the client's extension so detection has its fallback
+            name = _upload_name((query.get("name") or ["upload"])[0])
+            named = os.path.join(os.path.dirname(path), f"{os.path.basename(path)}-{name}")
+            os.replace(path, named)
+            path = named
+            return await self.estimate({}, upload_path=path)
+        finally:
+            os.remove(path)
+
+    async def _respond(self, method, target, headers, reader):
+        """Routes one request; returns (status, JSON-able payload). Reads the body itself."""
+        url = urlsplit(target)
+        length = headers.get("content-length")
+        try:
+            length = int(length) if length is not None else 0
+        except ValueError:
+            raise RequestError("Bad Content-Length.")
+        if length < 0:
+            raise RequestError("Bad Content-Length.")
+        if url.path == "/estimate/file":
+            if method != "POST":
+                raise RequestError("Use POST.", 405)
+            return 200, await self._estimate_upload(reader, length, parse_qs(url.query))
+        if length > MAX_JSON_BYTES:
+            raise RequestError(f"Body is larger than {MAX_JSON_BYTES} bytes; upload files to /estimate/file.", 413)
+        body = await reader.readexactly(length) if length else b""
+        if url.path == "/estimate":
+            if method != "POST":
+                raise RequestError("Use POST.", 405)
+            return 200, await self.estimate_body(body)
+        if url.path in ("/health", "/models", "/metrics"):
+            if method not in ("GET", "HEAD"):
+                raise RequestError("Use GET.", 405)
+            if url.path == "/metrics":
+                return 200, metrics.prometheus_text()
+            return 200, self.health() if url.path == "/health" else self.model_list()
+        raise RequestError(f"No such endpoint: {url.path}", 404)
+
+    async def handle_connection(self, reader, writer):
+        """Serves HTTP/1.1 requests on one connection (keep-alive, no chunked bodies)."""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except asyncio.IncompleteReadError:
+                    break  # Client closed the connection
+                except asyncio.LimitOverrunError:
+                    await self._send(writer, 431, {"error": "Request headers too large."}, False)
+                    break
+                lines = head.decode('latin-1').split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    await self._send(writer, 400, {"error": "Malformed request line."}, False)
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+                if "transfer-encoding" in headers:
+                    await self._send(writer, 411, {"error": "Chunked bodies are not supported; send Content-Length."}, False)
+                    break
+                try:
+                    status, payload = await self._respond(method, target, headers, reader)
+                except RequestError as e:
+                    status, payload = e.status, {"error": str(e)}
+                    keep_alive = keep_alive and e.status not in (411, 413)  # Unread body left on the stream
+                except asyncio.IncompleteReadError:
+                    break
+                except Exception as e:
+                    print(f"[ERROR] Estimate request failed: {e!r}", file=sys.stderr)
+                    status, payload, keep_alive = 500, {"error": "Internal error."}, False
+                metrics.count("amm_server_requests_total", endpoint=target.split("?")[0] if status != 404 else "other", status=status)
+                await self._send(writer, status, payload, keep_alive, head_only=method == "HEAD")
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    async def _send(writer, status, payload, keep_alive, head_only=False):
+        # A str payload is sent as-is (the /metrics text); anything else as JSON
+        if isinstance(payload, str):
+            body, content_type = payload.encode('utf-8'), "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body, content_type = json.dumps(payload).encode('utf-8'), "application/json"
+        head = (f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode('latin-1')
+        writer.write(head if head_only else head + body)
+        await writer.drain()
+
+    async def _poll_catalog(self, interval):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self.catalog_service.poll():
+                    self._catalog_changed()
+            except Exception as e:
+                print(f"[ERROR] Catalog reload failed: {e}", file=sys.stderr)
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, poll_interval=POLL_INTERVAL):
+        """Starts listening; returns the asyncio Server (port 0 picks a free port)."""
+        self._server = await asyncio.start_server(self.handle_connection, host, port, limit=64 * 1024, backlog=1024)
+        if poll_interval:
+            self._poll_task = asyncio.create_task(self._poll_catalog(poll_interval))
+        return self._server
+
+    async def close(self):
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+
+async def serve(host, port, csv_path, batch_window, max_batch):
+    server = EstimateServer(csv_path, batch_window, max_batch)
+    if not server.models:
+        print("[ERROR] No models loaded; nothing to price.", file=sys.stderr)
+        return 1
+    listener = await server.start(host, port)
+    address = listener.sockets[0].getsockname()
+    print(f"[INFO] Serving estimates for {len(server.models)} models on http://{address[0]}:{address[1]}", file=sys.stderr)
+    try:
+        await listener.serve_forever()
+    finally:
+        await server.close()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serves AMM cost estimates over HTTP (JSON), batching concurrent requests into one pricing pass.")
+    parser.add_argument("--host", default=DEFAULT_HOST, help=f"Address to listen on (default {DEFAULT_HOST}; the service has no authentication).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default {DEFAULT_PORT}).")
+    parser.add_argument("--catalog", default=CSV_PATH, help="Model reference CSV (default: model_reference.csv next to this script).")
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW * 1000, help=f"How long a request waits to share a pricing pass (default {BATCH_WINDOW * 1000:g} ms).")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help=f"Requests per pricing pass at most (default {MAX_BATCH}).")
+    parser.add_argument("--metrics", help="Also export metrics elsewhere, e.g. json:FILE (written at exit); GET /metrics always serves them (default: $AMM_METRICS).")
+    parser.add_argument("--profile", metavar="DIR", help="Record the whole run with cProfile into DIR, written on exit (default: $AMM_PROFILE).")
+    args = parser.parse_args(argv)
+    if args.profile:
+        metrics.set_profile_dir(args.profile)
+    try:
+        metrics.start_exporter(args.metrics) if args.metrics else metrics.configure_from_env()
+    except (ValueError, OSError) as e:
+        parser.error(f"--metrics: {e}")
+    metrics.enable()
+    try:
+        with metrics.profiled("estimate_server"):
+            return asyncio.run(serve(args.host, args.port, args.catalog, args.batch_window_ms / 1000, args.max_batch))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,905 @@
+import argparse
+import collections
+import io
+import itertools
+import math
+import os
+import sqlite3
+import sys
+
+# Ensure the script's directory is in the path to find model_loader
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from model_loader import (
+    load_models_from_csv, catalog_revision, eligible_file_types, has_image_token_formula, CSV_PATH, FILE_TYPE_BITS, IMAGE_METHOD_TILES
+)
+from file_stream import scan_text_stream, ReplayStream
+from media_probe import probe_duration, PROBE_HEAD_BYTES
+from image_probe import probe_image, PROBE_READ_BYTES
+from pdf_probe import probe_pdf
+from file_detect import detect_file, describe_header, HEADER_SIZE
+import tokenizer_registry
+import result_cache
+import metrics
+from history_store import HistoryStore, DEFAULT_HISTORY_PATH
+
+# --- Headless cost estimation engine ---
+# Everything in here is Qt-free so it can be imported by the GUI (amm.py),
+# by batch jobs on a headless server, or run directly as a CLI:
+#
+#   python estimator.py ./documents --format csv > costs.csv
+#   python estimator.py --manifest files.txt --format jsonl
+
+NOT_SUPPORTED = 'Not Supported'
+DEFAULT_VIDEO_COST = 0.05  # $ per minute, used when a video model has no listed rate
+IMAGE_OUTPUT_TOKENS = 512  # Assumed response length for image analysis
+IMAGE_DEFAULT_SIDE = 1024  # Width/height assumed for images whose size couldn't be read
+BYTES_PER_MEDIA_MINUTE = 1024 * 1024  # Audio/video length guess (1 MB per minute) when headers give none
+BYTES_PER_TOKEN = tokenizer_registry.BYTES_PER_TOKEN  # Fallback heuristic for models without a tokenizer
+OUTPUT_TOKEN_RATIO = 0.5   # Assumed response length relative to the input
+BLOCK_SIZE = 1024          # Files priced per vectorized pass in assess_paths
+CHUNKSIZE = 64             # Files per process-pool work unit
+TEXT_PRICED_TYPES = ('Text', 'Code', 'PDF')  # Priced on input/output tokens of their text
+
+# Column order of a result row (matches the assessment modal / Excel export)
+RESULT_COLUMNS = ["Company", "Model", "Version", "File Type Considered", "API Types", "Max Tokens per Call", "Calls", "Send Tokens", "Get Tokens", "Total Tokens", "Total Cost (USD)"]
+NUMERIC_RESULT_COLUMNS = RESULT_COLUMNS + ["Default Rate"]  # Keys of numeric=True rows
+
+
+def verify_image(source):
+    """
+    Raises if Pillow can't parse the image, given a path or open binary file.
+
+    Returns:
+        tuple: (width, height, frame_count) as Pillow reports them, or None
+               when Pillow isn't installed (the check is then skipped).
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+    with metrics.timed("image_verify"), Image.open(source) as img:
+        size = img.size
+        frame_count = getattr(img, 'n_frames', 1)
+        img.verify()
+    return size[0], size[1], frame_count
+
+
+def measure_file(path, tokenizer_names=(), progress=None):
+    """
+    Measures a file on disk for pricing.
+
+    The file is opened once: file_detect.detect_file classifies it from a
+    single header read, then text files are streamed in chunks from the same
+    handle (file_stream.scan_text_stream). Of binary files only a few KB of
+    container headers are read (media_probe for audio/video durations,
+    image_probe for image dimensions), so memory use stays bounded for any
+    file size. Pillow is only used for images whose headers image_probe
+    can't read. PDFs are read once for their page count and shown text
+    (pdf_probe), and zip/tar/gz archives are measured member by member
+    straight from the archive (see measure_archive).
+
+    Args:
+        path (str): Path to the file.
+        tokenizer_names (iterable): Tokenizers to count text with during the
+                                    same pass (see tokenizer_names()).
+        progress (callable): Optional progress(bytes_read) hook for text
+                             scans (see file_stream.scan_text_stream).
+
+    Returns:
+        dict: Measurement with keys 'path', 'data_type', 'file_type',
+              'format', 'size_bytes', 'is_binary', 'probe_error',
+              'char_count', 'word_count' (None for binary files),
+              'duration_seconds' (audio/video play length from the
+              container headers, None if unknown), 'width', 'height' and
+              'frame_count' (images; None if unknown), 'page_count' (PDFs),
+              'text_bytes' (UTF-8 size of the text to price: the file itself
+              for text, the extracted text for PDFs, else None), 'members'
+              (archives, see measure_archive; else None) and 'tokens', a dict
+              of {tokenizer name: input token count}.
+
+    Raises:
+        OSError / UnicodeDecodeError: If the file cannot be read. Text files
+        must decode as UTF-8 all the way through, as in the GUI, and images
+        whose headers image_probe can't read must pass Pillow's verify().
+    """
+    char_count = word_count = duration_seconds = None
+    width = height = frame_count = page_count = text_bytes = members = None
+    tokens = {}
+    with open(path, 'rb') as f:
+        with metrics.timed("detect"):
+            descriptor = detect_file(path, f)
+        size_bytes = descriptor.size_bytes
+        f.seek(0)
+        with metrics.timed("read"):
+            if descriptor.is_binary:
+                if descriptor.file_type == 'Image':
+                    dimensions = probe_image(f, descriptor.format, size_bytes, descriptor.header)
+                    if dimensions is None:
+                        f.seek(0)
+                        dimensions = verify_image(f)
+                    if dimensions is not None:
+                        width, height, frame_count = dimensions
+                elif descriptor.file_type in ('Video', 'Audio'):
+                    duration_seconds = probe_duration(f, descriptor.format, size_bytes, descriptor.header)
+                elif descriptor.file_type == 'PDF':
+                    clock = metrics.stage_clock("tokens")
+                    counters = tokenizer_registry.REGISTRY.streaming_counters(tokenizer_names)
+                    pdf = probe_pdf(f, _token_feeds(counters, clock), size_bytes, progress)
+                    page_count, char_count, word_count, text_bytes = pdf["page_count"], pdf["char_count"], pdf["word_count"], pdf["text_bytes"]
+                    tokens = _finish_counters(counters, clock)
+                elif descriptor.file_type == 'Archive':
+                    members = measure_archive(f, descriptor.format, path, tokenizer_names, progress)
+            else:
+                # A clean header doesn't guarantee the rest decodes; fail the same way the GUI did
+                clock = metrics.stage_clock("tokens")
+                counters = tokenizer_registry.REGISTRY.streaming_counters(tokenizer_names)
+                scan = scan_text_stream(f, consumers=_token_feeds(counters, clock), progress=progress)
+                size_bytes, char_count, word_count = scan["size_bytes"], scan["char_count"], scan["word_count"]
+                text_bytes = size_bytes
+                tokens = _finish_counters(counters, clock)
+    metrics.count("amm_files_total", file_type=descriptor.file_type)
+    metrics.count("amm_bytes_total", size_bytes, file_type=descriptor.file_type)
+    return {
+        "path": path,
+        "data_type": "File",
+        "file_type": descriptor.file_type,
+        "format": descriptor.format,
+        "size_bytes": size_bytes,
+        "is_binary": descriptor.is_binary,
+        "probe_error": descriptor.probe_error,
+        "char_count": char_count,
+        "word_count": word_count,
+        "duration_seconds": duration_seconds,
+        "width": width,
+        "height": height,
+        "frame_count": frame_count,
+        "page_count": page_count,
+        "text_bytes": text_bytes,
+        "members": members,
+        "tokens": tokens,
+    }
+
+
+def _token_feeds(counters, clock):
+    feeds = [c.feed for c in counters.values()]
+    return [clock.wrap(feed) for feed in feeds] if clock is not None else feeds
+
+
+def _finish_counters(counters, clock):
+    if clock is None:
+        return {name: counter.finish() for name, counter in counters.items()}
+    tokens = {name: clock.wrap(counter.finish)() for name, counter in counters.items()}
+    clock.finish()
+    return tokens
+
+
+def measure_text(text, tokenizer_names=()):
+    """Measures pasted text for pricing (same shape as measure_file)."""
+    size_bytes = len(text.encode('utf-8'))
+    with metrics.timed("tokens"):
+        tokens = {name: tokenizer_registry.REGISTRY.count(text, name) for name in tokenizer_names}
+    return {
+        "path": None,
+        "data_type": "Text",
+        "file_type": 'Text',
+        "format": None,
+        "size_bytes": size_bytes,
+        "is_binary": False,
+        "probe_error": None,
+        "char_count": len(text),
+        "word_count": len(text.split()),
+        "duration_seconds": None,
+        "width": None,
+        "height": None,
+        "frame_count": None,
+        "page_count": None,
+        "text_bytes": size_bytes,
+        "members": None,
+        "tokens": tokens,
+    }
+
+
+def measure_member(name, stream, size_bytes, tokenizer_names=()):
+    """
+    Measures one archive member from a forward-only stream (no seeking).
+
+    Text, code and PDF members are read through once, as in measure_file.
+    Of images and audio/video only the first few KB are probed, so their
+    dimensions/durations are found when the header holds them (otherwise
+    the usual defaults apply). Text that turns out not to be UTF-8 is
+    measured as 'Unknown'.
+
+    Args:
+        name (str): Member name (its extension is the detection fallback).
+        stream (file): The member's data.
+        size_bytes (int): Its size, or None if the archive doesn't say.
+        tokenizer_names (iterable): See measure_file.
+
+    Returns:
+        dict: The measure_file keys used for pricing: 'file_type',
+              'size_bytes', 'text_bytes', 'duration_seconds', 'width',
+              'height' and 'tokens'.
+    """
+    header = stream.read(HEADER_SIZE)
+    descriptor = describe_header(name, header, size_bytes)
+    file_type = descriptor.file_type
+    text_bytes = duration_seconds = width = height = None
+    tokens = {}
+    if file_type in TEXT_PRICED_TYPES:
+        counters = tokenizer_registry.REGISTRY.streaming_counters(tokenizer_names)
+        consumers = [c.feed for c in counters.values()]
+        try:
+            if file_type == 'PDF':
+                text_bytes = probe_pdf(ReplayStream(header, stream), consumers)["text_bytes"]
+            else:
+                text_bytes = scan_text_stream(ReplayStream(header, stream), consumers=consumers)["size_bytes"]
+                size_bytes = text_bytes
+            tokens = {name: counter.finish() for name, counter in counters.items()}
+        except UnicodeDecodeError:
+            file_type = 'Unknown'
+    elif file_type in ('Image', 'Video', 'Audio'):
+        head = header + stream.read(max(PROBE_READ_BYTES, PROBE_HEAD_BYTES) - len(header))
+        if size_bytes is None:
+            size_bytes = len(head) + sum(len(chunk) for chunk in iter(lambda: stream.read(HEADER_SIZE * 128), b''))
+        if file_type == 'Image':
+            dimensions = probe_image(io.BytesIO(head), descriptor.format, size_bytes, head)
+            if dimensions is not None:
+                width, height = dimensions[:2]
+        else:
+            duration_seconds = probe_duration(io.BytesIO(head), descriptor.format, size_bytes, header)
+    return {
+        "file_type": file_type,
+        "size_bytes": size_bytes,
+        "text_bytes": text_bytes,
+        "duration_seconds": duration_seconds,
+        "width": width,
+        "height": height,
+        "tokens": tokens,
+    }
+
+
+def measure_archive(f, fmt, path, tokenizer_names=(), progress=None):
+    """
+    Measures a zip/tar/gz archive's members without extracting them.
+
+    Members are read one at a time (archive_probe.iter_archive_members) and
+    folded into per-type totals as they go, so memory stays bounded however
+    many members there are. Text totals are kept per tokenizer, summing each
+    member's estimate_text_tokens, so the archive prices like the sum of
+    its text members.
+
+    Args:
+        f (file): The archive, opened in binary mode at the start.
+        fmt (str): descriptor.format ('zip', 'tar' or 'gz'; others have no members).
+        path (str): The archive's path.
+        tokenizer_names (iterable): See measure_file.
+        progress (callable): Optional progress(archive bytes read) hook.
+
+    Returns:
+        dict: {'count': members seen, 'unpriced': members of a type nothing
+              can price (or unreadable), 'types': {file type: totals}} where
+              the totals are {'count', 'send', 'get'} for Text/Code/PDF
+              ('send'/'get' map tokenizer names to summed input/output
+              tokens), {'count', 'minutes'} for Video/Audio and {'count',
+              'sizes': [[width, height, number of images], ...]} for Image.
+    """
+    from archive_probe import iter_archive_members, ARCHIVE_FORMATS  # Loads gzip/tarfile/zipfile; only archives need them
+
+    summary = {"count": 0, "unpriced": 0, "types": {}}
+    image_sizes = collections.Counter()
+    if fmt not in ARCHIVE_FORMATS:
+        return summary
+    types = summary["types"]
+    for name, size_bytes, stream in iter_archive_members(f, fmt, path):
+        summary["count"] += 1
+        member = measure_member(name, stream, size_bytes, tokenizer_names) if stream is not None else None
+        file_type = member["file_type"] if member is not None else None
+        if file_type in TEXT_PRICED_TYPES:
+            totals = types.setdefault(file_type, {"count": 0, "send": {}, "get": {}})
+            estimates = {tokenizer_registry.HEURISTIC_NAME: estimate_text_tokens(member["text_bytes"])}
+            for tokenizer, count in member["tokens"].items():
+                estimates[tokenizer] = estimate_text_tokens(member["text_bytes"], count)
+            for tokenizer, (send_tokens, get_tokens) in estimates.items():
+                totals["send"][tokenizer] = totals["send"].get(tokenizer, 0) + send_tokens
+                totals["get"][tokenizer] = totals["get"].get(tokenizer, 0) + get_tokens
+        elif file_type in ('Video', 'Audio'):
+            totals = types.setdefault(file_type, {"count": 0, "minutes": 0.0})
+            totals["minutes"] += media_minutes(member)
+        elif file_type == 'Image':
+            totals = types.setdefault(file_type, {"count": 0, "sizes": []})
+            image_sizes[(member["width"], member["height"])] += 1
+        else:
+            summary["unpriced"] += 1
+            continue
+        totals["count"] += 1
+        if progress is not None:
+            progress(f.tell())
+    if image_sizes:
+        types["Image"]["sizes"] = [[width, height, n] for (width, height), n in image_sizes.items()]
+    return summary
+
+
+def tokenizer_names(models):
+    """Tokenizers that measure_file/measure_text should count with for these models."""
+    return tokenizer_registry.REGISTRY.names_for(models)
+
+
+def estimate_text_tokens(size_bytes, token_count=None):
+    """
+    Returns (input_tokens, output_tokens) for a text input.
+
+    Uses the tokenizer count when one is available, otherwise the byte
+    heuristic. Output is assumed to be OUTPUT_TOKEN_RATIO of the input.
+    """
+    if token_count is None:
+        token_count = int(size_bytes / BYTES_PER_TOKEN)
+    estimated_input_tokens = max(1, token_count)
+    estimated_output_tokens = int(estimated_input_tokens * OUTPUT_TOKEN_RATIO)
+    return estimated_input_tokens, estimated_output_tokens
+
+
+def call_budget(model, output_reserve=None):
+    """
+    Input tokens one call to a model can carry: its max_tokens minus the
+    tokens reserved for the response.
+
+    Args:
+        model (dict): A catalog model.
+        output_reserve (int): Tokens to reserve per call. None reserves room
+                              for the estimated response of a full call
+                              (OUTPUT_TOKEN_RATIO of its input).
+
+    Returns:
+        int: The budget, or None if the model has no max_tokens or the
+             reserve leaves nothing.
+    """
+    max_tokens = model.get('max_tokens')
+    if not max_tokens:
+        return None
+    if output_reserve is None:
+        output_reserve = math.ceil(max_tokens * OUTPUT_TOKEN_RATIO / (1 + OUTPUT_TOKEN_RATIO))
+    budget = max_tokens - output_reserve
+    return budget if budget > 0 else None
+
+
+def calls_needed(send_tokens, budget):
+    """
+    Calls an input of send_tokens needs under a call budget (1 if it fits),
+    or None if either is unknown. More than one means the input has to be
+    split (see chunk_planner.py); the cost shown is still for its tokens.
+    """
+    if send_tokens is None or budget is None:
+        return None
+    return -(-send_tokens // budget)
+
+
+def media_minutes(measurement):
+    """
+    Play length of an audio/video input in minutes: the duration read from
+    its headers (media_probe), or BYTES_PER_MEDIA_MINUTE if that failed.
+    """
+    duration_seconds = measurement.get("duration_seconds")
+    if duration_seconds:
+        return duration_seconds / 60
+    return measurement["size_bytes"] / BYTES_PER_MEDIA_MINUTE
+
+
+def image_input_tokens(model, width, height):
+    """
+    Input tokens for one image under a model's image token formula (see
+    model_loader.has_image_token_formula). Only the first frame of an
+    animated image is counted.
+
+    The image is first scaled down to fit 'Image Max Side'. Then:
+      tiles:  also scaled down so its short side is at most 'Image Short
+              Side', then base + tokens per tile * number of tiles.
+      pixels: base + one token per 'Image Pixels per Token' pixels.
+
+    Args:
+        model (dict): A model with an image token formula.
+        width, height (int): Image size in pixels, or None if unknown
+                             (IMAGE_DEFAULT_SIDE is assumed).
+    """
+    if not width or not height:
+        width = height = IMAGE_DEFAULT_SIDE
+    max_side = model.get('image_max_side')
+    if max_side and max(width, height) > max_side:
+        scale = max_side / max(width, height)
+        width, height = width * scale, height * scale
+    base_tokens = model.get('image_base_tokens') or 0
+    if model['image_token_method'] == IMAGE_METHOD_TILES:
+        short_side = model.get('image_short_side')
+        if short_side and min(width, height) > short_side:
+            scale = short_side / min(width, height)
+            width, height = width * scale, height * scale
+        tile = model['image_tile_size']
+        return base_tokens + model['image_tokens_per_tile'] * math.ceil(width / tile) * math.ceil(height / tile)
+    return base_tokens + math.ceil(width * height / model['image_pixels_per_token'])
+
+
+def model_eligible_types(model):
+    """FILE_TYPE_BITS mask of what a model can be priced for (precomputed by load_models_from_csv)."""
+    eligible = model.get('eligible_types')
+    return eligible if eligible is not None else eligible_file_types(model)
+
+
+def price_archive(model, measurement):
+    """
+    Prices an archive's member totals (measure_archive) against one model:
+    every member type the model can price, added up.
+
+    Returns:
+        tuple: (send_tokens, get_tokens, cost, default_rate) where the token
+               sums are None if no priced member is billed by tokens, and
+               default_rate tells whether video used DEFAULT_VIDEO_COST; or
+               None if the model can't price any of the members.
+    """
+    eligible = model_eligible_types(model)
+    send_tokens = get_tokens = None
+    cost = 0.0
+    priced = default_rate = False
+    for file_type, totals in (measurement.get("members") or {}).get("types", {}).items():
+        if not eligible & FILE_TYPE_BITS[file_type]:
+            continue
+        priced = True
+        if file_type in TEXT_PRICED_TYPES:
+            name = tokenizer_registry.REGISTRY.name_for(model)
+            if name not in totals["send"]:
+                name = tokenizer_registry.HEURISTIC_NAME
+            send, get = totals["send"][name], totals["get"][name]
+            send_tokens, get_tokens = (send_tokens or 0) + send, (get_tokens or 0) + get
+            cost += (send / 1000000) * model['input_cost'] + (get / 1000000) * model['output_cost']
+        elif file_type == 'Video':
+            per_min_cost = model.get('video_cost')
+            if per_min_cost is None:
+                per_min_cost, default_rate = DEFAULT_VIDEO_COST, True
+            cost += totals["minutes"] * per_min_cost
+        elif file_type == 'Audio':
+            cost += totals["minutes"] * model['audio_cost']
+        elif file_type == 'Image':
+            get = totals["count"] * IMAGE_OUTPUT_TOKENS
+            get_tokens = (get_tokens or 0) + get
+            if has_image_token_formula(model):
+                send = sum(n * image_input_tokens(model, width, height) for width, height, n in totals["sizes"])
+                send_tokens = (send_tokens or 0) + send
+                cost += (send / 1000000) * model['input_cost'] + (get / 1000000) * model['output_cost']
+            else:
+                cost += totals["count"] * (model['image_cost'] + ((IMAGE_OUTPUT_TOKENS / 1000000) * model['output_cost']))
+    if not priced:
+        return None
+    return send_tokens, get_tokens, cost, default_rate
+
+
+def format_cost(cost, default_rate=False):
+    """Formats a USD cost the way the assessment table and CSV output show it."""
+    return f"${cost:.6f} (default rate)" if default_rate else f"${cost:.6f}"
+
+
+def display_row(row):
+    """
+    Formats a numeric result row (price_model with numeric=True) for display:
+    the cost becomes a "$x.xxxxxx" string, the Default Rate flag folds into
+    it, and missing values read NOT_SUPPORTED.
+    """
+    shown = {key: NOT_SUPPORTED if value is None else value for key, value in row.items() if key != "Default Rate"}
+    shown["Total Cost (USD)"] = format_cost(row["Total Cost (USD)"], row["Default Rate"])
+    return shown
+
+
+def price_model(model, measurement, numeric=False):
+    """
+    Prices one measured input against one model.
+
+    Args:
+        model (dict): A model as returned by load_models_from_csv.
+        measurement (dict): Output of measure_file or measure_text.
+        numeric (bool): Return the row keyed by NUMERIC_RESULT_COLUMNS, with
+                        the cost as a float in USD, a "Default Rate" flag and
+                        None for missing values, instead of display strings.
+
+    Returns:
+        dict: A result row keyed by RESULT_COLUMNS, or None if the model does
+              not support this file type or has no pricing for it.
+    """
+    considered_type = measurement["file_type"]
+    cost = None
+    default_rate = False
+    send_tokens = get_tokens = total_tokens = None
+    if considered_type == 'Archive':
+        priced = price_archive(model, measurement)
+        if priced is None:
+            return None
+        send_tokens, get_tokens, cost, default_rate = priced
+        if send_tokens is not None and get_tokens is not None:
+            total_tokens = send_tokens + get_tokens
+    elif not model_eligible_types(model) & FILE_TYPE_BITS.get(considered_type, 0):
+        return None
+    text_bytes = measurement.get("text_bytes")
+    if text_bytes is None:
+        text_bytes = measurement["size_bytes"]
+    # Code files use the text logic (eligible if the model supports code or text); PDFs price their text
+    if considered_type in TEXT_PRICED_TYPES:
+        token_count = measurement.get("tokens", {}).get(tokenizer_registry.REGISTRY.name_for(model))
+        send_tokens, get_tokens = estimate_text_tokens(text_bytes, token_count)
+        total_tokens = send_tokens + get_tokens
+        cost = (send_tokens / 1000000) * model['input_cost'] + (get_tokens / 1000000) * model['output_cost']
+    # VIDEO
+    elif considered_type == 'Video':
+        estimated_minutes = media_minutes(measurement)
+        per_min_cost = model.get('video_cost', None)
+        if per_min_cost is None:
+            per_min_cost, default_rate = DEFAULT_VIDEO_COST, True
+        cost = estimated_minutes * per_min_cost
+    # AUDIO
+    elif considered_type == 'Audio':
+        estimated_minutes = media_minutes(measurement)
+        cost = estimated_minutes * model['audio_cost']
+    # IMAGE
+    elif considered_type == 'Image':
+        get_tokens = IMAGE_OUTPUT_TOKENS
+        if has_image_token_formula(model):
+            send_tokens = image_input_tokens(model, measurement.get("width"), measurement.get("height"))
+            total_tokens = send_tokens + get_tokens
+            cost = (send_tokens / 1000000) * model['input_cost'] + (get_tokens / 1000000) * model['output_cost']
+        else:
+            cost = model['image_cost'] + ((IMAGE_OUTPUT_TOKENS / 1000000) * model['output_cost'])
+    if cost is None:
+        return None
+    row = {
+        "Company": model['company'],
+        "Model": model['model'],
+        "Version": model['version'],
+        "File Type Considered": considered_type,
+        "API Types": ", ".join(model['api_types']),
+        "Max Tokens per Call": model['max_tokens'],
+        "Calls": calls_needed(send_tokens, call_budget(model)),
+        "Send Tokens": send_tokens,
+        "Get Tokens": get_tokens,
+        "Total Tokens": total_tokens,
+        "Total Cost (USD)": cost,
+        "Default Rate": default_rate
+    }
+    return row if numeric else display_row(row)
+
+
+def assess(measurement, models, numeric=False):
+    """
+    Prices a measured input against every given model.
+
+    Args:
+        numeric (bool): Build numeric rows, see price_model.
+
+    Returns:
+        tuple: (results, unsupported_models) where results is a list of result
+               rows and unsupported_models a list of "Company - Model" labels.
+    """
+    results = []
+    unsupported_models = []
+    with metrics.timed("price"):
+        for model in models:
+            row = price_model(model, measurement, numeric)
+            if row is None:
+                unsupported_models.append(f"{model['company']} - {model['model']}")
+            else:
+                results.append(row)
+    metrics.count("amm_assessments_total")
+    metrics.count("amm_priced_pairs_total", len(models))
+    return results, unsupported_models
+
+
+def iter_input_paths(sources=(), manifest=None):
+    """
+    Expands directories and manifests into a stream of file paths.
+
+    Args:
+        sources (iterable): Files and/or directories. Directories are walked
+                            recursively in sorted order.
+        manifest (str): Optional text file with one path per line ('-' for
+                        stdin). Blank lines and lines starting with '#' are
+                        skipped; relative paths resolve against the manifest.
+
+    Yields:
+        str: File paths, in order.
+    """
+    for source in sources:
+        if os.path.isdir(source):
+            for root, dirs, files in os.walk(source):
+                dirs.sort()
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield source
+    if manifest:
+        if manifest == '-':
+            lines, base_dir = sys.stdin, os.getcwd()
+        else:
+            lines, base_dir = open(manifest, 'r', encoding='utf-8'), os.path.dirname(os.path.abspath(manifest))
+        try:
+            for line in lines:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                yield line if os.path.isabs(line) else os.path.join(base_dir, line)
+        finally:
+            if lines is not sys.stdin:
+                lines.close()
+
+
+def _measure_chunk(paths, tokenizer_names, with_hash):
+    """
+    Process-pool work unit: measures a list of files.
+
+    Returns a list of (path, measurement, error, content hash, stat) tuples.
+    Errors and probe errors are returned as repr strings so every value
+    pickles cleanly back to the parent.
+    """
+    out = []
+    for path in paths:
+        try:
+            st = os.stat(path) if with_hash else None
+            digest = result_cache.content_hash(path, st.st_size) if with_hash else None
+            measurement = measure_file(path, tokenizer_names)
+            if measurement["probe_error"] is not None:
+                measurement["probe_error"] = repr(measurement["probe_error"])
+            out.append((path, measurement, None, digest, st))
+        except Exception as e:
+            out.append((path, None, repr(e), None, None))
+    return out
+
+
+def _iter_measurements_parallel(paths, tokenizer_names, cache, workers, chunksize, ordered):
+    # Units are (slots, future): slots hold parent-side cache hits/errors in
+    # input order, with None placeholders for the misses sent to the pool.
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED  # Pulls in multiprocessing; not needed for workers=1
+
+    pending = collections.deque()
+    path_iter = iter(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        while True:
+            # Keep a bounded number of chunks in flight so huge manifests stream
+            while len(pending) < workers * 2:
+                chunk = list(itertools.islice(path_iter, chunksize))
+                if not chunk:
+                    break
+                slots, misses = [], []
+                for path in chunk:
+                    if cache is not None:
+                        try:
+                            measurement, _ = cache.lookup(path, tokenizer_names)
+                        except Exception as e:
+                            slots.append((path, None, repr(e)))
+                            continue
+                        if measurement is not None:
+                            measurement["path"] = path
+                            slots.append((path, measurement, None))
+                            continue
+                    slots.append(None)
+                    misses.append(path)
+                future = pool.submit(_measure_chunk, misses, tokenizer_names, cache is not None) if misses else None
+                pending.append((slots, future))
+            if not pending:
+                break
+
+            if ordered:
+                slots, future = pending.popleft()
+            else:
+                ready = next((unit for unit in pending if unit[1] is None or unit[1].done()), None)
+                if ready is None:
+                    wait([unit[1] for unit in pending], return_when=FIRST_COMPLETED)
+                    ready = next(unit for unit in pending if unit[1].done())
+                pending.remove(ready)
+                slots, future = ready
+
+            measured = iter(future.result() if future is not None else ())
+            for slot in slots:
+                if slot is not None:
+                    yield slot
+                    continue
+                path, measurement, error, digest, st = next(measured)
+                if cache is not None and measurement is not None:
+                    cache.put(path, tokenizer_names, measurement, digest, st)
+                yield path, measurement, error
+
+
+def iter_measurements(paths, tokenizer_names=(), cache=None, workers=1, chunksize=CHUNKSIZE, ordered=True):
+    """
+    Measures files, optionally across a process pool.
+
+    With workers > 1 paths are grouped into chunks of chunksize and measured
+    by a ProcessPoolExecutor (type sniffing, image verification and
+    tokenizing all happen in the workers). Cache lookups are stat-only and
+    stay in this process; misses are hashed in the workers and stored here.
+
+    Args:
+        paths (iterable): File paths.
+        tokenizer_names (iterable): See measure_file.
+        cache (MeasurementCache): Optional measurement cache.
+        workers (int): Worker processes; 1 measures serially in-process.
+        chunksize (int): Files per work unit sent to a worker.
+        ordered (bool): Yield in input order (True) or as chunks complete.
+
+    Yields:
+        tuple: (path, measurement or None, error repr or None).
+    """
+    if workers > 1:
+        yield from _iter_measurements_parallel(paths, list(tokenizer_names), cache, workers, chunksize, ordered)
+        return
+    measure = cache.measure if cache is not None else measure_file
+    for path in paths:
+        try:
+            yield path, measure(path, tokenizer_names), None
+        except Exception as e:
+            yield path, None, repr(e)
+
+
+def _file_assessment(path, measurement, results, unsupported):
+    return {
+        "path": path,
+        "file_type": measurement["file_type"],
+        "size_bytes": measurement["size_bytes"],
+        "results": results,
+        "unsupported": unsupported,
+        "error": None,
+    }
+
+
+def _error_assessment(path, error):
+    return {"path": path, "file_type": None, "size_bytes": None, "results": [], "unsupported": [], "error": error}
+
+
+def assess_paths(paths, models, block_size=BLOCK_SIZE, cache=None, workers=1, chunksize=CHUNKSIZE, ordered=True, numeric=False):
+    """
+    Measures and prices each file, streaming one assessment per file.
+
+    When NumPy is available files are priced in blocks of block_size through
+    cost_matrix (one vectorized pass per block); otherwise each file is priced
+    with assess(). Output is identical either way.
+
+    Args:
+        paths (iterable): File paths, e.g. from iter_input_paths.
+        models (list): Models as returned by load_models_from_csv.
+        block_size (int): Files per vectorized pricing pass.
+        cache (MeasurementCache): Optional result_cache.MeasurementCache;
+                                  unchanged files are then not re-read.
+        workers, chunksize, ordered: Parallel measurement options, see
+                                     iter_measurements.
+        numeric (bool): Build numeric result rows, see price_model.
+
+    Yields:
+        dict: {'path', 'file_type', 'size_bytes', 'results', 'unsupported',
+               'error'}. On a read failure 'error' holds the message and the
+               other fields are empty.
+    """
+    names = tokenizer_names(models)
+    measurements = iter_measurements(paths, names, cache, workers, chunksize, ordered)
+    try:
+        import cost_matrix
+        model_arrays = cost_matrix.ModelArrays(models)
+    except ImportError:
+        cost_matrix = None
+
+    if cost_matrix is None:
+        for path, measurement, error in measurements:
+            if measurement is None:
+                yield _error_assessment(path, error)
+                continue
+            results, unsupported = assess(measurement, models, numeric)
+            yield _file_assessment(path, measurement, results, unsupported)
+        return
+
+    while True:
+        block = list(itertools.islice(measurements, block_size))
+        if not block:
+            break
+        measured = [item[1] for item in block if item[1] is not None]
+        # One "price" observation per block: the vectorized pass plus building its rows
+        clock = metrics.stage_clock("price")
+        compute = cost_matrix.compute_cost_matrix if clock is None else clock.wrap(cost_matrix.compute_cost_matrix)
+        matrix = compute(measured, model_arrays) if measured else None
+        assessment = None if matrix is None else matrix.assessment if clock is None else clock.wrap(matrix.assessment)
+        i = 0
+        for path, measurement, error in block:
+            if measurement is None:
+                yield _error_assessment(path, error)
+                continue
+            results, unsupported = assessment(i, numeric)
+            i += 1
+            yield _file_assessment(path, measurement, results, unsupported)
+        if clock is not None:
+            clock.finish()
+        metrics.count("amm_assessments_total", len(measured))
+        metrics.count("amm_priced_pairs_total", len(measured) * len(models))
+
+
+def iter_result_rows(assessments, include_unsupported=False, numeric=False):
+    """
+    Flattens per-file assessments into one row per (file, model).
+
+    Unsupported pairs (include_unsupported) carry NOT_SUPPORTED as their cost,
+    or None when numeric is set (pass the same value given to assess_paths).
+    """
+    unsupported_cost = None if numeric else NOT_SUPPORTED
+    for item in assessments:
+        if item["error"]:
+            yield {"File": item["path"], "Error": item["error"]}
+            continue
+        for row in item["results"]:
+            yield {"File": item["path"], **row}
+        if include_unsupported:
+            for label in item["unsupported"]:
+                yield {"File": item["path"], "File Type Considered": item["file_type"], "Model": label, "Total Cost (USD)": unsupported_cost}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless AMM cost estimator: prices files against every model in the catalog.")
+    parser.add_argument("paths", nargs="*", help="Files or directories to assess (directories are walked recursively).")
+    parser.add_argument("--manifest", help="Text file listing one path per line ('-' reads stdin).")
+    parser.add_argument("--catalog", default=CSV_PATH, help="Model reference CSV (default: model_reference.csv next to this script).")
+    parser.add_argument("--format", choices=["csv", "jsonl", "xlsx", "parquet"], help="Output format (default: from the --output extension, else csv). xlsx needs openpyxl, parquet needs pyarrow.")
+    parser.add_argument("--output", default="-", help="Output file (default: stdout).")
+    parser.add_argument("--numeric", action="store_true", help="Write costs as plain numbers with a 'Default Rate' column, and leave missing values empty (always on for xlsx and parquet).")
+    parser.add_argument("--include-unsupported", action="store_true", help="Also emit a row for each unsupported file/model pair.")
+    parser.add_argument("--cache", nargs="?", const=result_cache.DEFAULT_CACHE_PATH, help="Reuse measurements of unchanged files from this SQLite cache (default path if no value given).")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes for measuring files (0 = one per CPU; default 1).")
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE, help=f"Files per worker work unit (default {CHUNKSIZE}).")
+    parser.add_argument("--unordered", action="store_true", help="Emit files as soon as they are measured instead of in input order.")
+    parser.add_argument("--cache-max-mb", type=int, default=result_cache.DEFAULT_MAX_BYTES // (1024 * 1024), help="Size cap of the measurement cache in MB.")
+    parser.add_argument("--history", nargs="?", const=DEFAULT_HISTORY_PATH, help="Also record every result in this assessment history database (default path if no value given); query it with history_store.py. File fingerprints are only recorded with --cache.")
+    parser.add_argument("--metrics", help="Record stage timings and counters: json:FILE (written at exit), json:- (stderr) or prometheus[:PORT] (default: $AMM_METRICS). With --workers, detect/read/tokens happen in the worker processes and are not included.")
+    parser.add_argument("--profile", metavar="DIR", help="Record the run with cProfile into DIR (default: $AMM_PROFILE).")
+    args = parser.parse_args(argv)
+
+    if not args.paths and not args.manifest:
+        parser.error("give at least one path or --manifest")
+    import result_export
+    fmt = args.format or (result_export.export_format(args.output) if args.output != "-" else None) or "csv"
+    if fmt in ("xlsx", "parquet") and args.output == "-":
+        parser.error(f"{fmt} output needs --output FILE")
+    numeric = args.numeric or fmt in ("xlsx", "parquet")
+    if args.profile:
+        metrics.set_profile_dir(args.profile)
+    try:
+        metrics.start_exporter(args.metrics) if args.metrics else metrics.configure_from_env()
+    except (ValueError, OSError) as e:
+        parser.error(f"--metrics: {e}")
+
+    models = load_models_from_csv(args.catalog)
+    if not models:
+        print("[ERROR] No models loaded; nothing to price.", file=sys.stderr)
+        return 1
+
+    cache = result_cache.MeasurementCache(args.cache, args.cache_max_mb * 1024 * 1024, args.catalog) if args.cache else None
+    history = None
+    try:
+        workers = args.workers or os.cpu_count() or 1
+        # History needs numeric rows; they are formatted back for the output if it isn't numeric
+        assessments = assess_paths(iter_input_paths(args.paths, args.manifest), models, cache=cache, workers=workers, chunksize=args.chunksize, ordered=not args.unordered, numeric=numeric or bool(args.history))
+        if args.history:
+            history = HistoryStore(args.history)
+            # The cache already knows each file's hash; without it files are
+            # recorded unfingerprinted rather than read a second time here
+            fingerprint = cache.fingerprint if cache is not None else None
+            assessments = history.record_assessments(assessments, catalog_revision(args.catalog), "cli", fingerprint)
+            if not numeric:
+                assessments = (dict(item, results=[display_row(row) for row in item["results"]]) for item in assessments)
+        rows = iter_result_rows(assessments, args.include_unsupported, numeric)
+        columns = ["File"] + (NUMERIC_RESULT_COLUMNS if numeric else RESULT_COLUMNS) + ["Error"]
+        with metrics.profiled("estimator"):
+            result_export.export_rows(rows, sys.stdout if args.output == "-" else args.output, fmt, columns)
+    except (ImportError, OSError) as e:
+        print(f"[ERROR] Could not write {args.output}: {e}", file=sys.stderr)
+        return 1
+    except sqlite3.Error as e:
+        print(f"[ERROR] Could not record history in {args.history}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if cache is not None:
+            cache.close()
+        if history is not None:
+            history.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import codecs
+import os
+
+# --- Single-read file type detection ---
+# Reads one header buffer from an already-open file and classifies it by magic
+# bytes, falling back to the extension lists. The resulting FileDescriptor is
+# handed to the rest of the pipeline so nothing has to re-open the file just
+# to find out what it is.
+
+HEADER_SIZE = 8192  # Covers the old 1 KB UTF-8 probe and every signature below
+
+CODE_EXTENSIONS = ['.py', '.js', '.cpp', '.c', '.java', '.rb', '.go', '.rs', '.ts', '.php', '.cs', '.swift', '.kt', '.scala', '.sh', '.bat', '.pl', '.r', '.jl', '.lua', '.sql', '.html', '.css', '.json', '.xml', '.yaml', '.yml', '.md', '.ipynb']
+VIDEO_EXTENSIONS = ['.mp4', '.avi', '.mov', '.wmv', '.flv', '.mkv', '.webm']
+IMAGE_EXTENSIONS = ['.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tiff', '.webp', '.ico']
+AUDIO_EXTENSIONS = ['.mp3', '.wav', '.aac', '.ogg', '.flac', '.m4a']
+PDF_EXTENSIONS = ['.pdf']
+ARCHIVE_EXTENSIONS = ['.zip', '.rar', '.7z', '.tar', '.gz']
+
+# (offset, signature, format, file type); checked in order, first match wins
+MAGIC_SIGNATURES = [
+    (0, b'\x89PNG\r\n\x1a\n', 'png', 'Image'),
+    (0, b'\xff\xd8\xff', 'jpeg', 'Image'),
+    (0, b'GIF87a', 'gif', 'Image'),
+    (0, b'GIF89a', 'gif', 'Image'),
+    (0, b'II*\x00', 'tiff', 'Image'),
+    (0, b'MM\x00*', 'tiff', 'Image'),
+    (0, b'\x00\x00\x01\x00', 'ico', 'Image'),
+    (0, b'%PDF-', 'pdf', 'PDF'),
+    (0, b'PK\x03\x04', 'zip', 'Archive'),
+    (0, b'PK\x05\x06', 'zip', 'Archive'),
+    (0, b'Rar!\x1a\x07', 'rar', 'Archive'),
+    (0, b'7z\xbc\xaf\x27\x1c', '7z', 'Archive'),
+    (0, b'\x1f\x8b', 'gz', 'Archive'),
+    (257, b'ustar', 'tar', 'Archive'),
+    (0, b'FLV\x01', 'flv', 'Video'),
+    (0, b'\x30\x26\xb2\x75\x8e\x66\xcf\x11', 'wmv', 'Video'),
+]
+RIFF_FORMATS = {b'WAVE': ('wav', 'Audio'), b'AVI ': ('avi', 'Video'), b'WEBP': ('webp', 'Image')}
+AUDIO_MP4_BRANDS = (b'M4A ', b'M4B ', b'M4P ', b'F4A ')
+
+
+def _is_id3_header(header):
+    """ID3v2 tag header: version 2-4, no undefined flag bits, syncsafe size."""
+    return (header[:3] == b'ID3' and len(header) >= 10 and 2 <= header[3] <= 4 and header[4] != 0xff
+            and header[5] & 0x0f == 0 and all(byte < 0x80 for byte in header[6:10]))
+
+
+def _is_flac_header(header):
+    """'fLaC' followed by the mandatory STREAMINFO block header (type 0, length 34)."""
+    return header[:4] == b'fLaC' and len(header) >= 8 and header[4] & 0x7f == 0 and header[5:8] == b'\x00\x00\x22'
+
+
+class FileDescriptor:
+    """
+    What detect_file learned about a file from its header.
+
+    Attributes:
+        path (str): The file's path.
+        size_bytes (int): Size from fstat.
+        header (bytes): First HEADER_SIZE bytes (fewer for small files).
+        is_binary (bool): True unless the header decodes as UTF-8 and no
+                          binary signature matched.
+        file_type (str): 'Text', 'Code', 'Video', 'Image', 'Audio', 'PDF',
+                         'Archive' or 'Unknown'.
+        format (str): Container/format name from the magic bytes (e.g.
+                      'png', 'mp4'), or None if only the extension was used.
+        probe_error (Exception): The UTF-8 decode error, if any.
+    """
+
+    __slots__ = ("path", "size_bytes", "header", "is_binary", "file_type", "format", "probe_error")
+
+    def __init__(self, path, size_bytes, header, is_binary, file_type, format=None, probe_error=None):
+        self.path = path
+        self.size_bytes = size_bytes
+        self.header = header
+        self.is_binary = is_binary
+        self.file_type = file_type
+        self.format = format
+        self.probe_error = probe_error
+
+    def __repr__(self):
+        return f"FileDescriptor({self.path!r}, type={self.file_type!r}, format={self.format!r}, size={self.size_bytes})"
+
+
+def get_file_type_label(path, is_binary):
+    """
+    Classifies a file by extension into one of the assessment categories.
+
+    Args:
+        path (str): Path (or just the name) of the file.
+        is_binary (bool): Whether the file failed the UTF-8 text probe.
+
+    Returns:
+        str: 'Text', 'Code', 'Video', 'Image', 'Audio', 'PDF', 'Archive' or 'Unknown'.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if not is_binary:
+        if ext in CODE_EXTENSIONS:
+            return 'Code'
+        return 'Text'
+    if ext in VIDEO_EXTENSIONS:
+        return 'Video'
+    elif ext in IMAGE_EXTENSIONS:
+        return 'Image'
+    elif ext in AUDIO_EXTENSIONS:
+        return 'Audio'
+    elif ext in PDF_EXTENSIONS:
+        return 'PDF'
+    elif ext in ARCHIVE_EXTENSIONS:
+        return 'Archive'
+    else:
+        return 'Unknown'
+
+
+def sniff_format(header):
+    """
+    Identifies a binary format from its leading bytes.
+
+    Returns:
+        tuple: (format, file type), or (None, None) if nothing matched.
+    """
+    for offset, signature, fmt, file_type in MAGIC_SIGNATURES:
+        if header[offset:offset + len(signature)] == signature:
+            return fmt, file_type
+    # 'fLaC' and 'ID3' are plain ASCII, so text could start with them; only
+    # trust them when the block / tag header after them is well formed
+    if _is_flac_header(header):
+        return 'flac', 'Audio'
+    if _is_id3_header(header):
+        return 'mp3', 'Audio'
+    if header[:4] == b'RIFF' and header[8:12] in RIFF_FORMATS:
+        return RIFF_FORMATS[header[8:12]]
+    if header[4:8] == b'ftyp':
+        brand = header[8:12]
+        if brand in AUDIO_MP4_BRANDS:
+            return 'm4a', 'Audio'
+        return ('mov', 'Video') if brand == b'qt  ' else ('mp4', 'Video')
+    if header[:4] == b'\x1a\x45\xdf\xa3':  # EBML (Matroska/WebM)
+        return ('webm', 'Video') if b'webm' in header[:64] else ('mkv', 'Video')
+    if header[:4] == b'OggS':
+        return ('ogg', 'Video') if b'theora' in header[:128] else ('ogg', 'Audio')
+    return None, None
+
+
+def sniff_weak_format(header):
+    """
+    Short signatures that plain text could start with by accident; only
+    consulted once the header has already failed to decode as UTF-8.
+    """
+    if header[:2] in (b'\xff\xf1', b'\xff\xf9'):  # AAC ADTS
+        return 'aac', 'Audio'
+    # MPEG audio frame sync (excluding UTF-16 byte order marks)
+    if len(header) > 1 and header[0] == 0xff and header[1] & 0xe0 == 0xe0 and header[1] < 0xfe and (header[1] >> 1) & 3:
+        return 'mp3', 'Audio'
+    if header[:2] == b'BM' and header[6:10] == b'\x00\x00\x00\x00':
+        return 'bmp', 'Image'
+    return None, None
+
+
+def detect_file(path, f):
+    """
+    Classifies an open file from a single header read.
+
+    The file is left positioned right after the header; callers that go on
+    to read the whole file should seek(0) (or reuse descriptor.header).
+
+    Args:
+        path (str): The file's path (used for the extension fallback).
+        f (file): The same file opened in binary mode.
+
+    Returns:
+        FileDescriptor: The detection result.
+    """
+    size_bytes = os.fstat(f.fileno()).st_size
+    return describe_header(path, f.read(HEADER_SIZE), size_bytes)
+
+
+def describe_header(path, header, size_bytes):
+    """
+    Classifies a file from its first HEADER_SIZE bytes (detect_file without
+    the file; used for archive members, which have no file handle to fstat).
+
+    Args:
+        path (str): The file's path or member name (for the extension fallback).
+        header (bytes): The file's first bytes.
+        size_bytes (int): Its size, or None if not known up front.
+
+    Returns:
+        FileDescriptor: The detection result.
+    """
+    fmt, file_type = sniff_format(header)
+    probe_error = None
+    if fmt is not None:
+        is_binary = True
+    else:
+        try:
+            # final=False: a multi-byte character cut off by the buffer end is fine
+            codecs.getincrementaldecoder('utf-8')().decode(header, final=False)
+            is_binary = False
+        except UnicodeDecodeError as e:
+            is_binary = True
+            probe_error = e
+            fmt, file_type = sniff_weak_format(header)
+        if fmt is None:
+            file_type = get_file_type_label(path, is_binary)
+    return FileDescriptor(path, size_bytes, header, is_binary, file_type, fmt, probe_error)
+
+
+def detect_path(path):
+    """Opens a file just long enough to detect it (for callers that don't need the handle)."""
+    with open(path, 'rb') as f:
+        return detect_file(path, f)
@@ -0,0 +1,201 @@
+import codecs
+import io
+import mmap
+import os
+
+# --- Constant-memory file reading ---
+# Helpers that walk a file in fixed-size chunks so measuring a file never
+# holds more than CHUNK_SIZE bytes of it in memory, whatever its size.
+
+CHUNK_SIZE = 1024 * 1024        # 1 MB per read
+PREVIEW_CHARS = 1000000         # Max characters loaded into the GUI text box
+PAGE_BYTES = 256 * 1024         # Larger files are shown a page of this size at a time
+PAGE_SEEK_BYTES = 4096          # How far a page start may move to land after a line break
+
+
+def iter_file_chunks(f, chunk_size=CHUNK_SIZE):
+    """Yields the raw bytes of an open binary file, chunk_size bytes at a time."""
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+class TextTally:
+    """
+    Running character and word counts of a text fed in pieces.
+
+    Word counts follow str.split() semantics, including words that straddle
+    two pieces. Each piece is also passed on to the consumers.
+
+    Args:
+        consumers (iterable): Callables fed each piece of text, in order.
+    """
+
+    def __init__(self, consumers=()):
+        self.consumers = list(consumers)
+        self.char_count = 0
+        self.word_count = 0
+        self._in_word = False  # Whether the previous piece ended inside a word
+
+    def feed(self, text):
+        if not text:
+            return
+        self.char_count += len(text)
+        for consume in self.consumers:
+            consume(text)
+        words = len(text.split())
+        if self._in_word and not text[0].isspace() and words:
+            words -= 1  # Same word continues from the previous piece
+        self.word_count += words
+        self._in_word = not text[-1].isspace()
+
+
+class ReplayStream:
+    """
+    Read-only stream that returns an already-read header before the rest of
+    the underlying stream (e.g. an archive member that was sniffed by
+    reading its first bytes and can't seek back).
+    """
+
+    def __init__(self, header, stream):
+        self._header = header
+        self._stream = stream
+
+    def read(self, size=-1):
+        if not self._header:
+            return self._stream.read(size)
+        if size is None or size < 0:
+            data, self._header = self._header + self._stream.read(), b''
+            return data
+        data, self._header = self._header[:size], self._header[size:]
+        return data
+
+
+def scan_text_file(path, chunk_size=CHUNK_SIZE, consumers=(), progress=None):
+    """Opens a file and runs scan_text_stream over it."""
+    with open(path, 'rb') as f:
+        return scan_text_stream(f, chunk_size, consumers, progress)
+
+
+def scan_text_stream(f, chunk_size=CHUNK_SIZE, consumers=(), progress=None):
+    """
+    Streams a UTF-8 file once, validating it and counting its contents.
+
+    Word counts follow str.split() semantics, including words that straddle
+    a chunk boundary.
+
+    Args:
+        f (file): File opened in binary mode, positioned at the start.
+        chunk_size (int): Bytes per read.
+        consumers (iterable): Callables fed each decoded piece of text, in
+                              order (e.g. StreamingCounter.feed), so other
+                              per-text work can share this single pass.
+        progress (callable): Optional progress(bytes_read) called after each
+                             chunk; it may raise to abort the scan.
+
+    Returns:
+        dict: {'size_bytes', 'char_count', 'word_count'}.
+
+    Raises:
+        UnicodeDecodeError: If the file is not valid UTF-8.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    tally = TextTally(consumers)
+    size_bytes = 0
+    for chunk in iter_file_chunks(f, chunk_size):
+        size_bytes += len(chunk)
+        if progress is not None:
+            progress(size_bytes)
+        tally.feed(decoder.decode(chunk))
+    decoder.decode(b'', final=True)  # Raises on a truncated trailing sequence
+    return {"size_bytes": size_bytes, "char_count": tally.char_count, "word_count": tally.word_count}
+
+
+def read_text_preview(path, max_chars=PREVIEW_CHARS):
+    """Opens a file and returns read_text_preview_stream over it."""
+    with open(path, 'rb') as f:
+        return read_text_preview_stream(f, max_chars)
+
+
+def read_text_preview_stream(f, max_chars=PREVIEW_CHARS):
+    """
+    Reads at most max_chars characters of a text file.
+
+    Args:
+        f (file): File opened in binary mode, positioned at the start. It is
+                  left open for further use.
+
+    Returns:
+        tuple: (text, truncated) where truncated is True if the file has more.
+    """
+    reader = io.TextIOWrapper(f, encoding='utf-8', errors='ignore')
+    try:
+        text = reader.read(max_chars)
+        truncated = bool(reader.read(1))
+    finally:
+        reader.detach()  # Hand the underlying file back to the caller
+    return text, truncated
+
+
+class TextFilePager:
+    """
+    Random access to fixed-size pages of a large text file.
+
+    The file is memory-mapped, so showing a page touches only that page's
+    bytes: nothing is read up front and there is no index to build. Page i
+    covers roughly bytes [i * page_bytes, (i + 1) * page_bytes), with each
+    boundary moved forward to just after a line break (or at least off the
+    middle of a UTF-8 sequence) so lines are not split between pages.
+
+    Args:
+        path (str): The file to page through.
+        page_bytes (int): Nominal page size; must exceed PAGE_SEEK_BYTES.
+    """
+
+    def __init__(self, path, page_bytes=PAGE_BYTES):
+        self.path = path
+        self.page_bytes = page_bytes
+        self._file = open(path, 'rb')
+        try:
+            self.size_bytes = os.fstat(self._file.fileno()).st_size
+            # mmap can't map an empty file
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self.size_bytes else None
+        except Exception:
+            self._file.close()
+            raise
+        self.page_count = max(1, -(-self.size_bytes // page_bytes))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _page_start(self, index):
+        if index <= 0:
+            return 0
+        if index >= self.page_count:
+            return self.size_bytes
+        pos = index * self.page_bytes
+        newline = self._map.find(b'\n', pos, min(pos + PAGE_SEEK_BYTES, self.size_bytes))
+        if newline != -1:
+            return newline + 1
+        while pos < self.size_bytes and self._map[pos] & 0xC0 == 0x80:
+            pos += 1  # UTF-8 continuation byte
+        return pos
+
+    def page(self, index):
+        """Decoded text of page index (0-based); invalid bytes are replaced."""
+        if self._map is None:
+            return ""
+        return self._map[self._page_start(index):self._page_start(index + 1)].decode('utf-8', errors='replace')
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
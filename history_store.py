@@ -0,0 +1,390 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+# --- Assessment history ---
+# Keeps every priced result row (numeric cost, tokens, model, file type,
+# file fingerprint and catalog revision) in a SQLite file, so questions such
+# as "projected spend per company last month" are a query instead of a
+# re-run:
+#
+#   python history_store.py spend --by company --since 2026-09-01 --until 2026-09-30
+#   python history_store.py spend --by month,model --company OpenAI --format json
+#   python history_store.py recent --limit 20
+#
+# Rows go to `estimates`, with models and files stored once each in their own
+# tables. Every write also folds its rows into `daily_rollup` (one row per
+# day, model and file type) in the same transaction, so spend queries read
+# the rollup, a few thousand rows a year, and stay in milliseconds however
+# many millions of estimates have been recorded. Days are local dates.
+# `rebuild` recomputes the rollup from the estimates if it is ever in doubt.
+
+DEFAULT_HISTORY_PATH = os.environ.get("AMM_HISTORY_PATH", os.path.join(os.path.expanduser('~'), '.amm', 'history.sqlite'))
+COMMIT_EVERY = 50000     # Estimate rows batched per transaction by record_assessments
+SCHEMA_VERSION = 1
+
+GROUP_COLUMNS = {
+    "company": "m.company",
+    "model": "m.company || ' - ' || m.model",
+    "version": "m.version",
+    "file_type": "r.file_type",
+    "day": "r.day",
+    "month": "substr(r.day, 1, 7)",
+    "year": "substr(r.day, 1, 4)",
+}
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS models (
+        model_id INTEGER PRIMARY KEY, company TEXT NOT NULL, model TEXT NOT NULL, version TEXT NOT NULL,
+        UNIQUE (company, model, version));
+    CREATE INDEX IF NOT EXISTS idx_models_company ON models(company);
+    CREATE INDEX IF NOT EXISTS idx_models_model ON models(model);
+    CREATE TABLE IF NOT EXISTS files (
+        file_id INTEGER PRIMARY KEY, content_hash TEXT, path TEXT, file_type TEXT, size_bytes INTEGER,
+        UNIQUE (content_hash, path));
+    CREATE TABLE IF NOT EXISTS runs (
+        run_id INTEGER PRIMARY KEY, time REAL NOT NULL, source TEXT, catalog_revision TEXT);
+    CREATE TABLE IF NOT EXISTS estimates (
+        estimate_id INTEGER PRIMARY KEY, run_id INTEGER NOT NULL, file_id INTEGER NOT NULL, model_id INTEGER NOT NULL,
+        time REAL NOT NULL, file_type TEXT NOT NULL, send_tokens INTEGER, get_tokens INTEGER, total_tokens INTEGER,
+        cost REAL, default_rate INTEGER NOT NULL DEFAULT 0);
+    CREATE INDEX IF NOT EXISTS idx_estimates_time ON estimates(time);
+    CREATE INDEX IF NOT EXISTS idx_estimates_model_time ON estimates(model_id, time);
+    CREATE INDEX IF NOT EXISTS idx_estimates_type_time ON estimates(file_type, time);
+    CREATE INDEX IF NOT EXISTS idx_estimates_file ON estimates(file_id);
+    CREATE TABLE IF NOT EXISTS daily_rollup (
+        day TEXT NOT NULL, model_id INTEGER NOT NULL, file_type TEXT NOT NULL,
+        estimates INTEGER NOT NULL, total_cost REAL NOT NULL, total_tokens INTEGER NOT NULL, default_rate_estimates INTEGER NOT NULL,
+        PRIMARY KEY (day, model_id, file_type)) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_rollup_model_day ON daily_rollup(model_id, day);
+"""
+
+_ROLLUP_UPSERT = """
+    INSERT INTO daily_rollup VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (day, model_id, file_type) DO UPDATE SET
+        estimates = estimates + excluded.estimates,
+        total_cost = total_cost + excluded.total_cost,
+        total_tokens = total_tokens + excluded.total_tokens,
+        default_rate_estimates = default_rate_estimates + excluded.default_rate_estimates
+"""
+
+
+def text_hash(text):
+    """Fingerprint of pasted text, in the same form as result_cache.content_hash."""
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=20).hexdigest()
+
+
+def _day(timestamp):
+    return datetime.date.fromtimestamp(timestamp).isoformat()
+
+
+def _day_bound(value):
+    """'YYYY-MM-DD' for a date, datetime or ISO string (None passes through)."""
+    if value is None or isinstance(value, str) and len(value) == 10:
+        return value
+    if isinstance(value, datetime.datetime):
+        return value.date().isoformat()
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return datetime.date.fromisoformat(str(value)[:10]).isoformat()
+
+
+def _tokens(value):
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+class HistoryStore:
+    """
+    SQLite store of assessment results with an incrementally kept daily rollup.
+
+    Args:
+        path (str): SQLite file; created along with its directory if missing.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        # One connection shared by the GUI thread and its workers, serialized by _lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._model_ids = {(company, model, version): model_id for model_id, company, model, version in self._conn.execute("SELECT model_id, company, model, version FROM models")}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.commit()
+                self._conn.close()
+                self._conn = None
+
+    # --- Writing ---
+
+    def _model_id(self, row):
+        key = (str(row.get("Company")), str(row.get("Model")), str(row.get("Version")))
+        model_id = self._model_ids.get(key)
+        if model_id is None:
+            model_id = self._conn.execute("INSERT INTO models (company, model, version) VALUES (?, ?, ?)", key).lastrowid
+            self._model_ids[key] = model_id
+        return model_id
+
+    def _file_id(self, content_hash, path, file_type, size_bytes):
+        row = self._conn.execute("SELECT file_id FROM files WHERE content_hash IS ? AND path IS ?", (content_hash, path)).fetchone()
+        if row is not None:
+            return row[0]
+        return self._conn.execute("INSERT INTO files (content_hash, path, file_type, size_bytes) VALUES (?, ?, ?, ?)",
+                                  (content_hash, path, file_type, size_bytes)).lastrowid
+
+    def start_run(self, source, catalog_revision=None, when=None):
+        """Registers a run (one GUI assessment, CLI invocation, ...) and returns its id."""
+        with self._lock:
+            return self._conn.execute("INSERT INTO runs (time, source, catalog_revision) VALUES (?, ?, ?)",
+                                      (time.time() if when is None else when, source, catalog_revision)).lastrowid
+
+    def _add(self, run_id, file_id, file_type, results, when, rollup):
+        """Queues one file's estimate rows and folds them into the pending rollup dict."""
+        day = _day(when)
+        rows = []
+        for row in results:
+            model_id = self._model_id(row)
+            cost = row.get("Total Cost (USD)")
+            if not isinstance(cost, (int, float)) or isinstance(cost, bool):
+                raise ValueError("History needs numeric result rows (price with numeric=True).")
+            total_tokens = _tokens(row.get("Total Tokens"))
+            default_rate = 1 if row.get("Default Rate") else 0
+            rows.append((run_id, file_id, model_id, when, file_type, _tokens(row.get("Send Tokens")), _tokens(row.get("Get Tokens")), total_tokens, cost, default_rate))
+            totals = rollup.setdefault((day, model_id, file_type), [0, 0.0, 0, 0])
+            totals[0] += 1
+            totals[1] += cost
+            totals[2] += total_tokens or 0
+            totals[3] += default_rate
+        self._conn.executemany("INSERT INTO estimates (run_id, file_id, model_id, time, file_type, send_tokens, get_tokens, total_tokens, cost, default_rate) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def _commit(self, rollup):
+        self._conn.executemany(_ROLLUP_UPSERT, [key + tuple(totals) for key, totals in rollup.items()])
+        self._conn.commit()
+        rollup.clear()
+
+    def record(self, measurement, results, content_hash=None, catalog_revision=None, source="gui", when=None):
+        """
+        Records one assessment (e.g. AssessmentWorker's) in its own transaction.
+
+        Args:
+            measurement (dict): The measurement that was priced (its path,
+                                file_type and size_bytes are stored).
+            results (list): Numeric result rows (estimator.assess(...,
+                            numeric=True)).
+            content_hash (str): File fingerprint (result_cache.content_hash,
+                                or text_hash for pasted text).
+            catalog_revision (str): model_loader.catalog_revision of the
+                                    catalog that priced it.
+            source (str): Where it came from ('gui', 'cli', ...).
+            when (float): Unix time (default now).
+
+        Returns:
+            int: Estimate rows stored.
+        """
+        when = time.time() if when is None else when
+        with self._lock:
+            run_id = self.start_run(source, catalog_revision, when)
+            file_id = self._file_id(content_hash, measurement.get("path"), measurement["file_type"], measurement["size_bytes"])
+            rollup = {}
+            try:
+                count = self._add(run_id, file_id, measurement["file_type"], results, when, rollup)
+                self._commit(rollup)
+            except BaseException:
+                self._conn.rollback()
+                raise
+        return count
+
+    def record_assessments(self, assessments, catalog_revision=None, source="cli", fingerprint=None):
+        """
+        Records per-file assessments (estimator.assess_paths with numeric=True)
+        as they stream past, committing every COMMIT_EVERY estimate rows.
+
+        Args:
+            fingerprint (callable): fingerprint(path) -> content hash; files
+                                    are stored without one when None.
+
+        Yields:
+            dict: The assessments, unchanged.
+        """
+        run_id = self.start_run(source, catalog_revision)
+        rollup = {}
+        pending = 0
+        try:
+            for item in assessments:
+                if not item["error"] and item["results"]:
+                    when = time.time()
+                    with self._lock:
+                        digest = fingerprint(item["path"]) if fingerprint is not None else None
+                        file_id = self._file_id(digest, os.path.abspath(item["path"]), item["file_type"], item["size_bytes"])
+                        pending += self._add(run_id, file_id, item["file_type"], item["results"], when, rollup)
+                        if pending >= COMMIT_EVERY:
+                            self._commit(rollup)
+                            pending = 0
+                yield item
+        finally:
+            with self._lock:
+                if self._conn is not None:
+                    self._commit(rollup)
+
+    def rebuild_rollups(self):
+        """Recomputes daily_rollup from the estimates table."""
+        with self._lock:
+            self._conn.execute("DELETE FROM daily_rollup")
+            self._conn.execute("""
+                INSERT INTO daily_rollup
+                SELECT date(time, 'unixepoch', 'localtime'), model_id, file_type,
+                       COUNT(*), TOTAL(cost), COALESCE(SUM(total_tokens), 0), SUM(default_rate)
+                FROM estimates GROUP BY 1, 2, 3
+            """)
+            self._conn.commit()
+
+    # --- Queries ---
+
+    def spend(self, group_by=("company",), since=None, until=None, company=None, model=None, file_type=None):
+        """
+        Projected spend from the daily rollup.
+
+        Args:
+            group_by (iterable): Any of GROUP_COLUMNS ('company', 'model',
+                                 'version', 'file_type', 'day', 'month',
+                                 'year'); empty for one grand total.
+            since, until (date | str): Inclusive day bounds ('YYYY-MM-DD').
+            company, model, file_type (str): Exact-match filters ('model' is
+                                             the model name, e.g. 'gpt-4o').
+
+        Returns:
+            list: Dicts with the group_by keys plus 'estimates',
+                  'total_cost', 'total_tokens' and 'default_rate_estimates',
+                  largest cost first.
+
+        Raises:
+            ValueError: If a group_by name is unknown.
+        """
+        group_by = list(group_by)
+        unknown = [name for name in group_by if name not in GROUP_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown group_by {', '.join(unknown)}; expected some of {', '.join(GROUP_COLUMNS)}.")
+        where, params = [], []
+        for clause, value in (("r.day >= ?", _day_bound(since)), ("r.day <= ?", _day_bound(until)),
+                              ("m.company = ?", company), ("m.model = ?", model), ("r.file_type = ?", file_type)):
+            if value is not None:
+                where.append(clause)
+                params.append(value)
+        keys = [f"{GROUP_COLUMNS[name]} AS {name}" for name in group_by]
+        sql = (f"SELECT {', '.join(keys + ['SUM(r.estimates)', 'TOTAL(r.total_cost)', 'SUM(r.total_tokens)', 'SUM(r.default_rate_estimates)'])} "
+               f"FROM daily_rollup r JOIN models m ON m.model_id = r.model_id"
+               + (f" WHERE {' AND '.join(where)}" if where else "")
+               + (f" GROUP BY {', '.join(str(i + 1) for i in range(len(group_by)))}" if group_by else "")
+               + f" ORDER BY {len(group_by) + 2} DESC")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        names = group_by + ["estimates", "total_cost", "total_tokens", "default_rate_estimates"]
+        return [dict(zip(names, row)) for row in rows if row[len(group_by)]]
+
+    def recent(self, limit=100, company=None, model=None, file_type=None):
+        """The latest estimate rows, newest first, as dicts."""
+        where, params = [], []
+        if file_type is not None:
+            where.append("e.file_type = ?")
+            params.append(file_type)
+        sql = ("SELECT e.time, m.company, m.model, m.version, e.file_type, f.path, f.content_hash, f.size_bytes, "
+               "e.send_tokens, e.get_tokens, e.total_tokens, e.cost, e.default_rate, r.source, r.catalog_revision "
+               "FROM estimates e JOIN models m ON m.model_id = e.model_id JOIN files f ON f.file_id = e.file_id "
+               "JOIN runs r ON r.run_id = e.run_id WHERE {} ORDER BY e.time DESC LIMIT ?")
+        names = ("time", "company", "model", "version", "file_type", "path", "content_hash", "size_bytes",
+                 "send_tokens", "get_tokens", "total_tokens", "cost", "default_rate", "source", "catalog_revision")
+        with self._lock:
+            if company is None and model is None:
+                rows = self._conn.execute(sql.format(" AND ".join(where) or "1"), params + [limit]).fetchall()
+            else:
+                # Newest rows per matching model from the (model_id, time) index, then merged;
+                # one ORDER BY over the join would sort every matching row first
+                model_ids = self._conn.execute("SELECT model_id FROM models WHERE company = COALESCE(?, company) AND model = COALESCE(?, model)", (company, model)).fetchall()
+                per_model = sql.format(" AND ".join(["e.model_id = ?"] + where))
+                rows = []
+                for (model_id,) in model_ids:
+                    rows += self._conn.execute(per_model, [model_id] + params + [limit]).fetchall()
+                rows = sorted(rows, key=lambda row: row[0], reverse=True)[:limit]
+        return [dict(zip(names, row)) for row in rows]
+
+    def count(self):
+        """Number of estimate rows stored."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM estimates").fetchone()[0]
+
+
+def _print_table(rows, columns):
+    cells = [[("" if row[c] is None else f"${row[c]:,.6f}" if c in ("total_cost", "cost") else str(row[c])) for c in columns] for row in rows]
+    widths = [max([len(c)] + [len(line[i]) for line in cells]) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for line in cells:
+        print("  ".join(value.ljust(w) for value, w in zip(line, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Queries the AMM assessment history.")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH, help="History database (default: ~/.amm/history.sqlite or $AMM_HISTORY_PATH).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    spend = commands.add_parser("spend", help="Projected spend totals from the daily rollup.")
+    spend.add_argument("--by", default="company", help=f"Comma-separated grouping: {', '.join(GROUP_COLUMNS)} (default company; '' for a grand total).")
+    spend.add_argument("--since", help="First day, YYYY-MM-DD.")
+    spend.add_argument("--until", help="Last day, YYYY-MM-DD.")
+    recent = commands.add_parser("recent", help="The latest estimate rows.")
+    recent.add_argument("--limit", type=int, default=20)
+    for command in (spend, recent):
+        command.add_argument("--company")
+        command.add_argument("--model")
+        command.add_argument("--file-type")
+        command.add_argument("--format", choices=["table", "json"], default="table")
+    commands.add_parser("rebuild", help="Recompute the daily rollup from the estimates.")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.history):
+        print(f"[ERROR] No history at {args.history}.", file=sys.stderr)
+        return 1
+    with HistoryStore(args.history) as store:
+        if args.command == "rebuild":
+            store.rebuild_rollups()
+            print(f"Rebuilt the daily rollup from {store.count()} estimates.")
+            return 0
+        filters = dict(company=args.company, model=args.model, file_type=args.file_type)
+        try:
+            if args.command == "spend":
+                group_by = [name.strip() for name in args.by.split(",") if name.strip()]
+                rows = store.spend(group_by, args.since, args.until, **filters)
+                columns = group_by + ["estimates", "total_cost", "total_tokens"]
+            else:
+                rows = store.recent(args.limit, **filters)
+                for row in rows:
+                    row["time"] = datetime.datetime.fromtimestamp(row["time"]).isoformat(timespec='seconds')
+                columns = ["time", "company", "model", "file_type", "path", "total_tokens", "cost", "source"]
+        except ValueError as e:
+            parser.error(str(e))
+    if args.format == "json":
+        print(json.dumps(rows, indent=2))
+    else:
+        _print_table(rows, columns)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,181 @@
+import struct
+
+# --- Header-only image dimensions ---
+# Reads width, height and (where the header says) frame count straight from
+# the image format's header structures, so images can be priced by size
+# without Pillow opening or decoding them. JPEG, WebP and TIFF are walked
+# segment by segment with seeks; everything else is answered from the
+# 8 KB header that file_detect already read.
+
+PROBE_READ_BYTES = 64 * 1024   # Most read in one go when a header isn't enough
+MAX_SEGMENTS = 4096            # Cap on JPEG segments / WebP chunks / TIFF IFDs walked
+
+# JPEG start-of-frame markers (baseline, progressive, lossless, ...); not DHT/JPG/DAC
+_JPEG_SOF = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _read_at(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+
+def probe_png(header):
+    if header[12:16] != b'IHDR':
+        return None
+    width, height = struct.unpack('>II', header[16:24])
+    frames = 1
+    actl = header.find(b'acTL', 0, header.find(b'IDAT') if b'IDAT' in header else len(header))
+    if actl >= 0:  # Animated PNG
+        frames, = struct.unpack('>I', header[actl + 4:actl + 8])
+    return width, height, frames
+
+
+def probe_jpeg(f, size_bytes):
+    pos = 2
+    for _ in range(MAX_SEGMENTS):
+        segment = _read_at(f, pos, 9)
+        if len(segment) < 4 or segment[0] != 0xFF:
+            return None
+        marker = segment[1]
+        if marker == 0xFF:  # Fill byte
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:  # Markers without a length
+            pos += 2
+            continue
+        if marker in (0xD9, 0xDA):  # End of image / start of scan before any frame header
+            return None
+        length, = struct.unpack('>H', segment[2:4])
+        if marker in _JPEG_SOF:
+            height, width = struct.unpack('>HH', segment[5:9])
+            return width, height, 1
+        pos += 2 + length
+        if pos >= size_bytes:
+            return None
+    return None
+
+
+def probe_gif(header):
+    width, height = struct.unpack('<HH', header[6:10])
+    return width, height, None  # Counting frames would mean walking the whole file
+
+
+def probe_bmp(header):
+    dib_size, = struct.unpack('<I', header[14:18])
+    if dib_size == 12:  # BITMAPCOREHEADER
+        width, height = struct.unpack('<HH', header[18:22])
+    else:
+        width, height = struct.unpack('<ii', header[18:26])
+    return abs(width), abs(height), 1
+
+
+def probe_ico(header):
+    count, = struct.unpack('<H', header[4:6])
+    best = None
+    for i in range(min(count, (len(header) - 6) // 16)):
+        entry = header[6 + 16 * i:8 + 16 * i]
+        size = (entry[0] or 256, entry[1] or 256)  # 0 means 256
+        if best is None or size[0] * size[1] > best[0] * best[1]:
+            best = size
+    return (best[0], best[1], 1) if best else None  # Entries are alternative sizes, not frames
+
+
+def probe_webp(f, size_bytes, header):
+    chunk = header[12:16]
+    if chunk == b'VP8 ':
+        width, height = struct.unpack('<HH', header[26:30])
+        return width & 0x3FFF, height & 0x3FFF, 1
+    if chunk == b'VP8L':
+        bits, = struct.unpack('<I', header[21:25])
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1, 1
+    if chunk == b'VP8X':
+        width = int.from_bytes(header[24:27], 'little') + 1
+        height = int.from_bytes(header[27:30], 'little') + 1
+        frames = 1
+        if header[20] & 0x02:  # Animation flag: count ANMF chunks by their headers
+            frames = 0
+            pos = 12
+            for _ in range(MAX_SEGMENTS):
+                chunk_header = _read_at(f, pos, 8)
+                if len(chunk_header) < 8:
+                    break
+                chunk_id, chunk_size = struct.unpack('<4sI', chunk_header)
+                frames += chunk_id == b'ANMF'
+                pos += 8 + chunk_size + (chunk_size & 1)
+                if pos >= size_bytes:
+                    break
+        return width, height, frames or None
+    return None
+
+
+def probe_tiff(f, header):
+    endian = '<' if header[:2] == b'II' else '>'
+    offset, = struct.unpack(endian + 'I', header[4:8])
+    width = height = None
+    frames = 0
+    for _ in range(MAX_SEGMENTS):
+        if not offset:
+            break
+        count_bytes = _read_at(f, offset, 2)
+        if len(count_bytes) < 2:
+            break
+        count, = struct.unpack(endian + 'H', count_bytes)
+        entries = _read_at(f, offset + 2, count * 12 + 4)
+        if len(entries) < count * 12 + 4:
+            break
+        frames += 1
+        if width is None:
+            for i in range(count):
+                tag, field_type = struct.unpack(endian + 'HH', entries[i * 12:i * 12 + 4])
+                if tag in (256, 257):
+                    value_format = 'H' if field_type == 3 else 'I'
+                    value, = struct.unpack(endian + value_format, entries[i * 12 + 8:i * 12 + 8 + struct.calcsize(value_format)])
+                    if tag == 256:
+                        width = value
+                    else:
+                        height = value
+        offset, = struct.unpack(endian + 'I', entries[count * 12:count * 12 + 4])
+    if width is None or height is None:
+        return None
+    return width, height, frames
+
+
+def probe_image(f, fmt, size_bytes, header=None):
+    """
+    Returns an image's (width, height, frame_count) from its header.
+
+    Args:
+        f (file): The image, opened in binary mode (it may be seeked around).
+        fmt (str): Format from file_detect (descriptor.format), e.g. 'png'.
+        size_bytes (int): File size.
+        header (bytes): The file's first bytes if already read (descriptor.header).
+
+    Returns:
+        tuple: (width, height, frame_count), where frame_count is None if the
+               header doesn't say; or None if the format is not covered or
+               the header is unreadable.
+    """
+    if header is None:
+        header = _read_at(f, 0, PROBE_READ_BYTES)
+    try:
+        if fmt == 'png':
+            result = probe_png(header)
+        elif fmt == 'jpeg':
+            result = probe_jpeg(f, size_bytes)
+        elif fmt == 'gif':
+            result = probe_gif(header)
+        elif fmt == 'bmp':
+            result = probe_bmp(header)
+        elif fmt == 'ico':
+            result = probe_ico(header)
+        elif fmt == 'webp':
+            result = probe_webp(f, size_bytes, header)
+        elif fmt == 'tiff':
+            result = probe_tiff(f, header)
+        else:
+            result = None
+    except (struct.error, ValueError, IndexError):
+        return None
+    if result is None or not result[0] or not result[1]:
+        return None
+    return result
@@ -0,0 +1,412 @@
+import struct
+
+# --- Header-only media duration probing ---
+# Reads the play length of audio/video files from their container headers
+# (plus, for Ogg, the last page) so they can be priced per minute without
+# decoding anything. Each probe reads a few KB at most, wherever in the file
+# those bytes are, so probing is just as cheap for a 50 GB file as a 5 MB one.
+#
+#   MP4 / MOV / M4A   moov/mvhd timescale + duration (boxes walked by seeking)
+#   WAV / AVI         fmt byte rate + data size / avih frame count
+#   FLAC              STREAMINFO total samples / sample rate
+#   MP3               Xing/Info or VBRI frame count, else CBR bitrate
+#   AAC (ADTS)        average frame size over the first frames
+#   Ogg               last page granule position (Vorbis, Opus, Theora)
+#   Matroska / WebM   Segment Info duration * timecode scale
+#   FLV / WMV         onMetaData duration / ASF file properties
+
+PROBE_HEAD_BYTES = 64 * 1024   # Most we read from the start of a file
+PROBE_TAIL_BYTES = 64 * 1024   # Most we read from the end (Ogg, ID3v1)
+MAX_BOXES = 4096               # Cap on MP4/Matroska elements walked per level
+
+# MP3 bitrates in kbit/s by [MPEG-1?][layer][index]
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+_MP3_SAMPLE_RATES = {3: [44100, 48000, 32000], 2: [22050, 24000, 16000], 0: [11025, 12000, 8000]}  # by version bits
+_AAC_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350]
+_ASF_FILE_PROPERTIES = b'\xa1\xdc\xab\x8c\x47\xa9\xcf\x11\x8e\xe4\x00\xc0\x0c\x20\x53\x65'
+
+# Matroska element ids
+_EBML_SEGMENT = 0x18538067
+_EBML_SEEKHEAD = 0x114D9B74
+_EBML_SEEK = 0x4DBB
+_EBML_SEEKID = 0x53AB
+_EBML_SEEKPOSITION = 0x53AC
+_EBML_INFO = 0x1549A966
+_EBML_CLUSTER = 0x1F43B675
+_EBML_TIMECODESCALE = 0x2AD7B1
+_EBML_DURATION = 0x4489
+
+
+def _read_at(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+
+# --- MP4 / MOV / M4A ---
+
+def _iter_boxes(f, start, end):
+    """Yields (type, payload offset, box end) for the boxes in [start, end), reading only headers."""
+    pos = start
+    for _ in range(MAX_BOXES):
+        if pos + 8 > end:
+            return
+        header = _read_at(f, pos, 16)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack('>I4s', header[:8])
+        payload = pos + 8
+        if size == 1:  # 64-bit size follows
+            if len(header) < 16:
+                return
+            size = struct.unpack('>Q', header[8:16])[0]
+            payload = pos + 16
+        elif size == 0:  # Box runs to the end of the file
+            size = end - pos
+        if size < payload - pos:
+            return
+        yield box_type, payload, pos + size
+        pos += size
+
+
+def probe_mp4(f, size_bytes):
+    for box_type, payload, box_end in _iter_boxes(f, 0, size_bytes):
+        if box_type != b'moov':
+            continue
+        for child_type, child_payload, _ in _iter_boxes(f, payload, box_end):
+            if child_type != b'mvhd':
+                continue
+            data = _read_at(f, child_payload, 32)
+            if data[0] == 1:
+                timescale, duration = struct.unpack('>IQ', data[20:32])
+            else:
+                timescale, duration = struct.unpack('>II', data[12:20])
+            if duration in (0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+                return None  # Unknown (fragmented file)
+            return duration / timescale if timescale else None
+        return None
+    return None
+
+
+# --- RIFF (WAV, AVI) ---
+
+def probe_wav(f, size_bytes):
+    byte_rate = None
+    pos = 12
+    for _ in range(MAX_BOXES):
+        header = _read_at(f, pos, 8)
+        if len(header) < 8:
+            return None
+        chunk_id, chunk_size = struct.unpack('<4sI', header)
+        if chunk_id == b'fmt ':
+            byte_rate = struct.unpack('<I', _read_at(f, pos + 16, 4))[0]
+        elif chunk_id == b'data':
+            if not byte_rate:
+                return None
+            data_size = chunk_size
+            if chunk_size == 0xFFFFFFFF or pos + 8 + chunk_size > size_bytes:
+                data_size = size_bytes - pos - 8  # Streamed/truncated: assume data runs to the end
+            return data_size / byte_rate
+        pos += 8 + chunk_size + (chunk_size & 1)  # Chunks are word aligned
+    return None
+
+
+def probe_avi(header):
+    index = header.find(b'avih')
+    if index < 0:
+        return None
+    micro_sec_per_frame, = struct.unpack('<I', header[index + 8:index + 12])
+    total_frames, = struct.unpack('<I', header[index + 24:index + 28])
+    return micro_sec_per_frame * total_frames / 1000000
+
+
+# --- FLAC ---
+
+def probe_flac(header):
+    # 'fLaC', then the STREAMINFO block (always first): 4-byte block header + 34 bytes
+    if header[4] & 0x7F != 0:
+        return None
+    info = header[8:42]
+    packed, = struct.unpack('>Q', info[10:18])
+    sample_rate = packed >> 44
+    total_samples = packed & 0xFFFFFFFFF
+    if not sample_rate or not total_samples:
+        return None
+    return total_samples / sample_rate
+
+
+# --- MP3 ---
+
+def _id3v2_size(data):
+    if data[:3] != b'ID3' or len(data) < 10:
+        return 0
+    size = (data[6] & 0x7F) << 21 | (data[7] & 0x7F) << 14 | (data[8] & 0x7F) << 7 | (data[9] & 0x7F)
+    return 10 + size + (10 if data[5] & 0x10 else 0)  # Header, tag, optional footer
+
+
+def _mp3_frame_header(data, pos):
+    """Parses the frame header at pos; returns (version bits, layer, bitrate, sample rate, mono) or None."""
+    if pos + 4 > len(data) or data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 3   # 3 = MPEG-1, 2 = MPEG-2, 0 = MPEG-2.5
+    layer = 4 - ((data[pos + 1] >> 1) & 3)
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    bitrate = _MP3_BITRATES[(version == 3, layer)][bitrate_index] * 1000
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    mono = (data[pos + 3] >> 6) == 3
+    return version, layer, bitrate, sample_rate, mono
+
+
+def probe_mp3(f, size_bytes, header):
+    audio_start = _id3v2_size(header)
+    data = header[audio_start:] if audio_start < len(header) else b''
+    if len(data) < 4096:
+        data = _read_at(f, audio_start, 4096)
+    # Find the first frame sync within the read window
+    pos = 0
+    frame = None
+    while pos < len(data) - 4:
+        frame = _mp3_frame_header(data, pos)
+        if frame is not None:
+            break
+        pos = data.find(b'\xff', pos + 1)
+        if pos < 0:
+            return None
+    if frame is None:
+        return None
+    version, layer, bitrate, sample_rate, mono = frame
+    samples_per_frame = 384 if layer == 1 else (1152 if version == 3 or layer == 2 else 576)
+    # Xing/Info (LAME) or VBRI headers give the exact frame count
+    side_info = (17 if mono else 32) if version == 3 else (9 if mono else 17)
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags, = struct.unpack('>I', data[xing + 4:xing + 8])
+        if flags & 1:
+            frames, = struct.unpack('>I', data[xing + 8:xing + 12])
+            return frames * samples_per_frame / sample_rate
+    vbri = pos + 4 + 32
+    if data[vbri:vbri + 4] == b'VBRI':
+        frames, = struct.unpack('>I', data[vbri + 14:vbri + 18])
+        return frames * samples_per_frame / sample_rate
+    # Constant bitrate: audio bytes / byte rate (minus a trailing ID3v1 tag)
+    audio_end = size_bytes
+    if size_bytes >= 128 and _read_at(f, size_bytes - 128, 3) == b'TAG':
+        audio_end -= 128
+    return (audio_end - audio_start - pos) * 8 / bitrate
+
+
+# --- AAC (ADTS) ---
+
+def probe_aac(size_bytes, header):
+    pos = frames = frame_bytes = 0
+    sample_rate = None
+    while pos + 7 <= len(header) and frames < 64:
+        if header[pos] != 0xFF or header[pos + 1] & 0xF6 != 0xF0:
+            break
+        sample_rate = _AAC_SAMPLE_RATES[(header[pos + 2] >> 2) & 0xF]
+        length = ((header[pos + 3] & 3) << 11) | (header[pos + 4] << 3) | (header[pos + 5] >> 5)
+        if length < 7:
+            break
+        frames += 1
+        frame_bytes += length
+        pos += length
+    if not frames or not sample_rate:
+        return None
+    return size_bytes / (frame_bytes / frames) * 1024 / sample_rate
+
+
+# --- Ogg ---
+
+def probe_ogg(f, size_bytes, header):
+    if header[:4] != b'OggS':
+        return None
+    serial, = struct.unpack('<I', header[14:18])
+    segments = header[26]
+    packet = header[27 + segments:27 + segments + 64]  # First packet: the codec id header
+    granule_to_seconds = None
+    if packet[:7] == b'\x01vorbis':
+        sample_rate, = struct.unpack('<I', packet[12:16])
+        granule_to_seconds = lambda g: g / sample_rate
+    elif packet[:8] == b'OpusHead':
+        pre_skip, = struct.unpack('<H', packet[10:12])
+        granule_to_seconds = lambda g: max(0, g - pre_skip) / 48000  # Opus granules are always 48 kHz
+    elif packet[:7] == b'\x80theora':
+        frame_num, frame_den = struct.unpack('>II', packet[22:30])
+        shift = ((packet[40] & 3) << 3) | (packet[41] >> 5)
+        granule_to_seconds = lambda g: ((g >> shift) + (g & ((1 << shift) - 1))) * frame_den / frame_num
+    elif packet[:5] == b'\x7fFLAC':
+        sample_rate = struct.unpack('>Q', packet[27:35])[0] >> 44
+        granule_to_seconds = lambda g: g / sample_rate
+    if granule_to_seconds is None:
+        return None
+    # Last page of the same logical stream, from the tail of the file
+    tail_start = max(0, size_bytes - PROBE_TAIL_BYTES)
+    tail = _read_at(f, tail_start, PROBE_TAIL_BYTES)
+    pos = tail.rfind(b'OggS')
+    while pos >= 0:
+        page = tail[pos:pos + 27]
+        if len(page) == 27 and struct.unpack('<I', page[14:18])[0] == serial:
+            granule, = struct.unpack('<q', page[6:14])
+            if granule >= 0:
+                return granule_to_seconds(granule)
+        pos = tail.rfind(b'OggS', 0, pos)
+    return None
+
+
+# --- Matroska / WebM ---
+
+def _ebml_vint(data, pos, keep_marker):
+    first = data[pos]
+    length = 1
+    mask = 0x80
+    while length <= 8 and not first & mask:
+        mask >>= 1
+        length += 1
+    if length > 8:
+        raise ValueError("invalid EBML variable-length integer")
+    value = first if keep_marker else first & (mask - 1)
+    for byte in data[pos + 1:pos + length]:
+        value = (value << 8) | byte
+    unknown = not keep_marker and value == (1 << (7 * length)) - 1
+    return (None if unknown else value), pos + length
+
+
+def _ebml_elements(data, pos, end):
+    """Yields (id, data offset, data end) for the elements in data[pos:end]."""
+    for _ in range(MAX_BOXES):
+        if pos >= end:
+            return
+        element_id, pos = _ebml_vint(data, pos, True)
+        size, pos = _ebml_vint(data, pos, False)
+        data_end = end if size is None else pos + size
+        yield element_id, pos, data_end
+        pos = data_end
+
+
+def _matroska_info_duration(info):
+    scale = 1000000
+    duration = None
+    try:
+        for element_id, start, end in _ebml_elements(info, 0, len(info)):
+            if element_id == _EBML_TIMECODESCALE:
+                scale = int.from_bytes(info[start:end], 'big')
+            elif element_id == _EBML_DURATION:
+                duration = struct.unpack('>f' if end - start == 4 else '>d', info[start:end])[0]
+    except IndexError:
+        pass  # Read window ended mid-element; keep what was found
+    return duration * scale / 1000000000 if duration else None
+
+
+def probe_matroska(f, size_bytes):
+    head = _read_at(f, 0, PROBE_HEAD_BYTES)
+    elements = _ebml_elements(head, 0, len(head))
+    segment_start = None
+    for element_id, start, _ in elements:
+        if element_id == _EBML_SEGMENT:
+            segment_start = start
+            break
+    if segment_start is None:
+        return None
+    info_position = None
+    for element_id, start, end in _ebml_elements(head, segment_start, len(head)):
+        if element_id == _EBML_INFO:
+            if end <= len(head):
+                return _matroska_info_duration(head[start:end])
+            return _matroska_info_duration(_read_at(f, start, min(end - start, PROBE_HEAD_BYTES)))
+        if element_id == _EBML_SEEKHEAD and end <= len(head):
+            for seek_id, seek_start, seek_end in _ebml_elements(head, start, end):
+                if seek_id != _EBML_SEEK:
+                    continue
+                target = position = None
+                for child_id, child_start, child_end in _ebml_elements(head, seek_start, seek_end):
+                    if child_id == _EBML_SEEKID:
+                        target = int.from_bytes(head[child_start:child_end], 'big')
+                    elif child_id == _EBML_SEEKPOSITION:
+                        position = int.from_bytes(head[child_start:child_end], 'big')
+                if target == _EBML_INFO and position is not None:
+                    info_position = segment_start + position
+        if element_id == _EBML_CLUSTER or end > len(head):
+            break
+    if info_position is None or info_position >= size_bytes:
+        return None
+    # Info lies outside the head; read just that element
+    data = _read_at(f, info_position, 4096)
+    element_id, pos = _ebml_vint(data, 0, True)
+    size, pos = _ebml_vint(data, pos, False)
+    if element_id != _EBML_INFO:
+        return None
+    return _matroska_info_duration(data[pos:] if size is None else data[pos:pos + size])
+
+
+# --- FLV / WMV ---
+
+def probe_flv(header):
+    index = header.find(b'\x00\x08duration\x00')  # AMF0 key "duration" followed by a number marker
+    if index < 0:
+        return None
+    duration, = struct.unpack('>d', header[index + 11:index + 19])
+    return duration or None
+
+
+def probe_asf(header):
+    index = header.find(_ASF_FILE_PROPERTIES)
+    if index < 0:
+        return None
+    play_duration, = struct.unpack('<Q', header[index + 64:index + 72])  # 100 ns units
+    preroll, = struct.unpack('<Q', header[index + 80:index + 88])        # milliseconds
+    return max(0, play_duration / 10000000 - preroll / 1000)
+
+
+def probe_duration(f, fmt, size_bytes, header=None):
+    """
+    Returns the play length of an audio/video file in seconds.
+
+    Args:
+        f (file): The file, opened in binary mode (it is seeked around).
+        fmt (str): Format from file_detect (descriptor.format), e.g. 'mp4'.
+        size_bytes (int): File size.
+        header (bytes): The file's first bytes if already read (descriptor.header).
+
+    Returns:
+        float: Duration in seconds, or None if the format is not covered or
+               the headers don't give a usable length.
+    """
+    if header is None or len(header) < min(size_bytes, 4096):
+        header = _read_at(f, 0, PROBE_HEAD_BYTES)
+    try:
+        if fmt in ('mp4', 'mov', 'm4a'):
+            duration = probe_mp4(f, size_bytes)
+        elif fmt == 'wav':
+            duration = probe_wav(f, size_bytes)
+        elif fmt == 'avi':
+            duration = probe_avi(header)
+        elif fmt == 'flac':
+            duration = probe_flac(header)
+        elif fmt == 'mp3':
+            duration = probe_mp3(f, size_bytes, header)
+        elif fmt == 'aac':
+            duration = probe_aac(size_bytes, header)
+        elif fmt == 'ogg':
+            duration = probe_ogg(f, size_bytes, header)
+        elif fmt in ('mkv', 'webm'):
+            duration = probe_matroska(f, size_bytes)
+        elif fmt == 'flv':
+            duration = probe_flv(header)
+        elif fmt == 'wmv':
+            duration = probe_asf(header)
+        else:
+            duration = None
+    except (struct.error, ValueError, IndexError, KeyError, ZeroDivisionError, OverflowError):
+        return None  # Malformed header: fall back to the size-based estimate
+    if duration is None or duration != duration or duration <= 0:
+        return None
+    return float(duration)
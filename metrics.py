@@ -0,0 +1,401 @@
+import atexit
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+# --- Stage timings and counters ---
+# Lightweight instrumentation for the hot paths: file detection, image
+# verify, reading, token counting, pricing, rendering the results table and
+# export. Code marks a stage with `with metrics.timed("read"):` and counts
+# things with metrics.count("amm_files_total", file_type="PDF"). Stages nest
+# ("read" includes the "tokens" time spent inside it).
+#
+# Off by default: timed() then returns a shared do-nothing context manager
+# and count() returns at once, so the hooks cost a function call each. Turn
+# it on with AMM_METRICS (or the --metrics option of the CLI and the server):
+#
+#   AMM_METRICS=prometheus:9464 python amm.py      # http://127.0.0.1:9464/metrics
+#   AMM_METRICS=json:metrics.json python estimator.py ./docs > costs.csv
+#
+# Exporters are looked up by name in EXPORTERS (see register_exporter). With
+# AMM_PROFILE=DIR each GUI assessment / file load, CLI run or server run is
+# also recorded with cProfile into DIR/<run>-<time>.prof (view with
+# `python -m pstats` or snakeviz).
+
+ENABLED = False
+PROFILE_DIR = os.environ.get("AMM_PROFILE") or None
+DEFAULT_PROMETHEUS_PORT = 9464
+# Histogram bucket upper bounds in seconds (Prometheus 'le' labels)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+STAGE_METRIC = "amm_stage_seconds"
+STAGE_ERRORS_METRIC = "amm_stage_errors_total"
+
+_HELP = {
+    STAGE_METRIC: "Time spent per pipeline stage.",
+    STAGE_ERRORS_METRIC: "Stages that ended with an exception.",
+    "amm_files_total": "Files measured, by file type.",
+    "amm_bytes_total": "Bytes measured, by file type.",
+    "amm_assessments_total": "Measurements priced.",
+    "amm_priced_pairs_total": "Measurement/model pairs priced.",
+    "amm_exported_rows_total": "Result rows exported, by format.",
+    "amm_rendered_rows_total": "Result rows shown in the results table.",
+    "amm_server_requests_total": "Estimate server requests, by endpoint and status.",
+}
+
+
+class Histogram:
+    """Bucketed observations with their sum and count (cumulative on export)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(upper bound or '+Inf', observations <= it)]."""
+        total = 0
+        result = []
+        for bound, n in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += n
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by (name, labels)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    def inc(self, name, value=1, labels=()):
+        key = (name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, labels=()):
+        key = (name, labels)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self):
+        """JSON-able copy: {'counters': [...], 'histograms': [...]}."""
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in sorted(self.counters.items())]
+            histograms = [{
+                "name": name,
+                "labels": dict(labels),
+                "count": h.count,
+                "sum": h.sum,
+                "buckets": [[bound, n] for bound, n in h.cumulative()],
+            } for (name, labels), h in sorted(self.histograms.items())]
+        return {"counters": counters, "histograms": histograms}
+
+
+REGISTRY = MetricsRegistry()
+
+
+class _Timer:
+    __slots__ = ("labels", "start")
+
+    def __init__(self, stage):
+        self.labels = (("stage", stage),)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        REGISTRY.observe(STAGE_METRIC, time.perf_counter() - self.start, self.labels)
+        if exc_type is not None:
+            REGISTRY.inc(STAGE_ERRORS_METRIC, 1, self.labels)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(stage):
+    """Context manager recording the block's wall time under STAGE_METRIC{stage=...}."""
+    return _Timer(stage) if ENABLED else _NULL_TIMER
+
+
+def count(name, value=1, **labels):
+    """Adds value to a counter (no-op unless metrics are enabled)."""
+    if ENABLED:
+        REGISTRY.inc(name, value, tuple(sorted(labels.items())))
+
+
+def observe(stage, seconds):
+    """Records a stage time measured by the caller (e.g. with stage_clock)."""
+    if ENABLED:
+        REGISTRY.observe(STAGE_METRIC, seconds, (("stage", stage),))
+
+
+class StageClock:
+    """
+    Adds up time spent in many small calls (e.g. per-chunk tokenizer feeds)
+    and records it as one stage observation.
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self.seconds = 0.0
+
+    def wrap(self, func):
+        def timed_call(*args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                self.seconds += time.perf_counter() - start
+        return timed_call
+
+    def finish(self):
+        observe(self.stage, self.seconds)
+
+
+def stage_clock(stage):
+    """A StageClock for stage, or None when metrics are disabled."""
+    return StageClock(stage) if ENABLED else None
+
+
+def enable(on=True):
+    global ENABLED
+    ENABLED = on
+
+
+# --- Export ---
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in pairs) + "}"
+
+
+def prometheus_text(registry=None):
+    """The registry in the Prometheus text exposition format (version 0.0.4)."""
+    registry = registry or REGISTRY
+    with registry._lock:
+        counters = sorted(registry.counters.items())
+        histograms = sorted((key, (h.cumulative(), h.sum, h.count)) for key, h in registry.histograms.items())
+    lines = []
+    described = set()
+
+    def describe(name, kind):
+        if name not in described:
+            described.add(name)
+            if name in _HELP:
+                lines.append(f"# HELP {name} {_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+
+    for (name, labels), value in counters:
+        describe(name, "counter")
+        lines.append(f"{name}{_label_text(labels)} {value}")
+    for (name, labels), (buckets, total, n) in histograms:
+        describe(name, "histogram")
+        for bound, cumulative in buckets:
+            lines.append(f"{name}_bucket{_label_text(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_sum{_label_text(labels)} {total!r}")
+        lines.append(f"{name}_count{_label_text(labels)} {n}")
+    return "\n".join(lines) + "\n"
+
+
+def json_dump(registry=None):
+    """The registry as a JSON-able dict with a timestamp and process id."""
+    data = {"created": datetime.datetime.now().isoformat(timespec='seconds'), "pid": os.getpid()}
+    data.update((registry or REGISTRY).snapshot())
+    return data
+
+
+class JsonFileExporter:
+    """
+    Writes json_dump() to a file when closed (at exit) or on write().
+
+    Args:
+        target (str): File path ('-' writes to stderr).
+    """
+
+    def __init__(self, target):
+        self.path = os.path.expanduser(target) if target and target != "-" else "-"
+
+    def write(self):
+        text = json.dumps(json_dump(), indent=2)
+        if self.path == "-":
+            print(text, file=sys.stderr)
+            return
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, self.path)
+
+    def close(self):
+        try:
+            self.write()
+        except OSError as e:
+            print(f"[ERROR] Could not write metrics to {self.path}: {e}", file=sys.stderr)
+
+
+class PrometheusExporter:
+    """
+    Serves prometheus_text() at http://127.0.0.1:PORT/metrics from a daemon thread.
+
+    Args:
+        target (str): Port, or host:port (default DEFAULT_PROMETHEUS_PORT on 127.0.0.1).
+    """
+
+    def __init__(self, target):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        host, _, port = (target or "").rpartition(":")
+        port = int(port) if port else DEFAULT_PROMETHEUS_PORT
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the console
+
+        self.server = ThreadingHTTPServer((host or "127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+        threading.Thread(target=self.server.serve_forever, name="metrics-exporter", daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+EXPORTERS = {"json": JsonFileExporter, "prometheus": PrometheusExporter}
+_active_exporters = []
+
+
+def register_exporter(name, factory):
+    """Makes factory(target) available as AMM_METRICS=name:target; it must return an object with close()."""
+    EXPORTERS[name] = factory
+
+
+def start_exporter(spec):
+    """
+    Enables metrics and starts the exporter named by spec ("prometheus:9464",
+    "json:metrics.json", ...). It is closed at exit.
+
+    Returns:
+        The exporter object.
+
+    Raises:
+        ValueError: If the exporter name is unknown.
+        OSError: If the exporter can't start (e.g. the port is taken).
+    """
+    name, _, target = spec.partition(":")
+    if name not in EXPORTERS:
+        raise ValueError(f"Unknown metrics exporter {name!r}; expected one of {', '.join(EXPORTERS)}.")
+    exporter = EXPORTERS[name](target)
+    enable()
+    _active_exporters.append(exporter)
+    return exporter
+
+
+def configure_from_env():
+    """Starts the exporter named in AMM_METRICS, if set; reports a bad value and carries on."""
+    spec = os.environ.get("AMM_METRICS")
+    if not spec:
+        return None
+    try:
+        return start_exporter(spec)
+    except (ValueError, OSError) as e:
+        print(f"[ERROR] Metrics disabled (AMM_METRICS={spec}): {e}", file=sys.stderr)
+        return None
+
+
+@atexit.register
+def close_exporters():
+    while _active_exporters:
+        _active_exporters.pop().close()
+
+
+# --- Profiling ---
+
+class _Profiled:
+    def __init__(self, name):
+        self.name = name
+        self.profile = None
+
+    def __enter__(self):
+        import cProfile
+        self.profile = cProfile.Profile()
+        try:
+            self.profile.enable()
+        except ValueError:
+            self.profile = None  # Another profiler is already running (e.g. a concurrent worker on 3.12+)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.profile is None:
+            return False
+        self.profile.disable()
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        path = os.path.join(PROFILE_DIR, f"{self.name}-{stamp}.prof")
+        try:
+            os.makedirs(PROFILE_DIR, exist_ok=True)
+            self.profile.dump_stats(path)
+        except OSError as e:
+            print(f"[ERROR] Could not write profile {path}: {e}", file=sys.stderr)
+        return False
+
+
+def profiled(name):
+    """Context manager recording the block with cProfile into PROFILE_DIR (no-op when unset)."""
+    return _Profiled(name) if PROFILE_DIR else _NULL_TIMER
+
+
+def set_profile_dir(path):
+    global PROFILE_DIR
+    PROFILE_DIR = path or None
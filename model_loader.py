@@ -1,5 +1,9 @@
 import csv
+import hashlib
+import io
 import os # Import the os module
+import struct
+import sys
 
 # --- Corrected Path Handling ---
 # Get the directory where THIS script (model_loader.py) is located.
@@ -8,78 +12,390 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_PATH = os.path.join(SCRIPT_DIR, "model_reference.csv")
 # --- End Correction ---
 
-def load_models_from_csv(csv_path=CSV_PATH):
+# --- Capability flags ---
+# Parsed once per row from the 'API Types' column so callers test a bit
+# instead of re-lowercasing and scanning api_types on every check.
+CAP_TEXT = 1
+CAP_CODE = 2
+CAP_IMAGE = 4
+CAP_VIDEO = 8
+CAP_AUDIO = 16
+CAP_MULTIMODAL = 32
+API_TYPE_FLAGS = {'text': CAP_TEXT, 'code': CAP_CODE, 'image': CAP_IMAGE, 'video': CAP_VIDEO, 'audio': CAP_AUDIO, 'multi-modal': CAP_MULTIMODAL, 'multimodal': CAP_MULTIMODAL}
+
+# One bit per file type the estimator can price
+FILE_TYPE_BITS = {'Text': 1, 'Code': 2, 'Video': 4, 'Audio': 8, 'Image': 16, 'PDF': 32}
+
+# 'Image Token Method' values: how a provider turns an image's size into input tokens
+IMAGE_METHOD_TILES = 'tiles'    # Base tokens + tokens per tile of a fixed-size grid (e.g. OpenAI)
+IMAGE_METHOD_PIXELS = 'pixels'  # Base tokens + one token per N pixels (e.g. Anthropic)
+
+
+def parse_capabilities(api_types):
+    """Returns the CAP_* bitmask for a list of API type names (case-insensitive)."""
+    flags = 0
+    for api_type in api_types:
+        flags |= API_TYPE_FLAGS.get(api_type.strip().lower(), 0)
+    return flags
+
+
+def eligible_file_types(model):
+    """
+    Returns the FILE_TYPE_BITS mask of file types a model can be priced for:
+    it must accept the type and have the prices that type needs (the same
+    rules as estimator.price_model).
+    """
+    caps = model.get('capabilities')
+    if caps is None:
+        caps = parse_capabilities(model.get('api_types', []))
+    text_priced = model.get('input_cost') is not None and model.get('output_cost') is not None and model.get('max_tokens') is not None
+    eligible = 0
+    if caps & CAP_TEXT and text_priced:
+        eligible |= FILE_TYPE_BITS['Text'] | FILE_TYPE_BITS['PDF']  # PDFs are priced on their text
+    if caps & (CAP_TEXT | CAP_CODE) and text_priced:
+        eligible |= FILE_TYPE_BITS['Code']
+    if caps & (CAP_VIDEO | CAP_MULTIMODAL):
+        eligible |= FILE_TYPE_BITS['Video']  # Falls back to a default rate if unpriced
+    if caps & (CAP_AUDIO | CAP_MULTIMODAL) and model.get('audio_cost') is not None:
+        eligible |= FILE_TYPE_BITS['Audio']
+    if caps & (CAP_IMAGE | CAP_MULTIMODAL) and model.get('output_cost') is not None and (
+            model.get('image_cost') is not None or has_image_token_formula(model)):
+        eligible |= FILE_TYPE_BITS['Image']
+    return eligible
+
+
+def has_image_token_formula(model):
+    """
+    Whether a model's image input is priced as tokens from the image's
+    dimensions ('Image Token Method' with the parameters that method needs,
+    plus an input token price) rather than a flat per-image cost.
+    """
+    if model.get('input_cost') is None:
+        return False
+    method = model.get('image_token_method')
+    if method == IMAGE_METHOD_TILES:
+        return bool(model.get('image_tile_size')) and model.get('image_tokens_per_tile') is not None
+    if method == IMAGE_METHOD_PIXELS:
+        return bool(model.get('image_pixels_per_token'))
+    return False
+
+
+class CapabilityIndex:
+    """
+    File type -> ids of the models that can be priced for it, built once per
+    load (and again whenever a reload changes the catalog).
+
+    Model ids are each model's 'model_id'; on first load they are positions in
+    the list, and models added by a reload get new ids after the existing ones.
+    """
+
+    def __init__(self, models):
+        self.models = models
+        ids = {file_type: [] for file_type in FILE_TYPE_BITS}
+        bits = list(FILE_TYPE_BITS.items())
+        # One pass over the models (not one per file type); catalogs can have tens of thousands of rows
+        for m in models:
+            eligible = m['eligible_types']
+            if eligible:
+                model_id = m['model_id']
+                for file_type, bit in bits:
+                    if eligible & bit:
+                        ids[file_type].append(model_id)
+        self.by_type = {file_type: frozenset(type_ids) for file_type, type_ids in ids.items()}
+
+    def eligible_ids(self, file_type):
+        """Set of model ids that can price file_type (empty for Archive/Unknown: archives depend on their members)."""
+        return self.by_type.get(file_type, frozenset())
+
+    def eligible_models(self, file_type):
+        """Models that can price file_type, in load order."""
+        ids = self.eligible_ids(file_type)
+        return [m for m in self.models if m['model_id'] in ids]
+
+
+# --- Catalog records ---
+# Rows are parsed with module-level helpers (not closures rebuilt per row) into
+# ModelRecords; repeated strings such as company names are interned.
+
+def _parse_int(val):
+    val = val.strip()
+    return int(val.replace(',', '')) if val else None
+
+
+def _parse_float(val):
+    val = val.strip()
+    return float(val) if val else None
+
+
+def _parse_api_types(val):
+    return tuple(sys.intern(api.strip()) for api in val.split(',') if api.strip())
+
+
+def _parse_keyword(val):
+    return sys.intern(val.strip().lower())
+
+
+# (attribute, CSV column, parser) for every column the catalog reads
+CSV_COLUMNS = (
+    ("company", "Company", sys.intern),
+    ("model", "Model", str),
+    ("version", "Version", sys.intern),
+    ("api_types", "API Types", _parse_api_types),
+    ("max_tokens", "Max Tokens per Call", _parse_int),
+    ("input_cost", "Input Token Cost ($ per 1M)", _parse_float),
+    ("output_cost", "Output Token Cost ($ per 1M)", _parse_float),
+    ("video_cost", "Video Cost ($ per minute)", _parse_float),
+    ("audio_cost", "Audio Cost ($ per minute)", _parse_float),
+    ("image_cost", "Image Cost ($ per image)", _parse_float),
+    ("flat_file_cost", "Flat File Cost", _parse_float),
+    ("notes", "Notes", str),
+    ("image_token_method", "Image Token Method", _parse_keyword),
+    ("image_tile_size", "Image Tile Size", _parse_int),
+    ("image_tokens_per_tile", "Image Tokens per Tile", _parse_int),
+    ("image_base_tokens", "Image Base Tokens", _parse_int),
+    ("image_max_side", "Image Max Side", _parse_int),
+    ("image_short_side", "Image Short Side", _parse_int),
+    ("image_pixels_per_token", "Image Pixels per Token", _parse_float),
+)
+REQUIRED_COLUMNS = ["Company", "Model", "Version", "API Types", "Max Tokens per Call", "Input Token Cost ($ per 1M)", "Output Token Cost ($ per 1M)"]
+# Value for a column the CSV does not have (only optional columns can be missing)
+MISSING_DEFAULTS = {"company": "N/A", "model": "N/A", "version": "N/A", "api_types": (), "notes": "", "image_token_method": ""}
+
+
+class ModelRecord:
+    """
+    One catalog row. Fields are slots (no per-row __dict__); the parsed
+    capability masks are stored alongside the CSV values.
+
+    Records also answer record['key'] and record.get('key', default), so code
+    written against the old per-row dicts keeps working.
+    """
+
+    FIELDS = tuple(attr for attr, _, _ in CSV_COLUMNS)
+    __slots__ = ("model_id",) + FIELDS + ("capabilities", "eligible_types")
+
+    def __init__(self, model_id, values):
+        self.model_id = model_id
+        self.update(values)
+
+    @classmethod
+    def restore(cls, model_id, values, capabilities=None):
+        """
+        Builds a record from already-parsed values (catalog_snapshot). The
+        masks are derived as in update(); capabilities may be passed in when
+        the caller has already parsed this row's api_types.
+        """
+        record = cls.__new__(cls)
+        record.model_id = model_id
+        for attr, value in zip(cls.FIELDS, values):
+            setattr(record, attr, value)
+        record.capabilities = parse_capabilities(record.api_types) if capabilities is None else capabilities
+        record.eligible_types = eligible_file_types(record)
+        return record
+
+    def update(self, values):
+        """Replaces the CSV-derived fields in place (used by catalog reloads)."""
+        for attr, value in zip(self.FIELDS, values):
+            setattr(self, attr, value)
+        self.capabilities = parse_capabilities(self.api_types)
+        self.eligible_types = eligible_file_types(self)
+
+    def key(self):
+        """Identity of the row across reloads: (company, model, version)."""
+        return (self.company, self.model, self.version)
+
+    def __repr__(self):
+        return f"ModelRecord({self.model_id}, {self.company!r}, {self.model!r}, {self.version!r})"
+
+    # --- dict-compatible view ---
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key, default=None):
+        return getattr(self, key, default) if isinstance(key, str) else default
+
+    def __contains__(self, key):
+        return key in self.__slots__
+
+    def keys(self):
+        return self.__slots__
+
+    def items(self):
+        return [(key, getattr(self, key)) for key in self.__slots__]
+
+    def as_dict(self):
+        """A plain dict copy (e.g. for JSON output)."""
+        return dict(self.items())
+
+    def values_tuple(self):
+        """The CSV-derived fields, in FIELDS order (what a row diff compares)."""
+        return tuple(getattr(self, attr) for attr in self.FIELDS)
+
+    def __getstate__(self):
+        return (self.model_id, self.values_tuple())
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+
+class CatalogDiff:
+    """
+    Row-level changes applied by ModelCatalog.reconcile.
+
+    Attributes:
+        added (list): New ModelRecords (appended to the catalog).
+        removed (list): ModelRecords no longer in the CSV (dropped from it).
+        changed (list): Existing ModelRecords whose values were updated in place.
+    """
+
+    def __init__(self, added=(), removed=(), changed=()):
+        self.added = list(added)
+        self.removed = list(removed)
+        self.changed = list(changed)
+
+    def __bool__(self):
+        return bool(self.added or self.removed or self.changed)
+
+    def __repr__(self):
+        return f"CatalogDiff(added={len(self.added)}, removed={len(self.removed)}, changed={len(self.changed)})"
+
+
+class ModelCatalog(list):
+    """
+    The loaded models: a list of ModelRecords plus the CapabilityIndex built
+    when it was loaded (in .capability_index).
+    """
+
+    def __init__(self, records=()):
+        super().__init__(records)
+        self._next_id = max((r.model_id for r in self), default=-1) + 1
+        self._reindex()
+
+    def _reindex(self):
+        self._by_id = {r.model_id: r for r in self}
+        self.capability_index = CapabilityIndex(self)
+
+    def by_id(self, model_id):
+        return self._by_id[model_id]
+
+    def reconcile(self, fresh):
+        """
+        Brings this catalog in line with a freshly loaded one, in place.
+
+        Rows are matched on ModelRecord.key(). Matched rows keep their record
+        object and model_id (only changed values are written), so references
+        held elsewhere, e.g. by the GUI table, stay valid.
+
+        Args:
+            fresh (ModelCatalog): The newly parsed catalog.
+
+        Returns:
+            CatalogDiff: What changed (falsy if nothing did).
+        """
+        current = {}
+        for record in self:
+            current.setdefault(record.key(), record)
+        diff = CatalogDiff()
+        seen = set()
+        for record in fresh:
+            key = record.key()
+            existing = current.get(key)
+            if existing is None or key in seen:
+                record.model_id = self._next_id
+                self._next_id += 1
+                diff.added.append(record)
+                continue
+            seen.add(key)
+            values = record.values_tuple()
+            if existing.values_tuple() != values:
+                existing.update(values)
+                diff.changed.append(existing)
+        diff.removed = [record for record in self if record.key() not in seen or current[record.key()] is not record]
+        if diff:
+            removed_ids = {record.model_id for record in diff.removed}
+            self[:] = [record for record in self if record.model_id not in removed_ids] + diff.added
+            self._reindex()
+        return diff
+
+
+def parse_model_row(row, column_indexes):
+    """
+    Parses one csv.reader row into the values for a ModelRecord.
+
+    Args:
+        row (list): The row's cells.
+        column_indexes (list): Cell index per CSV_COLUMNS entry, or None if
+                               the CSV has no such column.
+    """
+    values = []
+    for (attr, _, parse), index in zip(CSV_COLUMNS, column_indexes):
+        if index is None or index >= len(row):
+            values.append(MISSING_DEFAULTS.get(attr))
+        else:
+            values.append(parse(row[index]))
+    return values
+
+
+def load_models_from_csv(csv_path=CSV_PATH, use_snapshot=True, write_snapshot=False, data=None):
     """
     Loads model reference data from the specified CSV file.
 
+    If a binary snapshot compiled from exactly these CSV bytes sits next to
+    the file (see catalog_snapshot.py), it is loaded instead of parsing.
+
     Args:
         csv_path (str): The full path to the CSV file.
                         Defaults to the path constructed relative
                         to this script's location.
+        use_snapshot (bool): Use a matching snapshot when there is one.
+        write_snapshot (bool): After parsing the CSV, (re)write its snapshot
+                               so the next load can skip parsing.
+        data (bytes): The CSV's contents, if the caller has already read them.
 
     Returns:
-        list: A list of dictionaries, where each dictionary represents a model.
-              Returns an empty list if the file cannot be loaded or parsed.
+        ModelCatalog: A list of ModelRecords (which also support dict-style
+                      access), with its CapabilityIndex in .capability_index.
+                      Empty if the file cannot be loaded or parsed.
     """
     models = []
     # Add a check to see if the constructed path actually exists before trying to open
     if not os.path.exists(csv_path):
         print(f"[ERROR] CSV file not found at the expected location: {csv_path}")
-        return models # Return empty list
+        return ModelCatalog() # Return empty list
 
     try:
-        with open(csv_path, mode='r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
+        if data is None:
+            with open(csv_path, 'rb') as file:
+                data = file.read()
+        if use_snapshot or write_snapshot:
+            import catalog_snapshot
+            digest = catalog_snapshot.source_digest(data)
+        if use_snapshot:
+            catalog = catalog_snapshot.load_snapshot(catalog_snapshot.snapshot_path(csv_path), digest)
+            if catalog is not None:
+                return catalog
+        with io.StringIO(data.decode('utf-8'), newline='') as file:
+            reader = csv.reader(file)
+            fieldnames = next(reader, [])
             # Check if required columns exist (optional but good practice)
-            required_columns = ["Company", "Model", "Version", "API Types", "Max Tokens per Call", "Input Token Cost ($ per 1M)", "Output Token Cost ($ per 1M)"]
-            if not all(col in reader.fieldnames for col in required_columns):
+            if not all(col in fieldnames for col in REQUIRED_COLUMNS):
                 print(f"[ERROR] CSV file at {csv_path} is missing required columns.")
-                print(f"Required: {required_columns}")
-                print(f"Found: {reader.fieldnames}")
-                return models
+                print(f"Required: {REQUIRED_COLUMNS}")
+                print(f"Found: {fieldnames}")
+                return ModelCatalog()
+            column_indexes = [fieldnames.index(column) if column in fieldnames else None for _, column, _ in CSV_COLUMNS]
 
             for row_num, row in enumerate(reader, start=2): # start=2 for header row + 1-based index
+                if not row:
+                    continue
                 try:
-                    # Normalize and parse API Types
-                    api_types_raw = row.get('API Types', '') # Use .get for safety
-                    api_types = [api.strip() for api in api_types_raw.split(',') if api.strip()]
-
-                    # Defensive parse for all numeric fields
-                    def parse_int(val):
-                        val = str(val).strip()
-                        return int(val.replace(',', '')) if val else None
-                    def parse_float(val):
-                        val = str(val).strip()
-                        return float(val) if val else None
-
-                    max_tokens = parse_int(row.get('Max Tokens per Call', ''))
-                    input_cost = parse_float(row.get('Input Token Cost ($ per 1M)', ''))
-                    output_cost = parse_float(row.get('Output Token Cost ($ per 1M)', ''))
-                    video_cost = parse_float(row.get('Video Cost ($ per minute)', ''))
-                    audio_cost = parse_float(row.get('Audio Cost ($ per minute)', ''))
-                    image_cost = parse_float(row.get('Image Cost ($ per image)', ''))
-                    flat_file_cost = parse_float(row.get('Flat File Cost', ''))
-
-                    models.append({
-                        "company": row.get("Company", "N/A"),
-                        "model": row.get("Model", "N/A"),
-                        "version": row.get("Version", "N/A"),
-                        "api_types": api_types,
-                        "max_tokens": max_tokens,
-                        "input_cost": input_cost,
-                        "output_cost": output_cost,
-                        "video_cost": video_cost,
-                        "audio_cost": audio_cost,
-                        "image_cost": image_cost,
-                        "flat_file_cost": flat_file_cost,
-                        "notes": row.get("Notes", "")
-                    })
+                    models.append(ModelRecord(len(models), parse_model_row(row, column_indexes)))
                 except Exception as ve:
                     print(f"[ERROR] Skipping row {row_num} in {csv_path} due to data conversion error: {ve}")
-                    print(f"Problematic row data: {row}")
-                except KeyError as ke:
-                    print(f"[ERROR] Skipping row {row_num} in {csv_path} due to missing column: {ke}")
-                    print(f"Problematic row data: {row}")
+                    print(f"Problematic row data: {dict(zip(fieldnames, row))}")
 
     except FileNotFoundError:
         # This specific error should be less likely now with the os.path.exists check, but keep for safety
@@ -90,8 +406,28 @@ def load_models_from_csv(csv_path=CSV_PATH):
 
     if not models:
         print(f"[WARNING] No models were successfully loaded from {csv_path}.")
+        return ModelCatalog()
 
-    return models
+    catalog = ModelCatalog(models)
+    if write_snapshot:
+        try:
+            catalog_snapshot.write_snapshot(catalog, digest, catalog_snapshot.snapshot_path(csv_path))
+        except (OSError, OverflowError, struct.error) as e:
+            print(f"[WARNING] Could not write the catalog snapshot for {csv_path}: {e}")
+    return catalog
+
+def catalog_revision(csv_path=CSV_PATH):
+    """
+    Returns a short content hash identifying this revision of the catalog CSV.
+
+    Anything cached against catalog data (see result_cache.py) is keyed on
+    this, so editing a price invalidates it. Returns None if the file is missing.
+    """
+    try:
+        with open(csv_path, 'rb') as file:
+            return hashlib.sha256(file.read()).hexdigest()[:16]
+    except OSError:
+        return None
 
 # Example of how to test this module directly (optional)
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, QSortFilterProxyModel
+
+# --- Model list table (model/view) ---
+# The model list is a QTableView over ModelTableModel behind a
+# ModelSortProxy. Only visible cells are ever asked for data, check marks are
+# a check-state role backed by a bitset keyed on model_id, and select-all /
+# clear-all flip the bitset and repaint the column once, so none of it scales
+# with widgets per row. Sorting and filtering work on keys and search strings
+# precomputed per row, because a stock proxy calls back into Python data()
+# for every comparison, which takes seconds on a few thousand models.
+
+COLUMNS = ["Select", "Company", "Model", "Version", "Max Tokens"]
+SELECT_COLUMN = 0
+MODEL_ROLE = Qt.UserRole + 1       # The ModelRecord behind a row
+SORT_COLUMNS = {"Company": 1, "Model": 2, "Max Tokens": 4}  # Sort combo entry -> column
+
+
+class SelectionBitset:
+    """Set of model ids stored as the bits of one integer."""
+
+    def __init__(self):
+        self.bits = 0
+
+    def __contains__(self, model_id):
+        return bool(self.bits >> model_id & 1)
+
+    def __len__(self):
+        return bin(self.bits).count("1")
+
+    def set(self, model_id, on=True):
+        if on:
+            self.bits |= 1 << model_id
+        else:
+            self.bits &= ~(1 << model_id)
+
+    def set_many(self, model_ids, on=True):
+        mask = 0
+        for model_id in model_ids:
+            mask |= 1 << model_id
+        self.bits = self.bits | mask if on else self.bits & ~mask
+
+    def clear(self):
+        self.bits = 0
+
+
+class ModelTableModel(QAbstractTableModel):
+    """
+    Table model over a ModelCatalog. Rows start in catalog order; sort()
+    reorders them in place (the proxy forwards its sort here).
+
+    Args:
+        models (list): ModelRecords (or model dicts with a 'model_id').
+        placeholder (str): Text shown in a single disabled row while there
+                           are no models (e.g. if loading failed).
+    """
+
+    def __init__(self, models=(), placeholder="No models available.", parent=None):
+        super().__init__(parent)
+        self.records = list(models)
+        self.placeholder = placeholder
+        self.selection = SelectionBitset()
+        self.sort_column = None
+        self.sort_order = Qt.AscendingOrder
+        self._rows_by_id = {}
+        self._search_text = []
+        self._reindex()
+
+    def _reindex(self):
+        self._rows_by_id = {m['model_id']: row for row, m in enumerate(self.records)}
+        self._search_text = ["\t".join(self.row_texts(m)).lower() for m in self.records]
+
+    def row_texts(self, model):
+        """Display text of the Company, Model, Version and Max Tokens cells."""
+        return (
+            model.get('company', 'N/A'),
+            model.get('model', 'N/A'),
+            str(model.get('version', 'N/A')),
+            str(model.get('max_tokens', 'N/A')),
+        )
+
+    def sort_key(self, model, column):
+        if column == SELECT_COLUMN:
+            return 1 if model['model_id'] in self.selection else 0
+        elif column == 4:
+            max_tokens = model.get('max_tokens')
+            return max_tokens if max_tokens is not None else -1
+        return self.row_texts(model)[column - 1].lower()  # Sort case-insensitive
+
+    def matches(self, row, needle):
+        """Whether any cell of the row contains needle (already lowercased)."""
+        return needle in self._search_text[row]
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.records) or (1 if self.placeholder else 0)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section]
+        return None
+
+    def flags(self, index):
+        if not index.isValid() or not self.records:
+            return Qt.NoItemFlags
+        flags = Qt.ItemIsEnabled | Qt.ItemIsSelectable
+        if index.column() == SELECT_COLUMN:
+            flags |= Qt.ItemIsUserCheckable
+        return flags
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if not self.records:
+            return self.placeholder if role == Qt.DisplayRole else None
+        model = self.records[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column != SELECT_COLUMN:
+                return self.row_texts(model)[column - 1]
+        elif role == Qt.CheckStateRole and column == SELECT_COLUMN:
+            return Qt.Checked if model['model_id'] in self.selection else Qt.Unchecked
+        elif role == MODEL_ROLE:
+            return model
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or index.column() != SELECT_COLUMN or not self.records:
+            return False
+        self.selection.set(self.records[index.row()]['model_id'], Qt.CheckState(value) == Qt.Checked)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def _select_column_changed(self):
+        if self.records:
+            self.dataChanged.emit(self.index(0, SELECT_COLUMN), self.index(len(self.records) - 1, SELECT_COLUMN), [Qt.CheckStateRole])
+
+    def set_all_checked(self, checked, rows=None):
+        """Checks/unchecks every model, or only the given source rows."""
+        if rows is None:
+            if checked:
+                self.selection.set_many(m['model_id'] for m in self.records)
+            else:
+                self.selection.clear()
+        else:
+            self.selection.set_many((self.records[row]['model_id'] for row in rows), checked)
+        self._select_column_changed()
+
+    def is_checked(self, row):
+        return bool(self.records) and self.records[row]['model_id'] in self.selection
+
+    def model_at(self, row):
+        return self.records[row]
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Reorders the rows by column on precomputed keys (one Python sort, no per-compare callbacks)."""
+        self.sort_column, self.sort_order = column, order
+        if column < 0 or len(self.records) < 2:
+            return
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        persistent_ids = [self.records[index.row()]['model_id'] for index in persistent]
+        self.records.sort(key=lambda m: self.sort_key(m, column), reverse=order == Qt.DescendingOrder)
+        self._reindex()
+        self.changePersistentIndexList(persistent, [self.index(self._rows_by_id[model_id], index.column()) for model_id, index in zip(persistent_ids, persistent)])
+        self.layoutChanged.emit()
+
+    def _resort(self):
+        if self.sort_column is not None:
+            self.sort(self.sort_column, self.sort_order)
+
+    def set_models(self, models):
+        """Replaces all rows (keeps check marks of models that are still there)."""
+        self.beginResetModel()
+        self.records = list(models)
+        self._reindex()
+        self.selection.bits &= sum(1 << model_id for model_id in self._rows_by_id)
+        self.endResetModel()
+        self._resort()
+
+    def apply_diff(self, diff):
+        """Applies a CatalogDiff row by row; untouched rows (and their check marks) stay as they are."""
+        if not self.records:
+            self.set_models(diff.added)
+            return
+        # Removed rows go last to first, one contiguous run at a time, so the
+        # row numbers still ahead stay valid; the index is rebuilt once after
+        rows = sorted((row for row in (self._rows_by_id.get(model['model_id']) for model in diff.removed) if row is not None), reverse=True)
+        if len(rows) == len(self.records):
+            self.set_models(diff.added)  # Nothing is left to keep; also swaps the placeholder row in/out cleanly
+            return
+        for model in diff.removed:
+            self.selection.set(model['model_id'], False)
+        i = 0
+        while i < len(rows):
+            last = first = rows[i]
+            i += 1
+            while i < len(rows) and rows[i] == first - 1:
+                first = rows[i]
+                i += 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.records[first:last + 1]
+            del self._search_text[first:last + 1]
+            self.endRemoveRows()
+        if diff.removed or diff.changed:
+            self._reindex()  # Row numbers, search text
+        for model in diff.changed:
+            row = self._rows_by_id.get(model['model_id'])
+            if row is not None:
+                self.dataChanged.emit(self.index(row, 1), self.index(row, len(COLUMNS) - 1))
+        if diff.added:
+            first = len(self.records)
+            self.beginInsertRows(QModelIndex(), first, first + len(diff.added) - 1)
+            self.records.extend(diff.added)
+            self._reindex()
+            self.endInsertRows()
+        if diff.added or diff.changed:
+            self._resort()  # New rows go to their sorted position, changed ones may move
+
+
+class ModelSortProxy(QSortFilterProxyModel):
+    """
+    Filter proxy for a ModelTableModel. Sorting is forwarded to the source
+    model; the filter text matches any column, case-insensitively.
+    """
+
+    def __init__(self, source, parent=None):
+        super().__init__(parent)
+        self.setSourceModel(source)
+        self.filter_text = ""
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self.sourceModel().sort(column, order)
+
+    def set_filter_text(self, text):
+        self.filter_text = text.lower()
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if not self.filter_text or not self.sourceModel().records:
+            return True
+        return self.sourceModel().matches(source_row, self.filter_text)
@@ -0,0 +1,483 @@
+import re
+import zlib
+
+from file_stream import CHUNK_SIZE, TextTally
+
+# --- PDF page and text counts without rendering ---
+# Pages come from the page tree: startxref leads to the cross-reference
+# table or stream (following /Prev to older sections), the trailer names the
+# catalog, and the catalog's /Pages node holds the document's page /Count.
+# Text comes from one sequential pass over the file: each stream is inflated
+# chunk by chunk and only the strings shown by text operators (Tj, TJ, ', ")
+# are kept, so memory is bounded by CHUNK_SIZE and a few small buffers, not
+# by the document. Fonts that use glyph ids instead of a byte encoding give
+# approximate text, which is fine for token estimates.
+
+TAIL_BYTES = 2048               # End of file searched for startxref
+OBJECT_READ_BYTES = 4096        # First read of an object; grown up to MAX_OBJECT_BYTES
+MAX_OBJECT_BYTES = 1024 * 1024  # Largest object dictionary (or object stream) we parse
+MAX_XREF_SECTIONS = 64          # Cap on /Prev links followed
+CARRY_BYTES = 64 * 1024         # Unparsed content kept between chunks
+INFLATE_BYTES = 1024 * 1024     # Most inflated at once from one compressed piece
+
+_STREAM_RE = re.compile(rb'(?<!end)stream\r?\n')
+_PAGE_RE = re.compile(rb'/Type\s*/Page(?![A-Za-z])')
+_REF_RE = rb'\s+(\d+)\s+\d+\s+R'
+# Streams that never hold page text (images, fonts, CMaps, ICC profiles, ...); form XObjects are kept
+_SKIP_STREAM_RE = re.compile(rb'/Type\s*/(?:XRef|Metadata|EmbeddedFile|ObjStm|CMap)|/Subtype\s*/(?:Image|XML|Type1C|CIDFontType0C|OpenType)|/Length[123]|/FunctionType|/Alternate|/N\s+[134]\b')
+_CONTENT_TOKEN_RE = re.compile(rb"""
+    \((?:[^()\\]|\\.|\((?:[^()\\]|\\.)*\))*\)   # Literal string (one level of nested parentheses)
+  | <[0-9A-Fa-f\s]*>                             # Hex string
+  | [-+]?(?:\d+\.?\d*|\.\d+)                     # Number
+  | [\[\]]
+  | [A-Za-z'"*]+                                 # Operator
+""", re.S | re.X)
+_ESCAPE_RE = re.compile(rb'\\([nrtbf()\\]|[0-7]{1,3}|\r\n|\n|\r)')
+_ESCAPES = {b'n': b'\n', b'r': b'\r', b't': b'\t', b'b': b'\b', b'f': b'\f', b'(': b'(', b')': b')', b'\\': b'\\'}
+_INLINE_IMAGE_END_RE = re.compile(rb'\sEI(?=\s|$)')
+_LINE_OPERATORS = {b'Td', b'TD', b'T*', b'Tm', b'BT', b'ET'}
+TJ_SPACE_KERN = -200            # TJ adjustment (thousandths of an em) read as a word gap
+
+
+def _read_at(f, offset, size):
+    f.seek(offset)
+    return f.read(size)
+
+
+def _int_entry(dictionary, key):
+    match = re.search(rb'/' + key + rb'\s+(\d+)(?!\d|\s+\d+\s+R)', dictionary)
+    return int(match.group(1)) if match else None
+
+
+def _ref_entry(dictionary, key):
+    match = re.search(rb'/' + key + _REF_RE, dictionary)
+    return int(match.group(1)) if match else None
+
+
+def _filters(dictionary):
+    match = re.search(rb'/Filter\s*(\[[^\]]*\]|/\w+)', dictionary)
+    return re.findall(rb'/(\w+)', match.group(1)) if match else []
+
+
+def _is_flate(filters):
+    return filters in ([b'FlateDecode'], [b'Fl'])
+
+
+# --- Page tree ---
+
+def _png_unpredict(data, columns):
+    """Undoes PNG row predictors (/Predictor >= 10) on cross-reference stream data."""
+    rows = []
+    previous = bytearray(columns)
+    for start in range(0, len(data) - columns, columns + 1):
+        kind, row = data[start], bytearray(data[start + 1:start + 1 + columns])
+        for i in range(len(row)):
+            left = row[i - 1] if i else 0
+            up = previous[i]
+            if kind == 1:
+                row[i] = (row[i] + left) & 0xFF
+            elif kind == 2:
+                row[i] = (row[i] + up) & 0xFF
+            elif kind == 3:
+                row[i] = (row[i] + (left + up) // 2) & 0xFF
+            elif kind == 4:
+                corner = previous[i - 1] if i else 0
+                estimate = left + up - corner
+                pa, pb, pc = abs(estimate - left), abs(estimate - up), abs(estimate - corner)
+                row[i] = (row[i] + (left if pa <= pb and pa <= pc else up if pb <= pc else corner)) & 0xFF
+        rows.append(bytes(row))
+        previous = row
+    return b''.join(rows)
+
+
+class _XrefReader:
+    """Finds objects through a PDF's cross-reference sections (newest first)."""
+
+    def __init__(self, f, size_bytes):
+        self.f = f
+        self.sections = []  # ('table', [(first, count, entries offset)]) or ('stream', {number: entry})
+        self.root = None
+        tail = _read_at(f, max(0, size_bytes - TAIL_BYTES), TAIL_BYTES)
+        matches = re.findall(rb'startxref\s+(\d+)', tail)
+        if not matches:
+            raise ValueError("no startxref")
+        offset, seen = int(matches[-1]), set()
+        while offset is not None and offset not in seen and len(seen) < MAX_XREF_SECTIONS:
+            seen.add(offset)
+            offset = self._read_section(offset)
+
+    def _read_section(self, offset):
+        data = _read_at(self.f, offset, OBJECT_READ_BYTES)
+        if data.startswith(b'xref'):
+            subsections, pos = [], offset + 4
+            while True:
+                line = _read_at(self.f, pos, 64)
+                match = re.match(rb'\s*(\d+)\s+(\d+)[ \t]*\r?\n?', line)
+                if not match:
+                    break
+                first, count = int(match.group(1)), int(match.group(2))
+                subsections.append((first, count, pos + match.end()))
+                pos += match.end() + 20 * count
+            self.sections.append(('table', subsections))
+            trailer = _read_at(self.f, pos, OBJECT_READ_BYTES)
+            trailer = trailer[:trailer.find(b'startxref')] if b'startxref' in trailer else trailer
+            hybrid = _int_entry(trailer, b'XRefStm')
+            if hybrid is not None:
+                self._read_section(hybrid)  # Hybrid file: the stream holds the compressed objects
+        else:
+            trailer, data_offset = self._object_at(offset)
+            if data_offset is None or not re.search(rb'/Type\s*/XRef', trailer):
+                raise ValueError("no cross-reference section at startxref")
+            widths = [int(w) for w in re.search(rb'/W\s*\[([^\]]*)\]', trailer).group(1).split()]
+            index = re.search(rb'/Index\s*\[([^\]]*)\]', trailer)
+            index = [int(n) for n in index.group(1).split()] if index else [0, _int_entry(trailer, b'Size')]
+            data = self._stream_data(trailer, data_offset)
+            predictor = _int_entry(trailer, b'Predictor') or 1
+            if predictor >= 10:
+                data = _png_unpredict(data, sum(widths))
+            entries, row, pos = {}, sum(widths), 0
+            for first, count in zip(index[::2], index[1::2]):
+                for number in range(first, first + count):
+                    fields, field_pos = [], pos
+                    for width in widths:
+                        fields.append(int.from_bytes(data[field_pos:field_pos + width], 'big') if width else None)
+                        field_pos += width
+                    pos += row
+                    kind = 1 if fields[0] is None else fields[0]  # Type defaults to 1 when its width is 0
+                    entries.setdefault(number, (kind, fields[1], fields[2]))
+            self.sections.append(('stream', entries))
+        if self.root is None:
+            self.root = _ref_entry(trailer, b'Root')
+        return _int_entry(trailer, b'Prev')
+
+    def _object_at(self, offset):
+        """(dictionary bytes, stream data offset or None) of the object at offset."""
+        size = OBJECT_READ_BYTES
+        while True:
+            data = _read_at(self.f, offset, size)
+            start = data.find(b'obj')
+            stream = _STREAM_RE.search(data, start)
+            end = data.find(b'endobj', start)
+            if stream and (end < 0 or stream.start() < end):
+                return data[start + 3:stream.start()], offset + stream.end()
+            if end >= 0 or len(data) < size or size >= MAX_OBJECT_BYTES:
+                return data[start + 3:end if end >= 0 else len(data)], None
+            size *= 4
+
+    def _stream_data(self, dictionary, data_offset):
+        length = _int_entry(dictionary, b'Length')
+        if length is None:
+            ref = _ref_entry(dictionary, b'Length')
+            length = int(self.object(ref).split()[0]) if ref is not None else MAX_OBJECT_BYTES
+        data = _read_at(self.f, data_offset, min(length, MAX_OBJECT_BYTES))
+        if not _filters(dictionary):
+            return data
+        if not _is_flate(_filters(dictionary)):
+            raise ValueError("unsupported stream filter")
+        inflater = zlib.decompressobj()
+        return inflater.decompress(data, MAX_OBJECT_BYTES)
+
+    def _entry(self, number):
+        for kind, section in self.sections:
+            if kind == 'table':
+                for first, count, entries_offset in section:
+                    if first <= number < first + count:
+                        entry = _read_at(self.f, entries_offset + 20 * (number - first), 20)
+                        if entry[17:18] == b'n':
+                            return 1, int(entry[:10]), 0
+                        return 0, None, None
+            elif number in section:
+                return section[number]
+        return 0, None, None
+
+    def object(self, number):
+        """The dictionary (or other value) of object number, as bytes."""
+        kind, a, b = self._entry(number)
+        if kind == 1:
+            return self._object_at(a)[0]
+        if kind == 2:  # Compressed: object b of object stream a
+            dictionary, data_offset = self._object_at(self._entry(a)[1])
+            data = self._stream_data(dictionary, data_offset)
+            first = _int_entry(dictionary, b'First')
+            header = [int(n) for n in data[:first].split()]
+            offsets = header[1::2]
+            end = offsets[b + 1] if b + 1 < len(offsets) else len(data) - first
+            return data[first + offsets[b]:first + end]
+        raise ValueError(f"object {number} not found")
+
+
+def page_tree_count(f, size_bytes):
+    """
+    Page count from the catalog's page tree (/Root -> /Pages -> /Count).
+
+    Args:
+        f (file): The PDF, opened in binary mode (it is seeked around).
+        size_bytes (int): File size.
+
+    Returns:
+        int: The page count, or None if the page tree can't be read.
+    """
+    try:
+        xref = _XrefReader(f, size_bytes)
+        if xref.root is None:
+            return None
+        pages = _ref_entry(xref.object(xref.root), b'Pages')
+        if pages is None:
+            return None
+        pages = xref.object(pages)
+        count = _int_entry(pages, b'Count')
+        if count is None:
+            ref = _ref_entry(pages, b'Count')
+            count = int(xref.object(ref).split()[0]) if ref is not None else None
+        return count
+    except (ValueError, IndexError, AttributeError, TypeError, zlib.error):
+        return None
+
+
+# --- Text ---
+
+def _decode_pdf_string(raw):
+    if raw[:2] == b'\xfe\xff':
+        return raw[2:].decode('utf-16-be', errors='replace')
+    # Two-byte glyph codes (Identity-H fonts) have mostly zero high bytes
+    if len(raw) > 1 and len(raw) % 2 == 0 and raw[0::2].count(0) * 2 > len(raw) // 2:
+        return raw.decode('utf-16-be', errors='replace')
+    return raw.decode('latin-1')
+
+
+def _string_bytes(token):
+    if token[:1] == b'(':
+        return _ESCAPE_RE.sub(lambda m: _ESCAPES.get(m.group(1)) or (bytes([int(m.group(1), 8) & 0xFF]) if m.group(1)[:1].isdigit() else b''), token[1:-1])
+    digits = re.sub(rb'\s', b'', token[1:-1])
+    return bytes.fromhex((digits + b'0' if len(digits) % 2 else digits).decode('ascii'))
+
+
+class _ContentText:
+    """Pulls shown text out of content stream data fed in pieces."""
+
+    def __init__(self, tally):
+        self.tally = tally
+        self._carry = b''
+        self._operands = []
+        self._array = None
+        self._in_inline_image = False
+
+    def feed(self, data, final=False):
+        data = self._carry + data
+        if self._in_inline_image:
+            end = _INLINE_IMAGE_END_RE.search(data)
+            if end is None:
+                self._carry = b'' if final else data[-2:]
+                return
+            self._in_inline_image = False
+            data = data[end.end():]
+        cut = len(data) if final else data.rfind(b'\n') + 1
+        if not cut and len(data) > CARRY_BYTES:
+            cut = len(data)  # No line break in sight; parse what we have
+        pos = 0
+        while True:
+            token = _CONTENT_TOKEN_RE.search(data, pos, cut)
+            if token is None:
+                break
+            pos = token.end()
+            if token.group() != b'BI':
+                self._token(token.group())
+                continue
+            # Inline image: skip its binary data up to EI
+            end = _INLINE_IMAGE_END_RE.search(data, pos)
+            if end is None:
+                self._in_inline_image = True
+                self._carry = b'' if final else data[-2:]
+                return
+            pos = end.end()
+            cut = max(cut, pos)
+        self._carry = data[cut:]
+
+    def _show(self, text):
+        self.tally.feed(text)
+
+    def _token(self, token):
+        first = token[:1]
+        if first in (b'(', b'<'):
+            string = _decode_pdf_string(_string_bytes(token))
+            (self._array if self._array is not None else self._operands).append(string)
+        elif first == b'[':
+            self._array = []
+        elif first == b']':
+            self._operands.append(self._array or [])
+            self._array = None
+        elif first.isdigit() or first in b'+-.':
+            if self._array is not None:
+                self._array.append(float(token))
+        else:
+            if token in (b'Tj', b"'", b'"'):
+                if token != b'Tj':
+                    self._show('\n')
+                strings = [o for o in self._operands if isinstance(o, str)]
+                if strings:
+                    self._show(strings[-1])
+            elif token == b'TJ':
+                arrays = [o for o in self._operands if isinstance(o, list)]
+                if arrays:
+                    parts = []
+                    for item in arrays[-1]:
+                        if isinstance(item, str):
+                            parts.append(item)
+                        elif item < TJ_SPACE_KERN:
+                            parts.append(' ')
+                    self._show(''.join(parts))
+            elif token in _LINE_OPERATORS:
+                self._show('\n')
+            self._operands = []
+            self._array = None
+
+
+class _PdfTextScanner:
+    """One sequential pass over a PDF: shown text plus a count of page objects."""
+
+    def __init__(self, f, tally, progress=None):
+        self.f = f
+        self.tally = tally
+        self.progress = progress
+        self.page_objects = 0
+        self.bytes_read = 0
+        self._buffer = b''
+        self._eof = False
+
+    def _fill(self):
+        data = self.f.read(CHUNK_SIZE)
+        if not data:
+            self._eof = True
+            return False
+        self.bytes_read += len(data)
+        if self.progress is not None:
+            self.progress(self.bytes_read)
+        self._buffer += data
+        return True
+
+    def _count_pages(self, data):
+        self.page_objects += len(_PAGE_RE.findall(data))
+
+    def run(self):
+        while True:
+            match = _STREAM_RE.search(self._buffer)
+            if match is None:
+                if self._eof:
+                    self._count_pages(self._buffer)
+                    return
+                # Keep the unfinished object (it may be a stream's dictionary)
+                cut = self._buffer.rfind(b'endobj', 0, max(0, len(self._buffer) - 64))
+                if cut < 0 and len(self._buffer) > MAX_OBJECT_BYTES:
+                    cut = len(self._buffer) - CARRY_BYTES
+                if cut > 0:
+                    self._count_pages(self._buffer[:cut])
+                    self._buffer = self._buffer[cut:]
+                self._fill()
+                continue
+            head = self._buffer[:match.start()]
+            start = head.rfind(b'obj')
+            self._count_pages(head[:start] if start >= 0 else head)
+            dictionary = head[start:] if start >= 0 else head[-OBJECT_READ_BYTES:]
+            self._buffer = self._buffer[match.end():]
+            self._read_stream(dictionary)
+
+    def _stream_pieces(self, length):
+        """Yields the raw stream data in pieces, up to length bytes or 'endstream'."""
+        if length is not None:
+            while length > 0:
+                if not self._buffer and not self._fill():
+                    return
+                piece, self._buffer = self._buffer[:length], self._buffer[length:]
+                length -= len(piece)
+                yield piece
+            return
+        while True:
+            end = self._buffer.find(b'endstream')
+            if end >= 0:
+                piece, self._buffer = self._buffer[:end], self._buffer[end:]
+                yield piece
+                return
+            keep = len(b'endstream')
+            piece, self._buffer = self._buffer[:-keep], self._buffer[-keep:]
+            if piece:
+                yield piece
+            if not self._fill():
+                return
+
+    def _read_stream(self, dictionary):
+        filters = _filters(dictionary)
+        is_content = not _SKIP_STREAM_RE.search(dictionary) and (not filters or _is_flate(filters))
+        is_object_stream = re.search(rb'/Type\s*/ObjStm', dictionary) is not None and _is_flate(filters)
+        parser = _ContentText(self.tally) if is_content else None
+        inflater = zlib.decompressobj() if filters else None
+        carry = b''
+        for piece in self._stream_pieces(_int_entry(dictionary, b'Length')):
+            if not (is_content or is_object_stream):
+                continue
+            if inflater is not None:
+                if inflater.eof:
+                    continue
+                try:
+                    data = inflater.decompress(piece, INFLATE_BYTES)
+                    while inflater.unconsumed_tail:
+                        self._take(parser, data, carry)
+                        data = inflater.decompress(inflater.unconsumed_tail, INFLATE_BYTES)
+                except zlib.error:
+                    is_content = is_object_stream = False
+                    continue
+            else:
+                data = piece
+            carry = self._take(parser, data, carry)
+        if parser is not None and is_content:
+            parser.feed(b'', final=True)
+        elif is_object_stream:
+            self._count_pages(carry)
+        # Resume after the stream's end keyword
+        end = self._buffer.find(b'endstream', 0, 256)
+        if end >= 0:
+            self._buffer = self._buffer[end + len(b'endstream'):]
+
+    def _take(self, parser, data, carry):
+        if parser is not None:
+            parser.feed(data)
+            return carry
+        # Object stream: count page dictionaries, keeping a tail so none is split
+        data = carry + data
+        cut = max(0, len(data) - 64)
+        self._count_pages(data[:cut])
+        return data[cut:]
+
+
+def probe_pdf(f, consumers=(), size_bytes=None, progress=None):
+    """
+    Counts a PDF's pages and the text its pages show.
+
+    Args:
+        f (file): The PDF, opened in binary mode and positioned at the start.
+                  Any readable stream works; see size_bytes.
+        consumers (iterable): Callables fed each piece of extracted text
+                              (e.g. StreamingCounter.feed).
+        size_bytes (int): File size. Only pass it for seekable files: it
+                          enables reading the page count from the page tree.
+                          Without it pages are counted as page objects
+                          found during the text pass.
+        progress (callable): Optional progress(bytes_read) hook.
+
+    Returns:
+        dict: {'page_count' (None if unknown), 'char_count', 'word_count',
+               'text_bytes' (UTF-8 size of the extracted text)}.
+    """
+    page_count = None
+    if size_bytes is not None:
+        page_count = page_tree_count(f, size_bytes)
+        f.seek(0)
+    text_bytes = [0]
+
+    def count_bytes(text):
+        text_bytes[0] += len(text.encode('utf-8', errors='replace'))
+    tally = TextTally(list(consumers) + [count_bytes])
+    scanner = _PdfTextScanner(f, tally, progress)
+    scanner.run()
+    if page_count is None:
+        page_count = scanner.page_objects or None
+    return {"page_count": page_count, "char_count": tally.char_count, "word_count": tally.word_count, "text_bytes": text_bytes[0]}
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from model_loader import catalog_revision, CSV_PATH
+
+# --- Persistent measurement cache ---
+# Remembers what estimator.measure_file found for a file (type, size, token
+# counts, ...) so re-submitted documents are not re-read. Lookups go:
+#
+#   1. path + size + mtime + inode unchanged  -> known content hash (just a stat)
+#   2. otherwise hash the content             -> same content seen before?
+#   3. otherwise measure the file and store it
+#
+# Entries are keyed on content hash + catalog revision + tokenizers + file
+# extension, and evicted least-recently-used once the cache exceeds max_bytes.
+
+DEFAULT_CACHE_PATH = os.environ.get("AMM_CACHE_PATH", os.path.join(os.path.expanduser('~'), '.amm', 'measurement_cache.sqlite'))
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024  # Cap on stored measurement data
+HASH_CHUNK_BYTES = 1024 * 1024
+COMMIT_EVERY = 256                    # Writes batched per transaction
+MEASUREMENT_VERSION = 5               # Bump when measure_file's output changes shape
+
+# Measurement keys that are not worth persisting (exceptions, per-path values)
+_TRANSIENT_KEYS = ("path", "probe_error")
+
+
+def content_hash(path, size=None):
+    """
+    Hashes a file's whole content, streamed in HASH_CHUNK_BYTES reads.
+
+    Every byte is covered whatever the size: the digest is the cache key, so
+    an edit anywhere in the file has to change it. (size is accepted for
+    callers that already have a stat; it isn't needed.)
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class MeasurementCache:
+    """
+    On-disk (SQLite) cache of file measurements with LRU eviction.
+
+    Args:
+        path (str): SQLite file; created along with its directory if missing.
+        max_bytes (int): Size cap for stored measurement data.
+        csv_path (str): Catalog CSV whose revision is part of every key.
+    """
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, csv_path=CSV_PATH):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.revision = catalog_revision(csv_path) or "none"
+        self.hits = self.misses = self.hashed = 0
+        # One connection shared by the GUI thread and its workers, serialized by _lock
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, inode INTEGER, content_hash TEXT);
+            CREATE TABLE IF NOT EXISTS measurements (
+                content_hash TEXT, variant TEXT, value TEXT, nbytes INTEGER, last_access REAL,
+                PRIMARY KEY (content_hash, variant));
+            CREATE INDEX IF NOT EXISTS idx_measurements_access ON measurements(last_access);
+        """)
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM measurements").fetchone()[0]
+        self._pending = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _variant(self, path, tokenizer_names):
+        ext = os.path.splitext(path)[1].lower()
+        return f"v{MEASUREMENT_VERSION}|{self.revision}|{','.join(sorted(tokenizer_names))}|{ext}"
+
+    def _content_hash(self, path, st):
+        """Content hash via the stat fingerprint, hashing only if the file changed."""
+        row = self._conn.execute("SELECT size, mtime_ns, inode, content_hash FROM fingerprints WHERE path = ?", (path,)).fetchone()
+        if row and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ino):
+            return row[3]
+        digest = content_hash(path, st.st_size)
+        self.hashed += 1
+        self._conn.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)", (path, st.st_size, st.st_mtime_ns, st.st_ino, digest))
+        self._wrote()
+        return digest
+
+    def _load(self, digest, variant, path):
+        row = self._conn.execute("SELECT value FROM measurements WHERE content_hash = ? AND variant = ?", (digest, variant)).fetchone()
+        if row is None:
+            return None
+        self._conn.execute("UPDATE measurements SET last_access = ? WHERE content_hash = ? AND variant = ?", (time.time(), digest, variant))
+        self._wrote()
+        measurement = json.loads(row[0])
+        measurement.update(path=path, probe_error=None)
+        return measurement
+
+    def lookup(self, path, tokenizer_names=()):
+        """
+        Fingerprint-only lookup: a stat, never a read of the file itself.
+
+        Returns:
+            tuple: (measurement or None, os.stat_result). None means the file
+                   is new or changed and has to be hashed/measured by the caller.
+        """
+        with self._lock:
+            path = os.path.abspath(path)
+            st = os.stat(path)
+            row = self._conn.execute("SELECT size, mtime_ns, inode, content_hash FROM fingerprints WHERE path = ?", (path,)).fetchone()
+            if row and row[:3] == (st.st_size, st.st_mtime_ns, st.st_ino):
+                measurement = self._load(row[3], self._variant(path, tokenizer_names), path)
+                if measurement is not None:
+                    self.hits += 1
+                    return measurement, st
+            return None, st
+
+    def fingerprint(self, path):
+        """A file's content hash, re-hashing only if its size/mtime/inode changed."""
+        with self._lock:
+            path = os.path.abspath(path)
+            return self._content_hash(path, os.stat(path))
+
+    def get(self, path, tokenizer_names=()):
+        """
+        Returns the cached measurement for a file, hashing it if it changed.
+
+        Returns:
+            tuple: (measurement or None, content hash).
+        """
+        with self._lock:
+            path = os.path.abspath(path)
+            digest = self._content_hash(path, os.stat(path))
+            return self._load(digest, self._variant(path, tokenizer_names), path), digest
+
+    def put(self, path, tokenizer_names, measurement, digest, st=None):
+        """
+        Stores a measurement under its content hash.
+
+        If st (the os.stat_result taken before hashing) is given, the path's
+        fingerprint is recorded too, so the next lookup() is a hit.
+        """
+        with self._lock:
+            path = os.path.abspath(path)
+            if st is not None:
+                self._conn.execute("INSERT OR REPLACE INTO fingerprints VALUES (?, ?, ?, ?, ?)", (path, st.st_size, st.st_mtime_ns, st.st_ino, digest))
+            value = json.dumps({k: v for k, v in measurement.items() if k not in _TRANSIENT_KEYS})
+            variant = self._variant(path, tokenizer_names)
+            old = self._conn.execute("SELECT nbytes FROM measurements WHERE content_hash = ? AND variant = ?", (digest, variant)).fetchone()
+            self._conn.execute("INSERT OR REPLACE INTO measurements VALUES (?, ?, ?, ?, ?)", (digest, variant, value, len(value), time.time()))
+            self._total_bytes += len(value) - (old[0] if old else 0)
+            self._wrote()
+            if self._total_bytes > self.max_bytes:
+                self.evict()
+
+    def measure(self, path, tokenizer_names=(), measure_func=None):
+        """
+        Returns a file's measurement, from the cache when possible.
+
+        Args:
+            path (str): File to measure.
+            tokenizer_names (iterable): Passed through to measure_func.
+            measure_func (callable): measure_func(path, tokenizer_names) for
+                                     misses; defaults to estimator.measure_file.
+        """
+        if measure_func is None:
+            from estimator import measure_file as measure_func
+        measurement, digest = self.get(path, tokenizer_names)
+        if measurement is not None:
+            self.hits += 1
+            measurement["path"] = path
+            return measurement
+        self.misses += 1
+        measurement = measure_func(path, tokenizer_names)
+        self.put(path, tokenizer_names, measurement, digest)
+        return measurement
+
+    def evict(self):
+        """Drops least-recently-used entries until the cache is under 90% of max_bytes."""
+        with self._lock:
+            target = int(self.max_bytes * 0.9)
+            while self._total_bytes > target:
+                rows = self._conn.execute("SELECT content_hash, variant, nbytes FROM measurements ORDER BY last_access LIMIT 256").fetchall()
+                if not rows:
+                    break
+                for digest, variant, nbytes in rows:
+                    self._conn.execute("DELETE FROM measurements WHERE content_hash = ? AND variant = ?", (digest, variant))
+                    self._total_bytes -= nbytes
+                    if self._total_bytes <= target:
+                        break
+            self._conn.execute("DELETE FROM fingerprints WHERE content_hash NOT IN (SELECT content_hash FROM measurements)")
+            self._conn.commit()
+            self._pending = 0
+
+    def _wrote(self):
+        self._pending += 1
+        if self._pending >= COMMIT_EVERY:
+            self._conn.commit()
+            self._pending = 0
+
+    def flush(self):
+        """Commits batched writes (called automatically every COMMIT_EVERY writes and on close)."""
+        with self._lock:
+            if self._pending:
+                self._conn.commit()
+                self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self.flush()
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,182 @@
+import csv
+import itertools
+import json
+import os
+
+import estimator
+import metrics
+
+# --- Streaming result export ---
+# Writes result rows to CSV, JSON lines, Excel (.xlsx) or Parquet as they come
+# off a generator such as estimator.iter_result_rows, a batch at a time, so
+# exporting a batch run of hundreds of thousands of rows never holds more
+# than one batch in memory. Excel is written with openpyxl's write-only
+# workbook and Parquet with pyarrow's ParquetWriter (one row group per
+# batch); both are optional and only imported when that format is asked for.
+#
+# Rows should be numeric (estimator.assess_paths / iter_result_rows with
+# numeric=True): costs stay floats in USD and missing values are empty
+# cells, so spreadsheets and dataframes can sum them without re-parsing
+# "$0.000123" strings.
+#
+# The "export" stage time (metrics.timed) covers the whole call, so when rows
+# come from a lazy generator it includes producing them; the "price" and
+# "read" stages inside it are recorded separately.
+
+EXPORT_BATCH_ROWS = 10000   # Rows gathered per write (one Parquet row group)
+XLSX_MAX_ROWS = 1048576     # Excel's row limit per sheet, header included
+XLSX_COST_FORMAT = '$0.000000'
+
+EXPORT_COLUMNS = ["File"] + estimator.NUMERIC_RESULT_COLUMNS + ["Error"]
+EXPORT_FORMATS = ('csv', 'jsonl', 'xlsx', 'parquet')
+
+_EXTENSION_FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.xlsx': 'xlsx', '.parquet': 'parquet'}
+_INTEGER_COLUMNS = ("Max Tokens per Call", "Calls", "Send Tokens", "Get Tokens", "Total Tokens")
+_OPTIONAL_PACKAGES = {'xlsx': 'openpyxl', 'parquet': 'pyarrow'}
+
+
+def export_format(path):
+    """Returns the export format for a file name's extension, or None."""
+    return _EXTENSION_FORMATS.get(os.path.splitext(path)[1].lower())
+
+
+def _batches(rows, batch_size):
+    rows = iter(rows)
+    while True:
+        batch = list(itertools.islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _open_text(out):
+    if isinstance(out, str):
+        return open(out, 'w', encoding='utf-8', newline=''), True
+    return out, False
+
+
+def _write_csv(rows, out, columns, batch_size):
+    f, owned = _open_text(out)
+    try:
+        writer = csv.DictWriter(f, fieldnames=columns, extrasaction='ignore')
+        writer.writeheader()
+        count = 0
+        for batch in _batches(rows, batch_size):
+            writer.writerows(batch)
+            count += len(batch)
+    finally:
+        if owned:
+            f.close()
+    return count
+
+
+def _write_jsonl(rows, out, columns, batch_size):
+    f, owned = _open_text(out)
+    try:
+        count = 0
+        for batch in _batches(rows, batch_size):
+            f.write("".join(json.dumps(row) + "\n" for row in batch))
+            count += len(batch)
+    finally:
+        if owned:
+            f.close()
+    return count
+
+
+def _write_xlsx(rows, path, columns, batch_size):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+
+    workbook = Workbook(write_only=True)
+    cost_index = columns.index("Total Cost (USD)") if "Total Cost (USD)" in columns else None
+    sheet = None
+    sheet_rows = count = 0
+    for batch in _batches(rows, batch_size):
+        for row in batch:
+            if sheet is None or sheet_rows == XLSX_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Results {len(workbook.worksheets) + 1}" if sheet is not None else "Results")
+                sheet.append(columns)
+                sheet_rows = 1
+            values = [row.get(column) for column in columns]
+            if cost_index is not None and isinstance(values[cost_index], float):
+                cell = WriteOnlyCell(sheet, value=values[cost_index])
+                cell.number_format = XLSX_COST_FORMAT
+                values[cost_index] = cell
+            sheet.append(values)
+            sheet_rows += 1
+        count += len(batch)
+    if sheet is None:
+        workbook.create_sheet("Results").append(columns)
+    workbook.save(path)
+    return count
+
+
+def _arrow_type(pa, column):
+    if column in _INTEGER_COLUMNS:
+        return pa.int64()
+    if column == "Total Cost (USD)":
+        return pa.float64()
+    if column == "Default Rate":
+        return pa.bool_()
+    return pa.string()
+
+
+def _write_parquet(rows, path, columns, batch_size):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, _arrow_type(pa, column)) for column in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for batch in _batches(rows, batch_size):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema))
+            count += len(batch)
+    return count
+
+
+_WRITERS = {'csv': _write_csv, 'jsonl': _write_jsonl, 'xlsx': _write_xlsx, 'parquet': _write_parquet}
+
+
+def export_rows(rows, out, fmt=None, columns=EXPORT_COLUMNS, batch_size=EXPORT_BATCH_ROWS):
+    """
+    Streams result rows to a file.
+
+    Args:
+        rows (iterable): Row dicts, e.g. estimator.iter_result_rows(...,
+                         numeric=True). Keys outside columns are ignored and
+                         missing keys are written empty.
+        out (str | file): Output path. csv and jsonl also accept an open
+                          text stream (e.g. sys.stdout).
+        fmt (str): One of EXPORT_FORMATS; inferred from the extension of out
+                   when None.
+        columns (list): Column order (default EXPORT_COLUMNS).
+        batch_size (int): Rows gathered per write.
+
+    Returns:
+        int: Number of rows written.
+
+    Raises:
+        ValueError: If the format is unknown or needs a path but got a stream.
+        ImportError: If the format's optional package (openpyxl for xlsx,
+                     pyarrow for parquet) is not installed. Raised before any
+                     row is consumed.
+        OSError: If the file can't be written.
+    """
+    if fmt is None:
+        fmt = export_format(out) if isinstance(out, str) else None
+    if fmt is None:
+        raise ValueError(f"Can't tell the export format of {out!r}; use a {', '.join(_EXTENSION_FORMATS)} file or pass fmt.")
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unknown export format {fmt!r}; expected one of {', '.join(EXPORT_FORMATS)}.")
+    if fmt in _OPTIONAL_PACKAGES:
+        if not isinstance(out, str):
+            raise ValueError(f"{fmt} export needs a file path, not a stream.")
+        package = _OPTIONAL_PACKAGES[fmt]
+        try:
+            __import__(package)
+        except ImportError:
+            raise ImportError(f"{fmt} export needs the '{package}' package (pip install {package}).") from None
+    with metrics.timed("export"):
+        count = _WRITERS[fmt](rows, out, list(columns), batch_size)
+    metrics.count("amm_exported_rows_total", count, format=fmt)
+    return count
@@ -0,0 +1,151 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# --- Startup benchmark ---
+# Times how long amm.py takes to import and to get its window on screen, in
+# fresh interpreters run with -X importtime, and fails if a module that is
+# supposed to load lazily (Pillow, NumPy, multiprocessing, archive readers,
+# export writers, ...) is imported at startup. Meant to be run before
+# merging anything that touches imports:
+#
+#   python startup_bench.py --runs 5 --max-show-ms 800
+#
+# Without a display Qt is run with the offscreen platform.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Must not be imported by `import amm` or by showing the window
+LAZY_MODULES = (
+    'PIL', 'pandas', 'numpy', 'openpyxl', 'pyarrow', 'tiktoken',
+    'multiprocessing', 'concurrent.futures.process', 'tarfile', 'zipfile', 'gzip', 'getpass',
+    'cost_matrix', 'result_export', 'archive_probe', 'chunk_planner',
+    'cProfile', 'http.server',
+    'estimator', 'sqlite3', 'result_cache', 'history_store', 'tokenizer_registry',
+)
+
+# Runs in the child interpreter: prints one JSON line with timings and the
+# modules that importing amm and showing the window pulled in.
+_CHILD_CODE = r'''
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, SCRIPT_DIR)
+before = set(sys.modules)
+import amm
+imported = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QEventLoop, QTimer
+app = QApplication([])
+window = amm.AMMApp(defer_catalog=True)
+window.show()
+app.processEvents()
+shown = time.perf_counter()
+loop = QEventLoop()
+def poll():
+    if window.active_worker is None:
+        loop.quit()
+    else:
+        QTimer.singleShot(5, poll)
+QTimer.singleShot(0, poll)
+loop.exec()
+ready = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "show_ms": (shown - start) * 1000,
+    "catalog_ms": (ready - start) * 1000,
+    "models": len(window.models),
+    "modules": sorted(set(sys.modules) - before),
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """
+    Parses `python -X importtime` output.
+
+    Returns:
+        dict: {module name: (self microseconds, cumulative microseconds)}; a
+              module listed twice keeps its first entry.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "| imported package" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue
+        times.setdefault(parts[2].strip(), (self_us, cumulative_us))
+    return times
+
+
+def run_once(python=sys.executable):
+    """
+    Starts amm in a fresh interpreter and returns (timings dict, importtime dict).
+
+    Raises:
+        RuntimeError: If the child fails.
+    """
+    env = dict(os.environ)
+    if not env.get("DISPLAY") and not env.get("WAYLAND_DISPLAY") and sys.platform.startswith("linux"):
+        env.setdefault("QT_QPA_PLATFORM", "offscreen")
+    code = _CHILD_CODE.replace("SCRIPT_DIR", repr(SCRIPT_DIR))
+    proc = subprocess.run([python, "-X", "importtime", "-c", code], capture_output=True, text=True, env=env, cwd=SCRIPT_DIR)
+    lines = [line for line in proc.stdout.splitlines() if line.startswith("{")]
+    if proc.returncode != 0 or not lines:
+        raise RuntimeError(f"amm startup failed (exit {proc.returncode}):\n{proc.stderr[-2000:]}")
+    return json.loads(lines[-1]), parse_importtime(proc.stderr)
+
+
+def lazy_violations(modules):
+    """LAZY_MODULES entries (or their submodules) found in modules."""
+    return sorted(name for name in LAZY_MODULES if any(m == name or m.startswith(name + ".") for m in modules))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measures AMM startup time and checks that heavy modules stay lazily imported.")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters to start; the fastest run is reported (default 3).")
+    parser.add_argument("--top", type=int, default=15, help="Slowest imports to list, by cumulative time (default 15).")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if `import amm` takes longer than this.")
+    parser.add_argument("--max-show-ms", type=float, help="Fail if the window takes longer than this to show.")
+    args = parser.parse_args(argv)
+
+    best = best_times = None
+    for _ in range(max(1, args.runs)):
+        try:
+            timings, times = run_once()
+        except RuntimeError as e:
+            print(f"[ERROR] {e}", file=sys.stderr)
+            return 1
+        if best is None or timings["show_ms"] < best["show_ms"]:
+            best, best_times = timings, times
+
+    print(f"import amm:     {best['import_ms']:8.1f} ms")
+    print(f"window shown:   {best['show_ms']:8.1f} ms")
+    print(f"catalog loaded: {best['catalog_ms']:8.1f} ms ({best['models']} models)")
+    ours = {name: t for name, t in best_times.items() if name in best["modules"]}
+    print(f"\nSlowest imports (cumulative / self, ms), {len(ours)} modules loaded at startup:")
+    for name, (self_us, cumulative_us) in sorted(ours.items(), key=lambda item: -item[1][1])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} {self_us / 1000:8.1f}  {name}")
+
+    failed = False
+    violations = lazy_violations(best["modules"])
+    if violations:
+        print(f"\n[ERROR] Imported at startup but should load lazily: {', '.join(violations)}", file=sys.stderr)
+        failed = True
+    if args.max_import_ms is not None and best["import_ms"] > args.max_import_ms:
+        print(f"[ERROR] import amm took {best['import_ms']:.1f} ms (budget {args.max_import_ms:g} ms).", file=sys.stderr)
+        failed = True
+    if args.max_show_ms is not None and best["show_ms"] > args.max_show_ms:
+        print(f"[ERROR] Window took {best['show_ms']:.1f} ms to show (budget {args.max_show_ms:g} ms).", file=sys.stderr)
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+# --- Incremental word/character counts for the text box ---
+# Recounting toPlainText().split() on every keystroke is O(document) per key.
+# Instead the word count of every text block (line) is kept in a list and
+# QTextDocument.contentsChange tells us which blocks an edit touched, so only
+# those are recounted. Newlines are whitespace, so no word spans two blocks
+# and the per-block counts always add up to the whole-text count.
+# Characters are kept per block the same way, as len() of the block text
+# (code points, like len(toPlainText()) and scan_text_stream), not
+# QTextDocument.characterCount(), which counts UTF-16 code units.
+
+
+class DocumentCounter:
+    """
+    Keeps word_count and char_count of a QTextDocument up to date.
+
+    Args:
+        document (QTextDocument): The document to follow (e.g. QTextEdit.document()).
+        on_change (callable): Optional on_change() called after each update.
+    """
+
+    def __init__(self, document, on_change=None):
+        self.document = document
+        self.on_change = on_change
+        self.block_words = []
+        self.block_chars = []
+        self.word_count = 0
+        self.text_chars = 0
+        self.reset()
+        document.contentsChange.connect(self._contents_change)
+
+    @property
+    def char_count(self):
+        # Block texts plus one newline between each pair of blocks
+        return self.text_chars + max(0, len(self.block_chars) - 1)
+
+    def _count_blocks(self, block, last_number):
+        words, chars = [], []
+        while block.isValid() and block.blockNumber() <= last_number:
+            text = block.text()
+            words.append(len(text.split()))
+            chars.append(len(text))
+            block = block.next()
+        return words, chars
+
+    def reset(self):
+        """Recounts the whole document."""
+        self.block_words, self.block_chars = self._count_blocks(self.document.firstBlock(), self.document.blockCount() - 1)
+        self.word_count = sum(self.block_words)
+        self.text_chars = sum(self.block_chars)
+
+    def _contents_change(self, position, chars_removed, chars_added):
+        document = self.document
+        first_block = document.findBlock(position)
+        end = min(position + chars_added, document.characterCount() - 1)
+        first, last = first_block.blockNumber(), document.findBlock(end).blockNumber()
+        # Blocks before the edit are unchanged; the edited span had this many blocks before
+        old_span = (last - first + 1) + (len(self.block_words) - document.blockCount())
+        if first < 0 or last < first or old_span < 1 or first + old_span > len(self.block_words):
+            self.reset()
+        else:
+            words, chars = self._count_blocks(first_block, last)
+            self.word_count += sum(words) - sum(self.block_words[first:first + old_span])
+            self.text_chars += sum(chars) - sum(self.block_chars[first:first + old_span])
+            self.block_words[first:first + old_span] = words
+            self.block_chars[first:first + old_span] = chars
+        if self.on_change is not None:
+            self.on_change()
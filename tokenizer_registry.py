@@ -0,0 +1,404 @@
+import argparse
+import base64
+import fnmatch
+import hashlib
+import os
+import re
+import sys
+from collections import OrderedDict
+
+# --- Per-model tokenizer registry ---
+# Maps (company, model) rows from model_reference.csv to a tokenizer and counts
+# tokens with it. BPE vocabularies are read from local .tiktoken rank files, so
+# everything runs offline:
+#
+#   tokenizer_data/cl100k_base.tiktoken   (OpenAI gpt-4 / gpt-3.5)
+#   tokenizer_data/o200k_base.tiktoken    (OpenAI gpt-4o)
+#   tokenizer_data/llama3.tiktoken        (Meta Llama 3)
+#
+# The rank files are not shipped with the repository, so until they are
+# installed every model is counted with the byte heuristic (~4 bytes per
+# token). Install them once with:
+#
+#   python tokenizer_registry.py fetch                         # cl100k_base, o200k_base
+#   python tokenizer_registry.py fetch llama3 --from <Llama 3 tokenizer.model>
+#   python tokenizer_registry.py status
+#
+# If the optional `tiktoken` package is installed the same rank files are
+# loaded into its native encoder (fast path); otherwise the pure-Python BPE
+# below is used. Models without a rule, or whose rank file is missing, fall
+# back to the byte heuristic; the missing file is noted once per tokenizer
+# at debug level (AMM_LOG_LEVEL=debug).
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+TOKENIZER_DIR = os.environ.get("AMM_TOKENIZER_DIR", os.path.join(SCRIPT_DIR, "tokenizer_data"))
+
+HEURISTIC_NAME = "bytes"
+BYTES_PER_TOKEN = 4
+COUNT_CACHE_SIZE = 4096   # Whole-text token counts remembered per registry
+PIECE_CACHE_SIZE = 65536  # Pre-token -> BPE length, per pure-Python tokenizer
+MAX_PIECE_BYTES = 256     # Longer pre-tokens are merged in windows to bound BPE cost
+MAX_CARRY_CHARS = 65536   # StreamingCounter flushes a whitespace-free run after this many chars
+
+# Pre-tokenizer patterns, as published with the vocabularies (need `regex` or tiktoken)
+CL100K_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\p{L}\p{N}]?+\p{L}+|\p{N}{1,3}| ?[^\s\p{L}\p{N}]++[\r\n]*|\s*[\r\n]|\s+(?!\S)|\s+"""
+O200K_PATTERN = "|".join([
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]*[\p{Ll}\p{Lm}\p{Lo}\p{M}]+(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""[^\r\n\p{L}\p{N}]?[\p{Lu}\p{Lt}\p{Lm}\p{Lo}\p{M}]+[\p{Ll}\p{Lm}\p{Lo}\p{M}]*(?i:'s|'t|'re|'ve|'m|'ll|'d)?""",
+    r"""\p{N}{1,3}""",
+    r""" ?[^\s\p{L}\p{N}]+[\r\n/]*""",
+    r"""\s*[\r\n]+""",
+    r"""\s+(?!\S)""",
+    r"""\s+""",
+])
+# Stdlib `re` approximation used when the `regex` module is not installed
+FALLBACK_PATTERN = r"""'(?i:[sdmt]|ll|ve|re)|[^\r\n\w]?[^\W\d_]+|\d{1,3}| ?[^\s\w]+[\r\n]*|\s*[\r\n]+|\s+(?!\S)|\s+"""
+
+# (rank file name, pre-tokenizer pattern) per BPE tokenizer name
+BPE_SPECS = {
+    "cl100k_base": ("cl100k_base.tiktoken", CL100K_PATTERN),
+    "o200k_base": ("o200k_base.tiktoken", O200K_PATTERN),
+    "llama3": ("llama3.tiktoken", CL100K_PATTERN),
+}
+
+# Published rank files: (URL, SHA-256) per tokenizer name. Llama 3's is only
+# distributed with the model weights, so it has to be installed with --from.
+RANK_FILE_SOURCES = {
+    "cl100k_base": ("https://openaipublic.blob.core.windows.net/encodings/cl100k_base.tiktoken",
+                    "223921b76ee99bde995b7ff738513eef100fb51d18c93597a113bcffe865b2a7"),
+    "o200k_base": ("https://openaipublic.blob.core.windows.net/encodings/o200k_base.tiktoken",
+                   "446a9538cb6c348e3516120d7c08b09f57c36495e2acfffe59a5bf8b0cfb1a2d"),
+}
+
+# (company glob, model glob, tokenizer name); first match wins, case-insensitive
+DEFAULT_RULES = [
+    ("OpenAI", "gpt-4o*", "o200k_base"),
+    ("OpenAI", "gpt-4*", "cl100k_base"),
+    ("OpenAI", "gpt-3.5*", "cl100k_base"),
+    ("Meta*", "Llama 3*", "llama3"),
+]
+
+
+def load_tiktoken_ranks(path):
+    """
+    Reads a .tiktoken rank file ("<base64 token> <rank>" per line).
+
+    Returns:
+        dict: {token bytes: rank}.
+    """
+    ranks = {}
+    with open(path, 'rb') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            token, rank = line.split()
+            ranks[base64.b64decode(token)] = int(rank)
+    return ranks
+
+
+def fetch_rank_file(name, tokenizer_dir=TOKENIZER_DIR, source=None):
+    """
+    Installs a tokenizer's rank file into tokenizer_dir.
+
+    Args:
+        name (str): Tokenizer name (a BPE_SPECS key).
+        tokenizer_dir (str): Where bpe_factory looks for rank files.
+        source (str): Local path or URL to copy from (default: the published
+                      file in RANK_FILE_SOURCES).
+
+    Returns:
+        str: Path of the installed rank file.
+
+    Raises:
+        ValueError: Unknown tokenizer, no source for it, checksum mismatch or
+                    a file that isn't a rank file.
+        OSError: If the source can't be read or the file can't be written.
+    """
+    if name not in BPE_SPECS:
+        raise ValueError(f"Unknown tokenizer '{name}' (known: {', '.join(BPE_SPECS)}).")
+    url, expected = RANK_FILE_SOURCES.get(name, (None, None))
+    source = source or url
+    if source is None:
+        raise ValueError(f"'{name}' has no public download; pass the rank file with --from.")
+    if os.path.exists(source):
+        with open(source, 'rb') as f:
+            data = f.read()
+    else:
+        from urllib.request import urlopen
+        with urlopen(source, timeout=60) as response:
+            data = response.read()
+    if expected is not None and hashlib.sha256(data).hexdigest() != expected:
+        raise ValueError(f"{source} does not match the published {name} rank file (SHA-256 mismatch).")
+
+    os.makedirs(tokenizer_dir, exist_ok=True)
+    path = os.path.join(tokenizer_dir, BPE_SPECS[name][0])
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(data)
+        try:
+            if not load_tiktoken_ranks(temp_path):
+                raise ValueError("it is empty")
+        except (ValueError, TypeError) as e:  # Bad base64 / rank, or not "<token> <rank>" lines
+            raise ValueError(f"{source} is not a .tiktoken rank file: {e}")
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return path
+
+
+def _compile_pattern(pattern):
+    try:
+        import regex
+        return regex.compile(pattern)
+    except ImportError:
+        return re.compile(FALLBACK_PATTERN)
+
+
+class ByteHeuristicTokenizer:
+    """The original estimate: one token per BYTES_PER_TOKEN bytes of UTF-8."""
+
+    name = HEURISTIC_NAME
+    needs_text = False  # Counts come from the byte size alone
+
+    def count(self, text):
+        return int(len(text.encode('utf-8')) / BYTES_PER_TOKEN)
+
+
+class BPETokenizer:
+    """
+    Byte-level BPE token counter over a rank table (pure Python).
+
+    Args:
+        name (str): Tokenizer name, e.g. 'cl100k_base'.
+        ranks (dict): {token bytes: merge rank}.
+        pattern (str): Pre-tokenizer regex.
+    """
+
+    needs_text = True
+
+    def __init__(self, name, ranks, pattern):
+        self.name = name
+        self.ranks = ranks
+        self.pattern = _compile_pattern(pattern)
+        self._piece_cache = OrderedDict()
+
+    def _merge_count(self, piece):
+        # Repeatedly merge the adjacent pair with the lowest rank (tiktoken's algorithm)
+        ranks = self.ranks
+        parts = [piece[i:i + 1] for i in range(len(piece))]
+        while len(parts) > 1:
+            min_rank = min_idx = None
+            for i in range(len(parts) - 1):
+                rank = ranks.get(parts[i] + parts[i + 1])
+                if rank is not None and (min_rank is None or rank < min_rank):
+                    min_rank, min_idx = rank, i
+            if min_idx is None:
+                break
+            parts[min_idx:min_idx + 2] = [parts[min_idx] + parts[min_idx + 1]]
+        return len(parts)
+
+    def _piece_count(self, piece):
+        if piece in self.ranks:
+            return 1
+        cached = self._piece_cache.get(piece)
+        if cached is not None:
+            self._piece_cache.move_to_end(piece)
+            return cached
+        count = sum(self._merge_count(piece[i:i + MAX_PIECE_BYTES]) for i in range(0, len(piece), MAX_PIECE_BYTES))
+        self._piece_cache[piece] = count
+        if len(self._piece_cache) > PIECE_CACHE_SIZE:
+            self._piece_cache.popitem(last=False)
+        return count
+
+    def count(self, text):
+        return sum(self._piece_count(m.group().encode('utf-8')) for m in self.pattern.finditer(text))
+
+
+class NativeBPETokenizer:
+    """Same rank table, counted by tiktoken's native encoder."""
+
+    needs_text = True
+
+    def __init__(self, name, ranks, pattern):
+        import tiktoken
+        self.name = name
+        self._encoding = tiktoken.Encoding(name=f"amm_{name}", pat_str=pattern, mergeable_ranks=ranks, special_tokens={})
+
+    def count(self, text):
+        return len(self._encoding.encode_ordinary(text))
+
+
+def bpe_factory(name, tokenizer_dir=TOKENIZER_DIR):
+    """
+    Returns a factory that builds the named BPE tokenizer from its local rank
+    file, preferring the native tiktoken path. The factory returns None if the
+    rank file is not present.
+    """
+    file_name, pattern = BPE_SPECS[name]
+
+    def factory():
+        path = os.path.join(tokenizer_dir, file_name)
+        if not os.path.exists(path):
+            return None
+        ranks = load_tiktoken_ranks(path)
+        try:
+            return NativeBPETokenizer(name, ranks, pattern)
+        except ImportError:
+            return BPETokenizer(name, ranks, pattern)
+    return factory
+
+
+class StreamingCounter:
+    """
+    Counts tokens of a text fed in arbitrary pieces (e.g. file chunks).
+
+    Text is only handed to the tokenizer up to the start of the last space
+    run that follows a non-space character. The pre-tokenizers never join
+    tokens across that boundary, so the total matches counting the whole text.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.count = 0
+        self._carry = ""
+
+    def feed(self, text):
+        text = self._carry + text
+        cut = len(text)
+        while True:
+            cut = text.rfind(' ', 0, cut)
+            if cut <= 0 or not text[cut - 1].isspace():
+                break
+        if cut <= 0:
+            if len(text) < MAX_CARRY_CHARS:
+                self._carry = text
+                return
+            cut = len(text)  # No whitespace in sight; flush to keep memory bounded
+        self.count += self.tokenizer.count(text[:cut])
+        self._carry = text[cut:]
+
+    def finish(self):
+        if self._carry:
+            self.count += self.tokenizer.count(self._carry)
+            self._carry = ""
+        return self.count
+
+
+class TokenizerRegistry:
+    """
+    Resolves models to tokenizers and caches token counts.
+
+    Tokenizers are built lazily on first use. Whole-text counts are cached by
+    (tokenizer name, content hash), so models that share a tokenizer never
+    tokenize the same text twice.
+    """
+
+    def __init__(self, rules=DEFAULT_RULES, tokenizer_dir=TOKENIZER_DIR):
+        self._factories = {HEURISTIC_NAME: ByteHeuristicTokenizer}
+        for name in BPE_SPECS:
+            self._factories[name] = bpe_factory(name, tokenizer_dir)
+        self._instances = {}
+        self._rules = list(rules)
+        self._resolved = {}
+        self._counts = OrderedDict()
+
+    def register(self, name, factory):
+        """Registers (or replaces) a tokenizer factory; it may return None if unavailable."""
+        self._factories[name] = factory
+        self._instances.pop(name, None)
+        self._resolved.clear()
+
+    def add_rule(self, company, model, name):
+        """Maps models matching the company/model globs to a tokenizer; new rules take precedence."""
+        self._rules.insert(0, (company, model, name))
+        self._resolved.clear()
+
+    def get(self, name):
+        """Returns the named tokenizer, or the byte heuristic if it can't be built."""
+        if name not in self._instances:
+            factory = self._factories.get(name)
+            tokenizer = factory() if factory else None
+            if tokenizer is None and name != HEURISTIC_NAME:
+                from error_log import log_debug
+                log_debug(f"Tokenizer '{name}' is not available (see `python tokenizer_registry.py fetch`); using the byte heuristic.")
+            self._instances[name] = tokenizer
+        return self._instances[name] or self._instances.setdefault(HEURISTIC_NAME, ByteHeuristicTokenizer())
+
+    def name_for(self, model):
+        """Effective tokenizer name for a model dict (HEURISTIC_NAME if unmatched or unavailable)."""
+        key = (model.get('company', ''), model.get('model', ''))
+        if key not in self._resolved:
+            name = HEURISTIC_NAME
+            company, model_name = key[0].lower(), key[1].lower()
+            for company_glob, model_glob, rule_name in self._rules:
+                if fnmatch.fnmatch(company, company_glob.lower()) and fnmatch.fnmatch(model_name, model_glob.lower()):
+                    name = self.get(rule_name).name
+                    break
+            self._resolved[key] = name
+        return self._resolved[key]
+
+    def names_for(self, models):
+        """Distinct tokenizer names that need the actual text, for a list of models."""
+        names = []
+        for model in models:
+            name = self.name_for(model)
+            if name not in names and self.get(name).needs_text:
+                names.append(name)
+        return names
+
+    def count(self, text, name):
+        """Token count of text under the named tokenizer, cached by content hash."""
+        key = (name, hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest())
+        cached = self._counts.get(key)
+        if cached is not None:
+            self._counts.move_to_end(key)
+            return cached
+        count = self.get(name).count(text)
+        self._counts[key] = count
+        if len(self._counts) > COUNT_CACHE_SIZE:
+            self._counts.popitem(last=False)
+        return count
+
+    def streaming_counters(self, names):
+        """One StreamingCounter per tokenizer name, for a single pass over a file."""
+        return {name: StreamingCounter(self.get(name)) for name in names}
+
+
+REGISTRY = TokenizerRegistry()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Installs and lists the BPE rank files used for token counts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fetch = commands.add_parser("fetch", help="Download (or copy with --from) rank files into the tokenizer directory.")
+    fetch.add_argument("names", nargs="*", help=f"Tokenizers to install (default: {', '.join(RANK_FILE_SOURCES)}).")
+    fetch.add_argument("--from", dest="source", help="Local file or URL to install instead of the published download (one tokenizer only).")
+    commands.add_parser("status", help="Show which rank files are installed.")
+    parser.add_argument("--dir", default=TOKENIZER_DIR, help="Tokenizer directory (default: tokenizer_data/ or AMM_TOKENIZER_DIR).")
+    args = parser.parse_args(argv)
+
+    if args.command == "status":
+        for name, (file_name, _) in BPE_SPECS.items():
+            path = os.path.join(args.dir, file_name)
+            print(f"{name:<12} {'installed' if os.path.exists(path) else 'missing (byte heuristic)'}  {path}")
+        return 0
+
+    names = args.names or list(RANK_FILE_SOURCES)
+    if args.source and len(names) != 1:
+        parser.error("--from needs exactly one tokenizer name.")
+    failed = 0
+    for name in names:
+        try:
+            path = fetch_rank_file(name, args.dir, args.source)
+        except (OSError, ValueError) as e:
+            print(f"[ERROR] Could not install {name}: {e}", file=sys.stderr)
+            failed += 1
+            continue
+        print(f"Installed {name} -> {path}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())